@@ -1,21 +1,14 @@
-from collections.abc import Generator
 from typing import Annotated
 import secrets
 
 from fastapi import Depends, Header, HTTPException, status
-from sqlmodel import Session
+# Re-exported: routes import these from here
+from app.api.deps_db import SessionDep as SessionDep, get_db as get_db
 from app.core.config import settings
-from app.core.db import engine
 from app.models import UserOld as User, UserCreateOld as UserCreate
 from app import crud
 from app.core.security import verify_access_token
 
-def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
-        yield session
-
-
-SessionDep = Annotated[Session, Depends(get_db)]
 
 def _windows_username_to_email(username: str) -> str:
     """Convert a Windows username (e.g. DOMAIN\\username) into a safe email-like string.
@@ -1,22 +1,28 @@
-from collections.abc import Generator
-from typing import Annotated
+from typing import Annotated, Any, cast
 import secrets
 
 from fastapi import Depends, Header, HTTPException, status, Request
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+# Re-exported: routes import these from here
+from app.api.deps_db import (
+    AsyncSessionDep as AsyncSessionDep,
+    ReadSessionDep as ReadSessionDep,
+    SessionDep as SessionDep,
+    get_async_db as get_async_db,
+    get_async_read_db as get_async_read_db,
+    get_db as get_db,
+    get_read_db as get_read_db,
+)
 from app.core.config import settings
-from app.core.db import engine
 from app.models import User, UserCreate
+from app.models.user import UserRead
 from app import crud
 from app.core.security import verify_access_token
+from app.core.shared_cache import get_shared_cache
 from app.core.windows_auth import get_windows_user, get_user_details
 
-def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
-        yield session
-
-
-SessionDep = Annotated[Session, Depends(get_db)]
 
 
 def get_coupon_user_from_token(session: SessionDep, authorization: Annotated[str, Header()] = None) -> User:
@@ -43,6 +49,61 @@ def get_coupon_user_from_token(session: SessionDep, authorization: Annotated[str
     return user
 
 
+def _windows_user_create(username: str) -> UserCreate:
+    # Map Windows user to roles (this is a simplified approach)
+    roles = ["user"]  # Default role
+    # In a real implementation, you might want to map specific users to admin roles
+
+    # For Windows authentication, we don't need a real password
+    # Create a user with a simple placeholder password that meets minimum requirements
+    placeholder_password = "win12345"  # Simple 8-char placeholder
+
+    return UserCreate(
+        username=username,
+        password=placeholder_password,
+        roles=roles,
+        attributes={}  # Empty attributes by default
+    )
+
+
+def _identity(user: User | None) -> dict[str, Any] | None:
+    """A user as kept in the shared cache: the row without its password hash."""
+    return UserRead.model_validate(user).model_dump(mode="json") if user else None
+
+
+def _detached_user(identity: dict[str, Any]) -> User:
+    """A cached identity as a detached User, which sessions can merge without a query."""
+    user = User(**UserRead.model_validate(identity).model_dump())
+    make_transient_to_detached(user)
+    return user
+
+
+def _user_by_username(session: Session, username: str) -> User | None:
+    """The user for a resolved Windows identity, from the shared cache when it is enabled."""
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        return crud.get_coupon_user_by_username(session=session, username=username)
+    identity = shared_cache.get_or_load(
+        f"user:name:{username}",
+        lambda: _identity(crud.get_coupon_user_by_username(session=session, username=username)),
+    )
+    return session.merge(_detached_user(identity), load=False) if identity else None
+
+
+async def _async_user_by_username(session: AsyncSession, username: str) -> User | None:
+    """`_user_by_username` on an AsyncSession."""
+    statement = select(User).where(User.username == username)
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        return (await session.exec(statement)).first()
+
+    async def load() -> dict[str, Any] | None:
+        return _identity((await session.exec(statement)).first())
+
+    identity = await shared_cache.aget_or_load(f"user:name:{username}", load)
+    return await session.merge(_detached_user(identity), load=False) if identity else None
+
+
 def get_coupon_user(session: SessionDep, 
                     request: Request,
                     token_user: Annotated[User, Depends(get_coupon_user_from_token)] = None) -> User:
@@ -55,27 +116,13 @@ def get_coupon_user(session: SessionDep,
     username, mode = get_windows_user(request)
     if username:
         # Query by username field
-        db_user = crud.get_coupon_user_by_username(session=session, username=username)
+        db_user = _user_by_username(session, username)
         
         if not db_user:
             # Create a new user for Windows authentication
             # Get additional user details if available
             user_details = get_user_details(username)
-            
-            # Map Windows user to roles (this is a simplified approach)
-            roles = ["user"]  # Default role
-            # In a real implementation, you might want to map specific users to admin roles
-            
-            # For Windows authentication, we don't need a real password
-            # Create a user with a simple placeholder password that meets minimum requirements
-            placeholder_password = "win12345"  # Simple 8-char placeholder
-            
-            user_in = UserCreate(
-                username=username,
-                password=placeholder_password,
-                roles=roles,
-                attributes={}  # Empty attributes by default
-            )
+            user_in = _windows_user_create(username)
             
             # Create the user with the coupon user creation function
             db_user = crud.create_coupon_windows_user(session=session, user_create=user_in)
@@ -94,4 +141,39 @@ def get_coupon_user(session: SessionDep,
     )
 
 
-CouponUser = Annotated[User, Depends(get_coupon_user)]
\ No newline at end of file
+CouponUser = Annotated[User, Depends(get_coupon_user)]
+
+
+async def get_async_coupon_user(session: AsyncSessionDep,
+                                request: Request,
+                                authorization: Annotated[str | None, Header()] = None) -> User:
+    """`get_coupon_user` on the request's AsyncSession, for `async def` routes."""
+    username, mode = get_windows_user(request)
+    if username:
+        db_user = await _async_user_by_username(session, username)
+
+        if not db_user:
+            user_in = _windows_user_create(username)
+            # sqlmodel's AsyncSession runs on its own Session class
+            db_user = await session.run_sync(
+                lambda sync_session: crud.create_coupon_windows_user(
+                    session=cast(Session, sync_session), user_create=user_in
+                )
+            )
+        return db_user
+
+    if authorization and authorization.startswith("Bearer "):
+        payload = verify_access_token(authorization.split("Bearer ")[1])
+        user_id = payload.get("sub") if payload else None
+        if user_id:
+            token_user = await session.get(User, user_id)
+            if token_user:
+                return token_user
+
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Missing authentication credentials",
+    )
+
+
+AsyncCouponUser = Annotated[User, Depends(get_async_coupon_user)]
@@ -0,0 +1,184 @@
+import functools
+import inspect
+from collections.abc import AsyncGenerator, Callable
+from contextvars import ContextVar
+from typing import Annotated, Any
+
+from fastapi import Depends, Request
+from fastapi.routing import APIRoute
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.db import get_engine
+from app.core.db_async import get_async_engine
+from app.core.db_replicas import REPLICA_SESSION, choose_read_replica
+
+# The request's session, visible to the endpoint wrapper installed by UnitOfWorkRoute
+_request_session: ContextVar[Session | None] = ContextVar(
+    "request_session", default=None
+)
+_request_async_session: ContextVar[AsyncSession | None] = ContextVar(
+    "request_async_session", default=None
+)
+# Replica sessions from get_read_db / get_async_read_db
+_request_read_session: ContextVar[Session | None] = ContextVar(
+    "request_read_session", default=None
+)
+_request_async_read_session: ContextVar[AsyncSession | None] = ContextVar(
+    "request_async_read_session", default=None
+)
+
+
+async def get_db() -> AsyncGenerator[Session, None]:
+    """One session per request, shared by every dependency that asks for it.
+
+    Both `deps.py` and `deps_coupon.py` re-export this function, so FastAPI's
+    dependency cache hands the same session to the auth chain and the endpoint.
+    A Session only checks out a pooled connection on its first query, so
+    requests that never touch the database never hold one.
+
+    expire_on_commit=False keeps loaded objects readable once the unit of work
+    is closed (see UnitOfWorkRoute), without a reload for serialization.
+    """
+    # Async so the ContextVar is set in the request task rather than a worker thread
+    session = Session(get_engine(), expire_on_commit=False)
+    _request_session.set(session)
+    try:
+        yield session
+    finally:
+        _request_session.set(None)
+        if session.in_transaction():
+            await run_in_threadpool(session.close)
+        else:
+            session.close()
+
+
+SessionDep = Annotated[Session, Depends(get_db)]
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """`get_db` for `async def` routes: waiting on the database holds no thread."""
+    session = AsyncSession(get_async_engine(), expire_on_commit=False)
+    _request_async_session.set(session)
+    try:
+        yield session
+    finally:
+        _request_async_session.set(None)
+        await session.close()
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+async def get_read_db(
+    request: Request, primary: SessionDep
+) -> AsyncGenerator[Session, None]:
+    """Session for read-only endpoints, on a replica when one is usable.
+
+    Falls back to the request's primary session when no replica is configured
+    or in sync, and inside the client's read-your-writes window.
+    """
+    replica = choose_read_replica(request.cookies)
+    if replica is None:
+        yield primary
+        return
+    session = Session(
+        replica.engine, expire_on_commit=False, info={REPLICA_SESSION: True}
+    )
+    _request_read_session.set(session)
+    try:
+        yield session
+    finally:
+        _request_read_session.set(None)
+        if session.in_transaction():
+            await run_in_threadpool(session.close)
+        else:
+            session.close()
+
+
+ReadSessionDep = Annotated[Session, Depends(get_read_db)]
+
+
+async def get_async_read_db(
+    request: Request, primary: AsyncSessionDep
+) -> AsyncGenerator[AsyncSession, None]:
+    """`get_read_db` for `async def` routes."""
+    replica = choose_read_replica(request.cookies)
+    if replica is None:
+        yield primary
+        return
+    session = AsyncSession(
+        replica.async_engine, expire_on_commit=False, info={REPLICA_SESSION: True}
+    )
+    _request_async_read_session.set(session)
+    try:
+        yield session
+    finally:
+        _request_async_read_session.set(None)
+        await session.close()
+
+
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_db)]
+
+
+def end_unit_of_work() -> None:
+    """Return the request's connection to the pool, if it holds one.
+
+    Uncommitted changes are discarded, as they would be when the session closes.
+    """
+    for var in (_request_session, _request_read_session):
+        session = var.get()
+        if session is not None and session.in_transaction():
+            session.close()
+
+
+async def end_unit_of_work_async() -> None:
+    """`end_unit_of_work` for async endpoints, covering both kinds of session."""
+    for async_var in (_request_async_session, _request_async_read_session):
+        async_session = async_var.get()
+        if async_session is not None and async_session.in_transaction():
+            await async_session.close()
+    for var in (_request_session, _request_read_session):
+        session = var.get()
+        if session is not None and session.in_transaction():
+            await run_in_threadpool(session.close)
+
+
+def _end_unit_of_work_after(call: Callable[..., Any]) -> Callable[..., Any]:
+    if getattr(call, "_ends_unit_of_work", False):
+        return call
+
+    if inspect.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def async_endpoint(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                await end_unit_of_work_async()
+
+        async_endpoint._ends_unit_of_work = True  # type: ignore[attr-defined]
+        return async_endpoint
+
+    @functools.wraps(call)
+    def endpoint(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return call(*args, **kwargs)
+        finally:
+            end_unit_of_work()
+
+    endpoint._ends_unit_of_work = True  # type: ignore[attr-defined]
+    return endpoint
+
+
+class UnitOfWorkRoute(APIRoute):
+    """Route that releases the DB connection as soon as the endpoint returns.
+
+    Without this the connection stays checked out through response validation
+    and serialization until the `get_db` teardown runs.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        # functools.wraps keeps the signature, name and docstring FastAPI inspects
+        super().__init__(path, _end_unit_of_work_after(endpoint), **kwargs)
@@ -0,0 +1,46 @@
+"""Conditional GET for the read routes polled by the frontend.
+
+The ETag is weak and built from a version stamp (app.services.versions), not
+from the body: checking it costs one primary-key lookup, so an unchanged
+resource is answered with 304 before the route loads anything. Browsers
+revalidate on their own because of `Cache-Control: private, no-cache`.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(key: str, version: int, *variant: Any) -> str:
+    """ETag of `key` at `version`; `variant` holds the query parameters that shape the body."""
+    digest = hashlib.sha1(
+        json.dumps(variant, default=str, sort_keys=True).encode()
+    ).hexdigest()[:16]
+    return f'W/"{key}.{version}.{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, which may list several tags."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def check_etag(request: Request, response: Response, etag: str) -> Response | None:
+    """The 304 to return when the client already has `etag`, else None.
+
+    Either way the ETag is set, so the full response carries it too.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -11,7 +11,7 @@ from app.core.config import settings
 from app import crud
 from app.models import UserCreateOld as UserCreate
 from app.api.deps import get_db
-from app.core.db import engine
+from app.core.db import get_engine
 from sqlmodel import Session as SqlSession
 
 # Set up logging
@@ -38,7 +38,7 @@ def login_window(request: Request):
     
     try:
         # Create or get user in database
-        with SqlSession(engine) as session:
+        with SqlSession(get_engine()) as session:
             db_user = crud.get_user_by_email(session=session, email=f"{username}@windows.localdomain")
             
             if not db_user:
@@ -1,20 +1,27 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from app.api.deps_coupon import get_db, CouponUser
-from app.core.roles_coupon import require_coupon_admin, require_user
-from app.services.campaign_service import CampaignService
-from app.services.assignment_service import AssignmentService
-from app.models.campaign import Campaign, CampaignCreate, CampaignRead, CampaignUpdate
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.api.deps_coupon import get_async_db, get_async_read_db, AsyncCouponUser
+from app.api.deps_db import UnitOfWorkRoute
+from app.api.etags import check_etag, weak_etag
+from app.core.roles_coupon import require_coupon_admin, require_coupon_manager, require_user
+from app.core.shared_cache import get_shared_cache
+from app.services.campaign_service import AsyncCampaignService
+from app.services.assignment_service import AsyncAssignmentService
+from app.models.campaign import Campaign, CampaignCreate, CampaignRead, CampaignStats, CampaignUpdate
 from app.models.coupon import Coupon, CouponRead
+from app.models.rollup import CampaignTimeseriesPoint
+from app.services.rollups import MAX_TIMESERIES_HOURS, hour_bucket
+from app.services.versions import CAMPAIGNS, aget_version
 
-router = APIRouter(prefix="/campaigns", tags=["campaigns"])
+router = APIRouter(prefix="/campaigns", tags=["campaigns"], route_class=UnitOfWorkRoute)
 
 @router.post("/", response_model=CampaignRead)
-def create_campaign(
+async def create_campaign(
     *,
-    current_user: CouponUser,
-    session: Session = Depends(get_db),
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db),
     campaign_in: CampaignCreate
 ):
     """
@@ -23,51 +30,125 @@ def create_campaign(
     # Check if user has required role
     require_coupon_admin(current_user)
     
-    campaign_service = CampaignService(session)
-    campaign = campaign_service.create_campaign(campaign_in)
+    campaign_service = AsyncCampaignService(session)
+    campaign = await campaign_service.create_campaign(campaign_in)
     return campaign
 
 @router.get("/", response_model=List[CampaignRead])
-def read_campaigns(
-    current_user: CouponUser,
-    session: Session = Depends(get_db),
+async def read_campaigns(
+    current_user: AsyncCouponUser,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_read_db),
+    primary: AsyncSession = Depends(get_async_db),
     skip: int = 0,
     limit: int = 100
 ):
     """
     Retrieve campaigns (all users).
+    Answers 304 when If-None-Match holds the ETag of the current campaigns.
     """
     # Check if user has required role
     require_user(current_user)
-    
-    campaign_service = CampaignService(session)
-    campaigns = campaign_service.get_campaigns(skip=skip, limit=limit)
-    return campaigns
+
+    version = await aget_version(session, CAMPAIGNS)
+    not_modified = check_etag(request, response, weak_etag(CAMPAIGNS, version, skip, limit))
+    if not_modified is not None:
+        return not_modified
+
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        campaign_service = AsyncCampaignService(session)
+        campaigns = await campaign_service.get_campaigns(skip=skip, limit=limit)
+        return campaigns
+
+    async def load() -> list[dict]:
+        # Fill from the primary: a lagging replica would cache rows an invalidation already dropped
+        campaigns = await AsyncCampaignService(primary).get_campaigns(skip=skip, limit=limit)
+        return [CampaignRead.model_validate(c).model_dump(mode="json") for c in campaigns]
+
+    return await shared_cache.aget_or_load(f"campaigns:{skip}:{limit}:{version}", load)
+
+@router.get("/stats", response_model=List[CampaignStats])
+async def read_campaign_stats(
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db),
+):
+    """
+    Total, assigned, redeemed and available coupon counts per campaign (managers and admins).
+    Read on the primary, which fills this worker's cache.
+    """
+    require_coupon_manager(current_user)
+
+    return await AsyncCampaignService(session).get_cached_campaign_stats()
 
 @router.get("/{id}", response_model=CampaignRead)
-def read_campaign(
+async def read_campaign(
     *,
-    current_user: CouponUser,
-    session: Session = Depends(get_db),
+    current_user: AsyncCouponUser,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_read_db),
+    primary: AsyncSession = Depends(get_async_db),
     id: int
 ):
     """
     Get campaign by ID (all users).
+    Answers 304 when If-None-Match holds the ETag of the current campaigns.
     """
     # Check if user has required role
     require_user(current_user)
-    
-    campaign_service = CampaignService(session)
-    campaign = campaign_service.get_campaign(id)
+
+    version = await aget_version(session, CAMPAIGNS)
+    not_modified = check_etag(request, response, weak_etag(CAMPAIGNS, version, id))
+    if not_modified is not None:
+        return not_modified
+
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        campaign_service = AsyncCampaignService(session)
+        campaign = await campaign_service.get_campaign(id)
+    else:
+        async def load() -> dict | None:
+            campaign = await AsyncCampaignService(primary).get_campaign(id)
+            return CampaignRead.model_validate(campaign).model_dump(mode="json") if campaign else None
+
+        campaign = await shared_cache.aget_or_load(f"campaign:{id}:{version}", load)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     return campaign
 
+@router.get("/{id}/timeseries", response_model=List[CampaignTimeseriesPoint])
+async def read_campaign_timeseries(
+    *,
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_read_db),
+    id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Coupons assigned and redeemed per hour (UTC) for a campaign, by default over the last 7 days (managers and admins).
+    """
+    require_coupon_manager(current_user)
+
+    until = hour_bucket(until or datetime.utcnow())
+    since = hour_bucket(since or until - timedelta(days=7))
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    if (until - since) / timedelta(hours=1) >= MAX_TIMESERIES_HOURS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_TIMESERIES_HOURS} hours per request"
+        )
+
+    campaign_service = AsyncCampaignService(session)
+    return await campaign_service.get_campaign_timeseries(id, since, until)
+
 @router.put("/{id}", response_model=CampaignRead)
-def update_campaign(
+async def update_campaign(
     *,
-    current_user: CouponUser,
-    session: Session = Depends(get_db),
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db),
     id: int,
     campaign_in: CampaignUpdate
 ):
@@ -77,21 +158,21 @@ def update_campaign(
     # Check if user has required role
     require_coupon_admin(current_user)
     
-    campaign_service = CampaignService(session)
-    campaign = campaign_service.get_campaign(id)
+    campaign_service = AsyncCampaignService(session)
+    campaign = await campaign_service.get_campaign(id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
         
-    updated_campaign = campaign_service.update_campaign(id, campaign_in)
+    updated_campaign = await campaign_service.update_campaign(id, campaign_in)
     if not updated_campaign:
         raise HTTPException(status_code=400, detail="Campaign update failed")
     return updated_campaign
 
 @router.delete("/{id}", response_model=bool)
-def delete_campaign(
+async def delete_campaign(
     *,
-    current_user: CouponUser,
-    session: Session = Depends(get_db),
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db),
     id: int
 ):
     """
@@ -100,17 +181,17 @@ def delete_campaign(
     # Check if user has required role
     require_coupon_admin(current_user)
     
-    campaign_service = CampaignService(session)
-    success = campaign_service.delete_campaign(id)
+    campaign_service = AsyncCampaignService(session)
+    success = await campaign_service.delete_campaign(id)
     if not success:
         raise HTTPException(status_code=404, detail="Campaign not found")
     return success
 
 @router.post("/{campaign_id}/assign/{user_id}", response_model=CouponRead)
-def assign_campaign_to_user(
+async def assign_campaign_to_user(
     *,
-    current_user: CouponUser,
-    session: Session = Depends(get_db),
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db),
     campaign_id: int,
     user_id: int
 ):
@@ -124,8 +205,8 @@ def assign_campaign_to_user(
     # Check if user has required role
     require_coupon_admin(current_user)
     
-    assignment_service = AssignmentService(session)
-    assigned_coupon = assignment_service.assign_campaign_coupons_to_user(campaign_id, user_id)
+    assignment_service = AsyncAssignmentService(session)
+    assigned_coupon = await assignment_service.assign_campaign_coupons_to_user(campaign_id, user_id)
     
     if not assigned_coupon:
         raise HTTPException(status_code=404, detail="Campaign or user not found, or no unassigned coupons available")
@@ -1,19 +1,23 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select
+from sqlmodel import col, select
+from starlette.concurrency import run_in_threadpool
 
-from app.api.deps_coupon import SessionDep, CouponUser
+from app.api.deps_coupon import ReadSessionDep, SessionDep, CouponUser
+from app.api.deps_db import UnitOfWorkRoute
 from app.models.user import User, UserCreate, UserRead, UserUpdate
 from app import crud
+from app.core.config import settings
 from app.core.roles_coupon import require_coupon_admin
+from app.core.security import get_password_hash_async, get_password_hashes_bulk_async
 
-router = APIRouter(prefix="/coupon-users", tags=["coupon-users"])
+router = APIRouter(prefix="/coupon-users", tags=["coupon-users"], route_class=UnitOfWorkRoute)
 
 @router.get("/", response_model=List[UserRead])
 def read_users(
     *, 
     current_user: CouponUser,
-    session: SessionDep
+    session: ReadSessionDep
 ) -> Any:
     """
     Retrieve all coupon users (admin only).
@@ -33,7 +37,7 @@ def read_user_me(current_user: CouponUser) -> Any:
     return current_user
 
 @router.post("/", response_model=UserRead)
-def create_user(
+async def create_user(
     *, 
     current_user: CouponUser,
     session: SessionDep, 
@@ -46,17 +50,68 @@ def create_user(
     require_coupon_admin(current_user)
     
     # Check if user already exists
-    statement = select(User).where(User.username == user_in.username)
-    existing_user = session.exec(statement).first()
+    existing_user = await run_in_threadpool(
+        crud.get_coupon_user_by_username, session=session, username=user_in.username
+    )
     if existing_user:
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system.",
         )
 
-    user = crud.create_coupon_user(session=session, user_create=user_in)
+    # Hash on the dedicated executor so a burst of sign-ups can't exhaust request threads
+    hashed_password = await get_password_hash_async(user_in.password)
+    user = await run_in_threadpool(
+        crud.create_coupon_user,
+        session=session,
+        user_create=user_in,
+        hashed_password=hashed_password,
+    )
     return user
 
+@router.post("/bulk", response_model=List[UserRead])
+async def create_users_bulk(
+    *,
+    current_user: CouponUser,
+    session: SessionDep,
+    users_in: List[UserCreate]
+) -> Any:
+    """
+    Create many coupon users at once (admin only).
+    Passwords are hashed in a process pool.
+    """
+    # Check if user has required role
+    require_coupon_admin(current_user)
+
+    if len(users_in) > settings.COUPON_USERS_BULK_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.COUPON_USERS_BULK_MAX} users per request.",
+        )
+
+    usernames = [user_in.username for user_in in users_in]
+    if len(set(usernames)) != len(usernames):
+        raise HTTPException(status_code=400, detail="Duplicate usernames in request.")
+
+    statement = select(User.username).where(col(User.username).in_(usernames))
+    existing = await run_in_threadpool(lambda: session.exec(statement).all())
+    if existing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Users already exist in the system: {', '.join(existing)}",
+        )
+
+    hashed_passwords = await get_password_hashes_bulk_async(
+        [user_in.password for user_in in users_in]
+    )
+    users = await run_in_threadpool(
+        crud.create_coupon_users,
+        session=session,
+        users_create=users_in,
+        hashed_passwords=hashed_passwords,
+    )
+    return users
+
 @router.patch("/{user_id}", response_model=UserRead)
 def update_user(
     *,
@@ -1,92 +1,245 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlmodel import Session
-from typing import List, Optional
-from app.api.deps_coupon import get_db, CouponUser
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, List, Literal, Optional
+from app.api.deps_coupon import get_async_db, get_async_read_db, get_db, AsyncCouponUser, CouponUser
+from app.api.deps_db import UnitOfWorkRoute
+from app.api.etags import check_etag, weak_etag
+from app.core.db import get_engine
+from app.core.db_async import get_async_engine
+from app.core.db_replicas import choose_read_replica
+from app.core.metrics import COUPON_IMPORT_DURATION, COUPON_IMPORT_ROWS
 from app.core.roles_coupon import require_coupon_admin, require_coupon_manager, require_user
-from app.services.coupon_service import CouponService
-from app.services.campaign_service import CampaignService
-from app.services.assignment_service import AssignmentService
+from app.services.coupon_export import (
+    ExportStatus,
+    export_filename,
+    export_statement,
+    stream_csv,
+    write_xlsx,
+)
+from app.services.coupon_metadata import MetadataFilters, parse_metadata_filters
+from app.services.coupon_service import AsyncCouponService, CouponService, SearchMatch
+from app.services.counts import CountMode
+from app.services.versions import aget_version, wallet_key
 from app.utils.excel_importer import ExcelImporter
-from app.models.coupon import Coupon, CouponCreate, CouponUpdate, CouponRead
+from app.models.coupon import Coupon, CouponCreate, CouponUpdate, CouponRead, CouponSearchPage
 import json
 import tempfile
 import os
 
-router = APIRouter(prefix="/coupons", tags=["coupons"])
+router = APIRouter(prefix="/coupons", tags=["coupons"], route_class=UnitOfWorkRoute)
+
+
+def _import_coupons(
+    importer: Callable[[str, Session], List[CouponCreate]],
+    file_path: str,
+    session: Session,
+    format: str,
+) -> List[Coupon]:
+    # Import coupons from the file, then create them in the database
+    with COUPON_IMPORT_DURATION.labels(format).time():
+        coupons_data = importer(file_path, session)
+        coupon_service = CouponService(session)
+        coupons = [coupon_service.create_coupon(coupon_data) for coupon_data in coupons_data]
+    COUPON_IMPORT_ROWS.labels(format).inc(len(coupons))
+    return coupons
+
+
+def get_metadata_filters(request: Request) -> MetadataFilters:
+    # The `?meta.<key>=<value>` filters of the listing routes
+    try:
+        return parse_metadata_filters(request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def set_total_count(response: Response, total: Optional[int]) -> None:
+    # Sent as a header so the listings keep returning plain arrays
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+
 
 @router.get("/me", response_model=List[CouponRead])
-def read_my_coupons(
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+async def read_my_coupons(
+    current_user: AsyncCouponUser,
+    request: Request,
+    response: Response,
+    count: CountMode = "none",
+    metadata: MetadataFilters = Depends(get_metadata_filters),
+    session: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get coupons assigned to the current user.
+    Filter on metadata with `meta.<key>=<value>`, e.g. `?meta.store=123`.
+    With count=estimate or count=exact the total is sent as X-Total-Count.
+    Answers 304 when If-None-Match holds the ETag of the current wallet.
     """
-    coupon_service = CouponService(session)
-    coupons = coupon_service.get_user_coupons(current_user.id)
+    assert current_user.id is not None
+    key = wallet_key(current_user.id)
+    etag = weak_etag(key, await aget_version(session, key), count, metadata)
+    not_modified = check_etag(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
+    coupon_service = AsyncCouponService(session)
+    coupons = await coupon_service.get_user_coupons(current_user.id, metadata=metadata)
+    set_total_count(
+        response,
+        await coupon_service.count_coupons(
+            "user", count, {"user_id": current_user.id}, metadata
+        ),
+    )
     return coupons
 
 @router.get("/unassigned", response_model=List[CouponRead])
-def read_unassigned_coupons(
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+async def read_unassigned_coupons(
+    current_user: AsyncCouponUser,
+    response: Response,
+    count: CountMode = "none",
+    metadata: MetadataFilters = Depends(get_metadata_filters),
+    session: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get all unassigned coupons (manager/admin only).
+    Filter on metadata with `meta.<key>=<value>`, e.g. `?meta.store=123`.
+    With count=estimate or count=exact the total is sent as X-Total-Count.
     """
     # Check if user has required role
     require_coupon_manager(current_user)
     
-    coupon_service = CouponService(session)
-    coupons = coupon_service.get_unassigned_coupons()
+    coupon_service = AsyncCouponService(session)
+    coupons = await coupon_service.get_unassigned_coupons(metadata=metadata)
+    set_total_count(
+        response, await coupon_service.count_coupons("unassigned", count, metadata=metadata)
+    )
     return coupons
 
 @router.get("/available", response_model=List[CouponRead])
-def read_available_coupons(
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+async def read_available_coupons(
+    current_user: AsyncCouponUser,
+    response: Response,
+    count: CountMode = "none",
+    metadata: MetadataFilters = Depends(get_metadata_filters),
+    session: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get all available coupons (manager/admin only).
+    Filter on metadata with `meta.<key>=<value>`, e.g. `?meta.store=123`.
+    With count=estimate or count=exact the total is sent as X-Total-Count.
     """
     # Check if user has required role
     require_coupon_manager(current_user)
     
-    coupon_service = CouponService(session)
-    coupons = coupon_service.get_available_coupons()
+    coupon_service = AsyncCouponService(session)
+    coupons = await coupon_service.get_available_coupons(metadata=metadata)
+    set_total_count(
+        response, await coupon_service.count_coupons("available", count, metadata=metadata)
+    )
     return coupons
 
 @router.get("/all", response_model=List[CouponRead])
-def read_all_coupons(
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+async def read_all_coupons(
+    current_user: AsyncCouponUser,
+    response: Response,
+    count: CountMode = "none",
+    metadata: MetadataFilters = Depends(get_metadata_filters),
+    session: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get all coupons (admin only).
+    Filter on metadata with `meta.<key>=<value>`, e.g. `?meta.store=123`.
+    With count=estimate or count=exact the total is sent as X-Total-Count.
     """
     # Check if user has required role
     require_coupon_admin(current_user)
     
-    coupon_service = CouponService(session)
-    coupons = coupon_service.get_coupons()
+    coupon_service = AsyncCouponService(session)
+    coupons = await coupon_service.get_coupons(metadata=metadata)
+    set_total_count(response, await coupon_service.count_coupons("all", count, metadata=metadata))
     return coupons
 
 @router.get("/campaign/{campaign_id}", response_model=List[CouponRead])
-def read_campaign_coupons(
+async def read_campaign_coupons(
     campaign_id: int,
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+    current_user: AsyncCouponUser,
+    response: Response,
+    count: CountMode = "none",
+    metadata: MetadataFilters = Depends(get_metadata_filters),
+    session: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get all coupons for a specific campaign (manager/admin only).
+    Filter on metadata with `meta.<key>=<value>`, e.g. `?meta.store=123`.
+    With count=estimate or count=exact the total is sent as X-Total-Count.
     """
     # Check if user has required role
     require_coupon_manager(current_user)
     
-    coupon_service = CouponService(session)
-    coupons = coupon_service.get_campaign_coupons(campaign_id)
+    coupon_service = AsyncCouponService(session)
+    coupons = await coupon_service.get_campaign_coupons(campaign_id, metadata=metadata)
+    set_total_count(
+        response,
+        await coupon_service.count_coupons(
+            "campaign", count, {"campaign_id": campaign_id}, metadata
+        ),
+    )
     return coupons
 
+@router.get("/search", response_model=CouponSearchPage)
+async def search_coupons(
+    current_user: AsyncCouponUser,
+    q: str = Query(min_length=1, max_length=255),
+    match: SearchMatch = "contains",
+    after: int = 0,
+    limit: int = Query(default=50, ge=1, le=200),
+    session: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Search coupons by code, campaign name or campaign description, case-insensitively (manager/admin only).
+    Pages are ordered by id; pass the returned next_after as `after` for the next one.
+    """
+    # Check if user has required role
+    require_coupon_manager(current_user)
+
+    coupon_service = AsyncCouponService(session)
+    return await coupon_service.search_coupons(q, match, after, limit)
+
+@router.get("/export")
+async def export_coupons(
+    current_user: AsyncCouponUser,
+    request: Request,
+    format: Literal["csv", "xlsx"] = "csv",
+    campaign_id: Optional[int] = None,
+    status: Optional[ExportStatus] = None,
+):
+    """
+    Export every coupon matching the filters as CSV or xlsx (admin only).
+    """
+    # Check if user has required role
+    require_coupon_admin(current_user)
+
+    statement = export_statement(campaign_id, status)
+    filename = export_filename(format, campaign_id, status)
+    replica = choose_read_replica(request.cookies)
+    if format == "csv":
+        engine = replica.async_engine if replica else get_async_engine()
+        return StreamingResponse(
+            stream_csv(engine, statement),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    path = await run_in_threadpool(write_xlsx, replica.engine if replica else get_engine(), statement)
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=filename,
+        background=BackgroundTask(os.unlink, path),
+    )
+
 @router.post("/upload-excel", response_model=List[CouponRead])
 async def upload_coupons_excel(
     current_user: CouponUser,
@@ -107,18 +260,10 @@ async def upload_coupons_excel(
         tmp_file_path = tmp_file.name
 
     try:
-        # Import coupons from Excel
-        coupons_data = ExcelImporter.import_coupons_from_excel(tmp_file_path, session)
-        
-        # Create coupons in database
-        coupon_service = CouponService(session)
-        created_coupons = []
-        
-        for coupon_data in coupons_data:
-            created_coupon = coupon_service.create_coupon(coupon_data)
-            created_coupons.append(created_coupon)
-            
-        return created_coupons
+        # Parsing and inserting block, so run them off the event loop
+        return await run_in_threadpool(
+            _import_coupons, ExcelImporter.import_coupons_from_excel, tmp_file_path, session, "excel"
+        )
     finally:
         # Clean up temporary file
         os.unlink(tmp_file_path)
@@ -143,28 +288,20 @@ async def upload_coupons_json(
         tmp_file_path = tmp_file.name
 
     try:
-        # Import coupons from JSON
-        coupons_data = ExcelImporter.import_coupons_from_json(tmp_file_path, session)
-        
-        # Create coupons in database
-        coupon_service = CouponService(session)
-        created_coupons = []
-        
-        for coupon_data in coupons_data:
-            created_coupon = coupon_service.create_coupon(coupon_data)
-            created_coupons.append(created_coupon)
-            
-        return created_coupons
+        # Parsing and inserting block, so run them off the event loop
+        return await run_in_threadpool(
+            _import_coupons, ExcelImporter.import_coupons_from_json, tmp_file_path, session, "json"
+        )
     finally:
         # Clean up temporary file
         os.unlink(tmp_file_path)
 
 @router.post("/assign", response_model=CouponRead)
-def assign_coupon(
+async def assign_coupon(
     coupon_id: int,
     user_id: int,
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db)
 ):
     """
     Assign a coupon to a user (manager/admin only).
@@ -172,8 +309,8 @@ def assign_coupon(
     # Check if user has required role
     require_coupon_manager(current_user)
     
-    coupon_service = CouponService(session)
-    assigned_coupon = coupon_service.assign_coupon_to_user(coupon_id, user_id)
+    coupon_service = AsyncCouponService(session)
+    assigned_coupon = await coupon_service.assign_coupon_to_user(coupon_id, user_id)
     
     if not assigned_coupon:
         raise HTTPException(status_code=404, detail="Coupon not found or assignment failed")
@@ -181,10 +318,10 @@ def assign_coupon(
     return assigned_coupon
 
 @router.post("/redeem", response_model=CouponRead)
-def redeem_coupon(
+async def redeem_coupon(
     coupon_id: int,
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db)
 ):
     """
     Redeem a coupon (user or admin).
@@ -194,16 +331,16 @@ def redeem_coupon(
     # Check if user has required role
     require_user(current_user)
     
-    coupon_service = CouponService(session)
+    coupon_service = AsyncCouponService(session)
     
     # Check if user is admin or trying to redeem their own coupon
     if "coupon_admin" not in current_user.roles:
         # Regular user - check if coupon is assigned to them
-        coupon = coupon_service.get_coupon(coupon_id)
+        coupon = await coupon_service.get_coupon(coupon_id)
         if not coupon or coupon.assigned_to_user != current_user.id:
             raise HTTPException(status_code=403, detail="Cannot redeem coupon not assigned to you")
     
-    redeemed_coupon = coupon_service.redeem_coupon(coupon_id)
+    redeemed_coupon = await coupon_service.redeem_coupon(coupon_id)
     
     if not redeemed_coupon:
         raise HTTPException(status_code=404, detail="Coupon not found")
@@ -211,10 +348,10 @@ def redeem_coupon(
     return redeemed_coupon
 
 @router.delete("/{id}", response_model=bool)
-def delete_coupon(
+async def delete_coupon(
     id: int,
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a coupon (admin only).
@@ -222,8 +359,8 @@ def delete_coupon(
     # Check if user has required role
     require_coupon_admin(current_user)
     
-    coupon_service = CouponService(session)
-    success = coupon_service.delete_coupon(id)
+    coupon_service = AsyncCouponService(session)
+    success = await coupon_service.delete_coupon(id)
     
     if not success:
         raise HTTPException(status_code=404, detail="Coupon not found")
@@ -231,11 +368,11 @@ def delete_coupon(
     return success
 
 @router.patch("/{id}", response_model=CouponRead)
-def update_coupon(
+async def update_coupon(
     id: int,
     coupon_update: CouponUpdate,
-    current_user: CouponUser,
-    session: Session = Depends(get_db)
+    current_user: AsyncCouponUser,
+    session: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a coupon (manager/admin only).
@@ -243,8 +380,8 @@ def update_coupon(
     # Check if user has required role
     require_coupon_manager(current_user)
     
-    coupon_service = CouponService(session)
-    updated_coupon = coupon_service.update_coupon(id, coupon_update)
+    coupon_service = AsyncCouponService(session)
+    updated_coupon = await coupon_service.update_coupon(id, coupon_update)
     
     if not updated_coupon:
         raise HTTPException(status_code=404, detail="Coupon not found")
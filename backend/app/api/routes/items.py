@@ -2,43 +2,48 @@ import uuid
 from typing import Any
 
 from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from sqlalchemy import bindparam
+from sqlmodel import select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.deps_db import UnitOfWorkRoute
 from app.models import Item, ItemCreate, ItemOut, ItemUpdate, Message
+from app.services.counts import CountMode, cached, resolve_count, table_size
 
-router = APIRouter(prefix="/items", tags=["items"])
+router = APIRouter(prefix="/items", tags=["items"], route_class=UnitOfWorkRoute)
+
+# How read_items answers count=estimate
+ALL_ITEMS_COUNT = table_size(Item.__table__)  # type: ignore[attr-defined]
+OWNED_ITEMS_COUNT = cached(
+    "items:owned", select(Item).where(Item.owner_id == bindparam("owner_id"))
+)
 
 
 @router.get("/", response_model=dict)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    count: CountMode = "exact",
 ) -> Any:
     """
     Retrieve items.
+    count=estimate skips the full COUNT(*); count=none leaves count null.
     """
 
     if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
+        statement = select(Item)
+        params = {}
+        estimate = ALL_ITEMS_COUNT
     else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
-        )
-        items = session.exec(statement).all()
-
-    return {"data": items, "count": count}
+        statement = select(Item).where(Item.owner_id == bindparam("owner_id"))
+        params = {"owner_id": current_user.id}
+        estimate = OWNED_ITEMS_COUNT
+    items = session.exec(statement.offset(skip).limit(limit), params=params).all()
+    total = resolve_count(session, count, statement, params, estimate)
+
+    return {"data": items, "count": total}
 
 
 @router.get("/{id}", response_model=ItemOut)
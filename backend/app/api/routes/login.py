@@ -3,15 +3,17 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
 from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps_db import UnitOfWorkRoute
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.models import Message, NewPassword, UserOutOld
 import app.utils
 
-router = APIRouter(tags=["login"])
+router = APIRouter(tags=["login"], route_class=UnitOfWorkRoute)
 
 # Token-based login removed for IIS Windows Authentication (JWT/OAuth disabled)
 
@@ -41,14 +43,14 @@ def recover_password(email: str, session: SessionDep) -> Message:
 
 
 @router.post("/reset-password/")
-def reset_password(session: SessionDep, body: NewPassword) -> Message:
+async def reset_password(session: SessionDep, body: NewPassword) -> Message:
     """
     Reset password
     """
     email = app.utils.verify_password_reset_token(token=body.token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid token")
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await run_in_threadpool(crud.get_user_by_email, session=session, email=email)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -56,10 +58,10 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         )
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(password=body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     user.hashed_password = hashed_password
     session.add(user)
-    session.commit()
+    await run_in_threadpool(session.commit)
     return Message(message="Password updated successfully")
 
 
@@ -6,7 +6,7 @@ from app.core.security import create_access_token
 from app.core.config import settings
 from app import crud
 from app.models import UserCreateOld as UserCreate
-from app.core.db import engine
+from app.core.db import get_engine
 from sqlmodel import Session as SqlSession
 import secrets
 import logging
@@ -54,7 +54,7 @@ def login_with_windows(request: Request):
     
     try:
         # Create or get user in database
-        with SqlSession(engine) as session:
+        with SqlSession(get_engine()) as session:
             db_user = crud.get_user_by_email(session=session, email=email)
             
             if not db_user:
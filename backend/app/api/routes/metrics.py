@@ -0,0 +1,29 @@
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE, REGISTRY
+
+
+def require_metrics_token(
+    authorization: Annotated[str | None, Header()] = None,
+) -> None:
+    if not settings.METRICS_TOKEN:
+        return
+    expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+    if not secrets.compare_digest((authorization or "").encode(), expected):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+router = APIRouter(tags=["metrics"], dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics() -> Response:
+    """
+    Prometheus metrics, summed over every worker on this host.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
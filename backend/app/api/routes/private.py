@@ -2,15 +2,17 @@ from typing import Any
 
 from fastapi import APIRouter
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import SessionDep
-from app.core.security import get_password_hash
+from app.api.deps_db import UnitOfWorkRoute
+from app.core.security import get_password_hash_async
 from app.models import (
     UserOld as User,
     UserOutOld as UserPublic,
 )
 
-router = APIRouter(tags=["private"], prefix="/private")
+router = APIRouter(tags=["private"], prefix="/private", route_class=UnitOfWorkRoute)
 
 
 class PrivateUserCreate(BaseModel):
@@ -21,7 +23,7 @@ class PrivateUserCreate(BaseModel):
 
 
 @router.post("/users/", response_model=UserPublic)
-def create_user(user_in: PrivateUserCreate, session: SessionDep) -> Any:
+async def create_user(user_in: PrivateUserCreate, session: SessionDep) -> Any:
     """
     Create a new user.
     """
@@ -29,10 +31,11 @@ def create_user(user_in: PrivateUserCreate, session: SessionDep) -> Any:
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
     )
 
     session.add(user)
-    session.commit()
+    await run_in_threadpool(session.commit)
+    await run_in_threadpool(session.refresh, user)
 
     return user
\ No newline at end of file
@@ -3,6 +3,7 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import col, delete, func, select
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
 from app.api.deps import (
@@ -10,8 +11,9 @@ from app.api.deps import (
     SessionDep,
     get_current_active_superuser,
 )
+from app.api.deps_db import UnitOfWorkRoute
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_and_update_password_async
 from app.models import (
     Item,
     Message,
@@ -25,7 +27,7 @@ from app.models import (
 from app.models.user_old import UpdatePassword
 import app.utils
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=UnitOfWorkRoute)
 
 
 @router.get(
@@ -47,23 +49,32 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserOutOld
 )
-def create_user(*, session: SessionDep, user_in: UserCreateOld) -> Any:
+async def create_user(*, session: SessionDep, user_in: UserCreateOld) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await run_in_threadpool(
+        crud.get_user_by_email, session=session, email=user_in.email
+    )
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
+    hashed_password = await get_password_hash_async(user_in.password)
+    user = await run_in_threadpool(
+        crud.create_user,
+        session=session,
+        user_create=user_in,
+        hashed_password=hashed_password,
+    )
     if settings.emails_enabled and user_in.email:
         email_data = app.utils.generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        app.utils.send_email(
+        await run_in_threadpool(
+            app.utils.send_email,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -94,22 +105,30 @@ def update_user_me(
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
+async def update_password_me(
     *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    verified, upgraded_hash = await verify_and_update_password_async(
+        body.current_password, current_user.hashed_password
+    )
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
+        if upgraded_hash:
+            # The password stays, but its hash used an older cost factor
+            current_user.hashed_password = upgraded_hash
+            session.add(current_user)
+            await run_in_threadpool(session.commit)
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
-    session.commit()
+    await run_in_threadpool(session.commit)
     return Message(message="Password updated successfully")
 
 
@@ -136,18 +155,26 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
 
 
 @router.post("/signup", response_model=UserOutOld)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await run_in_threadpool(
+        crud.get_user_by_email, session=session, email=user_in.email
+    )
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
     user_create = UserCreateOld.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
+    hashed_password = await get_password_hash_async(user_create.password)
+    user = await run_in_threadpool(
+        crud.create_user,
+        session=session,
+        user_create=user_create,
+        hashed_password=hashed_password,
+    )
     return user
 
 
@@ -174,7 +201,7 @@ def read_user_by_id(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UserOutOld,
 )
-def update_user(
+async def update_user(
     *,
     session: SessionDep,
     user_id: int,
@@ -184,20 +211,31 @@ def update_user(
     Update a user.
     """
 
-    db_user = session.get(UserOld, user_id)
+    db_user = await run_in_threadpool(session.get, UserOld, user_id)
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await run_in_threadpool(
+            crud.get_user_by_email, session=session, email=user_in.email
+        )
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
 
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    hashed_password = None
+    if user_in.password:
+        hashed_password = await get_password_hash_async(user_in.password)
+    db_user = await run_in_threadpool(
+        crud.update_user,
+        session=session,
+        db_user=db_user,
+        user_in=user_in,
+        hashed_password=hashed_password,
+    )
     return db_user
 
 
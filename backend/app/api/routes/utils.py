@@ -1,11 +1,18 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from sqlmodel import select
 
 from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps_db import UnitOfWorkRoute
+from app.core.db import get_engine
+from app.core.db_async import peek_async_engine
+from app.core.db_pool import get_pool_stats
+from app.core.db_replicas import get_replica_router
 from app.models import Message, UserOld
 import app.utils
 
-router = APIRouter(prefix="/utils", tags=["utils"])
+router = APIRouter(prefix="/utils", tags=["utils"], route_class=UnitOfWorkRoute)
 
 
 @router.get("/test-email", dependencies=[Depends(get_current_active_superuser)])
@@ -19,4 +26,24 @@ def test_email(current_user: CurrentUser, session: SessionDep) -> Message:
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
-    return Message(message="Test email sent")
\ No newline at end of file
+    return Message(message="Test email sent")
+
+
+@router.get("/db-pool", dependencies=[Depends(get_current_active_superuser)])
+def db_pool_stats() -> dict[str, Any]:
+    """
+    Connection pool health for the worker that served this request.
+    """
+    stats = get_pool_stats(get_engine())
+    async_engine = peek_async_engine()
+    if async_engine is not None:
+        stats["async"] = get_pool_stats(async_engine.sync_engine)
+    replica_router = get_replica_router()
+    if replica_router.replicas:
+        stats["replicas"] = [
+            {**status, "pool": get_pool_stats(replica.engine)}
+            for status, replica in zip(
+                replica_router.status(), replica_router.replicas, strict=True
+            )
+        ]
+    return stats
@@ -3,9 +3,10 @@ from typing import Any
 from fastapi import APIRouter, Depends
 
 from app.api.deps import CurrentUser
+from app.api.deps_db import UnitOfWorkRoute
 from app.core.windows_user import get_windows_user
 
-router = APIRouter()
+router = APIRouter(route_class=UnitOfWorkRoute)
 
 @router.get("/me", tags=["auth"])  # exposed at /api/v1/me
 def read_me(current_user: CurrentUser) -> Any:
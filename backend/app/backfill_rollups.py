@@ -0,0 +1,34 @@
+"""Rebuild the hourly campaign rollups from the coupon table.
+
+Run once after deploying the rollup table, or to repair drift:
+
+    python -m app.backfill_rollups
+    python -m app.backfill_rollups --campaign-id 3
+"""
+
+import argparse
+import logging
+
+from sqlmodel import Session
+
+from app.core.db import create_db_tables, get_engine
+from app.services.rollups import backfill_rollups
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--campaign-id", type=int, help="only rebuild this campaign")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    create_db_tables(engine)
+    with Session(engine) as session:
+        buckets = backfill_rollups(session, campaign_id=args.campaign_id)
+    logger.info("Wrote %d hourly buckets", buckets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# In-process benchmarks, run with `python -m app.benchmarks.<name>`
@@ -0,0 +1,363 @@
+"""Assign and redeem storms against a running instance, like a 9am campaign launch.
+
+Seeds a campaign, its coupons and a set of users (each holding a few coupons)
+straight into the instance's database, then has `--concurrency` virtual users
+hammer it over HTTP with a weighted mix of:
+
+- `me`: GET /coupons/me as one of the users;
+- `redeem`: POST /coupons/redeem for a coupon in that user's wallet; virtual
+  users outnumber users, so several of them redeem the same wallet at once;
+- `assign`: POST /campaigns/{id}/assign/{user_id} as an admin, for a random user;
+- `upload`: POST /coupons/upload-json of `--upload-size` new coupons for the
+  campaign, as an admin.
+
+Users are identified by the X-Forwarded-User header, so the instance needs the
+`iis_header` identity resolver (the default). It reports throughput, error rates
+and p50/p95/p99 latency per operation, then checks that no coupon was handed out
+by two assignments and none was redeemed twice, and exits non-zero otherwise.
+
+    fastapi run --workers 4 app/main.py
+    python -m app.benchmarks.assign_redeem_storm --users 300 --concurrency 200 \\
+        --duration 30 --mix me=60,redeem=25,assign=10,upload=5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import create_app_engine, create_db_tables
+from app.models import Campaign, Coupon, User
+
+OPERATIONS = ("me", "redeem", "assign", "upload")
+
+
+@dataclass
+class Seeded:
+    run_id: str
+    admin: str
+    campaign_id: int
+    # username -> user id
+    users: dict[str, int]
+
+
+def seed(url: str, run_id: str, users: int, coupons: int, wallet: int) -> Seeded:
+    """A campaign with `coupons` unassigned coupons, plus `wallet` held by each user."""
+    engine = create_app_engine(url)
+    create_db_tables(engine)
+    with Session(engine) as session:
+        admin = User(
+            username=f"storm.{run_id}.admin",
+            hashed_password="!",
+            roles=["coupon_admin"],
+        )
+        people = [
+            User(
+                username=f"storm.{run_id}.u{i:05d}", hashed_password="!", roles=["user"]
+            )
+            for i in range(users)
+        ]
+        campaign = Campaign(name=f"storm-{run_id}")
+        session.add_all([admin, campaign, *people])
+        session.commit()
+        session.add_all(
+            Coupon(code=f"STORM-{run_id}-{i:07d}", campaign_id=campaign.id)
+            for i in range(coupons)
+        )
+        session.add_all(
+            Coupon(
+                code=f"STORM-{run_id}-W{user.id}-{i}",
+                campaign_id=campaign.id,
+                assigned_to_user=user.id,
+                assigned_at=campaign.created_at,
+            )
+            for user in people
+            for i in range(wallet)
+        )
+        session.commit()
+        user_ids: dict[str, int] = {}
+        for user in people:
+            assert user.id is not None
+            user_ids[user.username] = user.id
+        assert campaign.id is not None
+        seeded = Seeded(run_id, admin.username, campaign.id, user_ids)
+    engine.dispose()
+    return seeded
+
+
+@dataclass
+class Storm:
+    # (operation, HTTP status or 0 for a transport error, seconds)
+    outcomes: list[tuple[str, int, float]] = field(default_factory=list)
+    # coupon id -> user id of every successful assignment
+    assignments: dict[int, list[int]] = field(default_factory=lambda: defaultdict(list))
+    # coupon id -> redeemed_at of every successful redemption; a repeated
+    # redemption of a redeemed coupon returns the first one's timestamp
+    redemptions: dict[int, set[str]] = field(default_factory=lambda: defaultdict(set))
+    # username -> coupons from the user's latest /coupons/me
+    wallets: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    uploads: int = 0
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown operation {name!r}; use {OPERATIONS}"
+            )
+        weights[name] = float(weight)
+    return weights
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        seeded: Seeded,
+        username: str,
+        storm: Storm,
+        upload_size: int,
+    ) -> None:
+        self.client = client
+        self.seeded = seeded
+        self.username = username
+        self.storm = storm
+        self.upload_size = upload_size
+
+    async def request(
+        self, operation: str, method: str, path: str, user: str, **kwargs: Any
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            r = await self.client.request(
+                method,
+                f"{settings.API_V1_STR}{path}",
+                headers={"X-Forwarded-User": user},
+                **kwargs,
+            )
+        except httpx.HTTPError:
+            self.storm.outcomes.append((operation, 0, time.perf_counter() - start))
+            return None
+        self.storm.outcomes.append(
+            (operation, r.status_code, time.perf_counter() - start)
+        )
+        return r.json() if r.is_success else None
+
+    async def me(self) -> None:
+        wallet = await self.request("me", "GET", "/coupons/me", self.username)
+        if wallet is not None:
+            self.storm.wallets[self.username] = wallet
+
+    async def redeem(self) -> None:
+        candidates = [
+            c for c in self.storm.wallets.get(self.username, []) if not c["redeemed"]
+        ]
+        if not candidates:
+            await self.me()
+            return
+        coupon_id = random.choice(candidates)["id"]
+        coupon = await self.request(
+            "redeem",
+            "POST",
+            "/coupons/redeem",
+            self.username,
+            params={"coupon_id": coupon_id},
+        )
+        if coupon is not None:
+            self.storm.redemptions[coupon_id].add(coupon["redeemed_at"])
+
+    async def assign(self) -> None:
+        user_id = random.choice(list(self.seeded.users.values()))
+        coupon = await self.request(
+            "assign",
+            "POST",
+            f"/campaigns/{self.seeded.campaign_id}/assign/{user_id}",
+            self.seeded.admin,
+        )
+        if coupon is not None:
+            self.storm.assignments[coupon["id"]].append(user_id)
+
+    async def upload(self) -> None:
+        self.storm.uploads += 1
+        batch = (
+            f"STORM-{self.seeded.run_id}-UP{self.storm.uploads}-{uuid.uuid4().hex[:6]}"
+        )
+        rows = [
+            {"code": f"{batch}-{i}", "campaign_name": f"storm-{self.seeded.run_id}"}
+            for i in range(self.upload_size)
+        ]
+        await self.request(
+            "upload",
+            "POST",
+            "/coupons/upload-json",
+            self.seeded.admin,
+            files={"file": ("coupons.json", json.dumps(rows), "application/json")},
+        )
+
+    async def run(self, mix: dict[str, float], deadline: float) -> None:
+        operations, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            operation = random.choices(operations, weights)[0]
+            await getattr(self, operation)()
+
+
+async def run_storm(
+    base_url: str,
+    seeded: Seeded,
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    upload_size: int,
+) -> tuple[Storm, float]:
+    storm = Storm()
+    usernames = list(seeded.users)
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=60, limits=limits
+    ) as client:
+        users = [
+            VirtualUser(
+                client, seeded, usernames[i % len(usernames)], storm, upload_size
+            )
+            for i in range(concurrency)
+        ]
+        # Fill every wallet before the storm, as the frontend would on page load
+        await asyncio.gather(*(user.me() for user in users[: len(usernames)]))
+        storm.outcomes.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(user.run(mix, start + duration) for user in users))
+        elapsed = time.perf_counter() - start
+    return storm, elapsed
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def report(storm: Storm, elapsed: float) -> None:
+    print(
+        f"{len(storm.outcomes)} requests in {elapsed:.1f} s, {len(storm.outcomes) / elapsed:.0f} req/s"
+    )
+    print(
+        f"{'operation':<10} {'requests':>9} {'req/s':>8} {'errors':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses"
+    )
+    for operation in (*OPERATIONS, "all"):
+        outcomes = [o for o in storm.outcomes if operation in ("all", o[0])]
+        if not outcomes:
+            continue
+        latencies = sorted(seconds * 1000 for _, _, seconds in outcomes)
+        statuses = Counter(status for _, status, _ in outcomes)
+        errors = sum(n for status, n in statuses.items() if not 200 <= status < 400)
+        print(
+            f"{operation:<10} {len(outcomes):>9} {len(outcomes) / elapsed:>8.1f} "
+            f"{errors / len(outcomes):>7.1%} {percentile(latencies, 0.5):>8.1f} "
+            f"{percentile(latencies, 0.95):>8.1f} {percentile(latencies, 0.99):>8.1f}  "
+            + " ".join(
+                f"{status or 'conn'}:{n}" for status, n in sorted(statuses.items())
+            )
+        )
+
+
+def check_invariants(url: str, seeded: Seeded, storm: Storm) -> list[str]:
+    """Violations seen in the responses, confirmed against the database."""
+    engine = create_app_engine(url)
+    violations = []
+    with Session(engine) as session:
+        coupons = {
+            c.id: c
+            for c in session.exec(
+                select(Coupon).where(Coupon.campaign_id == seeded.campaign_id)
+            )
+        }
+        for coupon_id, user_ids in sorted(storm.assignments.items()):
+            if len(user_ids) > 1:
+                violations.append(
+                    f"coupon {coupon_id} assigned {len(user_ids)} times (users {user_ids}), "
+                    f"now held by {coupons[coupon_id].assigned_to_user}"
+                )
+        for coupon_id, timestamps in sorted(storm.redemptions.items()):
+            if len(timestamps) > 1:
+                violations.append(
+                    f"coupon {coupon_id} redeemed {len(timestamps)} times: {sorted(timestamps)}"
+                )
+            if not coupons[coupon_id].redeemed:
+                violations.append(
+                    f"coupon {coupon_id} was redeemed but is not marked redeemed"
+                )
+        for coupon in coupons.values():
+            if coupon.redeemed and coupon.assigned_to_user is None:
+                violations.append(
+                    f"coupon {coupon.id} is redeemed but assigned to nobody"
+                )
+    engine.dispose()
+    return violations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--database-url",
+        default=settings.SQLALCHEMY_DATABASE_URI,
+        help="the instance's database, for seeding and the final checks",
+    )
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument(
+        "--coupons", type=int, default=5000, help="unassigned coupons to seed"
+    )
+    parser.add_argument("--wallet", type=int, default=3, help="coupons seeded per user")
+    parser.add_argument("--concurrency", type=int, default=200, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument(
+        "--mix", type=parse_mix, default="me=60,redeem=25,assign=10,upload=5"
+    )
+    parser.add_argument(
+        "--upload-size", type=int, default=100, help="coupons per upload"
+    )
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    seeded = seed(args.database_url, run_id, args.users, args.coupons, args.wallet)
+    print(
+        f"run {run_id}: campaign {seeded.campaign_id}, {args.users} users, "
+        f"{args.coupons} coupons, {args.concurrency} virtual users for {args.duration:g} s"
+    )
+    storm, elapsed = asyncio.run(
+        run_storm(
+            args.base_url,
+            seeded,
+            args.mix,
+            args.concurrency,
+            args.duration,
+            args.upload_size,
+        )
+    )
+    report(storm, elapsed)
+
+    violations = check_invariants(args.database_url, seeded, storm)
+    if violations:
+        print(f"\n{len(violations)} invariant violations:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("\ninvariants hold: no coupon assigned twice, no double redemption")
+
+
+if __name__ == "__main__":
+    main()
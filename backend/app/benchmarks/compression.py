@@ -0,0 +1,144 @@
+"""CPU cost against bytes saved for each encoding of CompressionMiddleware.
+
+Compresses realistic listing bodies (coupons with metadata_, users) with every
+installed encoder at a few levels, the way the middleware does (streamed in
+64 KB chunks). For each it reports the size, the CPU time per response, and the
+break-even link speed: the bandwidth below which the time saved on the wire
+exceeds the time spent compressing. Store links slower than that number win.
+
+    python -m app.benchmarks.compression --coupons 1000 --rounds 20
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from functools import partial
+
+from app.core.middleware.compression import (
+    BROTLI_AVAILABLE,
+    ZSTD_AVAILABLE,
+    BrotliCompressor,
+    Compressor,
+    GzipCompressor,
+    ZstdCompressor,
+)
+
+CHUNK_SIZE = 64 * 1024
+START = datetime(2025, 3, 1, 9, 0)
+
+
+def coupon_listing(count: int) -> bytes:
+    """A GET /coupons/all body: CouponRead rows with import metadata."""
+    return json.dumps(
+        [
+            {
+                "code": f"LNV-OCT-{i:06d}",
+                "campaign_id": 1 + i % 12,
+                "assigned_to_user": 1000 + i if i % 3 else None,
+                "assigned_at": (START + timedelta(minutes=i)).isoformat()
+                if i % 3
+                else None,
+                "redeemed": i % 5 == 0,
+                "redeemed_at": (START + timedelta(hours=i)).isoformat()
+                if i % 5 == 0
+                else None,
+                "metadata_": {
+                    "store": 100 + i % 40,
+                    "tier": ["gold", "silver"][i % 2],
+                    "sku": f"SKU-{i % 250}",
+                },
+                "created_at": START.isoformat(),
+                "updated_at": (START + timedelta(minutes=i)).isoformat(),
+                "id": i + 1,
+            }
+            for i in range(count)
+        ]
+    ).encode()
+
+
+def user_listing(count: int) -> bytes:
+    """A coupon user listing body."""
+    return json.dumps(
+        [
+            {
+                "id": i + 1,
+                "username": f"t{i % 9}.user.{i:05d}",
+                "email": f"t{i % 9}.user.{i:05d}@windows.localdomain",
+                "full_name": f"User {i:05d}",
+                "roles": ["user"] if i % 20 else ["user", "coupon_manager"],
+                "is_active": True,
+            }
+            for i in range(count)
+        ]
+    ).encode()
+
+
+def encoders() -> dict[str, Callable[[], Compressor]]:
+    variants: dict[str, Callable[[], Compressor]] = {
+        f"gzip-{level}": partial(GzipCompressor, level) for level in (1, 6, 9)
+    }
+    if BROTLI_AVAILABLE:
+        variants.update({f"br-{q}": partial(BrotliCompressor, q) for q in (1, 4, 9)})
+    if ZSTD_AVAILABLE:
+        variants.update(
+            {f"zstd-{level}": partial(ZstdCompressor, level) for level in (1, 3, 9)}
+        )
+    return variants
+
+
+def compress(factory: Callable[[], Compressor], body: bytes) -> bytes:
+    compressor = factory()
+    out = [
+        compressor.compress(body[i : i + CHUNK_SIZE])
+        for i in range(0, len(body), CHUNK_SIZE)
+    ]
+    out.append(compressor.finish())
+    return b"".join(out)
+
+
+def measure(
+    factory: Callable[[], Compressor], body: bytes, rounds: int
+) -> tuple[int, float]:
+    """Return the compressed size and the best CPU seconds per response."""
+    size = len(compress(factory, body))
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.process_time()
+        compress(factory, body)
+        best = min(best, time.process_time() - start)
+    return size, best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--coupons", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    if not (BROTLI_AVAILABLE and ZSTD_AVAILABLE):
+        print("brotli / zstandard not installed: only gzip is measured\n")
+    bodies = {
+        f"{args.coupons} coupons": coupon_listing(args.coupons),
+        f"{args.users} users": user_listing(args.users),
+    }
+    print(
+        f"{'payload':<16} {'encoding':<9} {'bytes':>10} {'ratio':>7} "
+        f"{'cpu ms':>8} {'MB/s':>8} {'break-even Mbit/s':>18}"
+    )
+    for payload, body in bodies.items():
+        print(f"{payload:<16} {'identity':<9} {len(body):>10}")
+        for name, factory in encoders().items():
+            size, seconds = measure(factory, body, args.rounds)
+            saved_bits = (len(body) - size) * 8
+            print(
+                f"{payload:<16} {name:<9} {size:>10} {len(body) / size:>7.1f} "
+                f"{seconds * 1000:>8.2f} {len(body) / seconds / 1e6:>8.0f} "
+                f"{saved_bits / seconds / 1e6:>18.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
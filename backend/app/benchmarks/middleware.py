@@ -0,0 +1,89 @@
+"""Per-request overhead of WindowsAuthMiddleware, before and after the ASGI rewrite.
+
+Drives a minimal Starlette app in process through httpx's ASGI transport, so
+the numbers exclude the network and the server and only show middleware cost.
+
+    python -m app.benchmarks.middleware --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+from app.core.middleware.windows_auth import WindowsAuthMiddleware
+
+
+class LegacyWindowsAuthMiddleware(BaseHTTPMiddleware):
+    """The previous BaseHTTPMiddleware-based implementation, kept for comparison."""
+
+    async def dispatch(
+        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        request.state.windows_user = request.headers.get("X-Forwarded-User")
+        return await call_next(request)
+
+
+async def whoami(request: Request) -> Response:
+    return PlainTextResponse(getattr(request.state, "windows_user", None) or "")
+
+
+def build_app(middleware: list[Middleware]) -> Starlette:
+    return Starlette(routes=[Route("/whoami", whoami)], middleware=middleware)
+
+
+async def measure(app: Starlette, requests: int, warmup: int) -> float:
+    """Return mean seconds per request."""
+    transport = httpx.ASGITransport(app=app)
+    headers = {"X-Forwarded-User": "DOMAIN\\bench"}
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for _ in range(warmup):
+            await client.get("/whoami", headers=headers)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/whoami", headers=headers)
+        return (time.perf_counter() - start) / requests
+
+
+async def run(requests: int, warmup: int, rounds: int) -> dict[str, float]:
+    """Interleave the variants over several rounds and keep each one's best mean."""
+    variants = {
+        "no middleware": build_app([]),
+        "BaseHTTPMiddleware (before)": build_app(
+            [Middleware(LegacyWindowsAuthMiddleware)]
+        ),
+        "pure ASGI (after)": build_app([Middleware(WindowsAuthMiddleware)]),
+    }
+    best = {name: float("inf") for name in variants}
+    for _ in range(rounds):
+        for name, app in variants.items():
+            best[name] = min(best[name], await measure(app, requests, warmup))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.warmup, args.rounds))
+    baseline = results["no middleware"]
+    print(f"{'variant':<30} {'us/request':>12} {'overhead us':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<30} {seconds * 1e6:>12.1f} {(seconds - baseline) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
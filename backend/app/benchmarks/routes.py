@@ -0,0 +1,347 @@
+"""Where the time of a request goes outside the services, route by route.
+
+Drives `app.main.app`, with its real middleware stack and lifespan, in process
+through httpx's ASGI transport against a scratch SQLite database. For each
+route it splits the mean latency into:
+
+- each middleware layer, from ServerErrorMiddleware down to ExceptionMiddleware,
+  counting both its way in and its work on the response messages it sends out;
+- "routing": route matching, request parsing, rendering the JSON body and
+  closing the dependencies' exit stack;
+- "dependencies": solving the route's dependencies, i.e. the auth chain and
+  the session;
+- "handler": the endpoint function, services included;
+- "serialization": validating the result against the response model;
+- "client": httpx and its ASGI transport.
+
+A second pass under tracemalloc reports each phase's peak of memory allocated
+above what was in use when it started, including everything it called.
+
+    python -m app.benchmarks.routes --requests 2000
+    python -m app.benchmarks.routes --route coupons.me --json routes.json
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+import fastapi.routing
+import httpx
+from sqlmodel import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import db, db_async
+from app.core.config import settings
+from app.core.db import create_app_engine, create_db_tables
+from app.core.db_async import create_app_async_engine
+from app.main import app
+from app.models import Campaign, Coupon, User
+
+USERNAME = "bench.routes"
+API = settings.API_V1_STR
+
+# name -> (path, extra headers); "etag" is replaced by the route's current ETag
+ROUTES: dict[str, tuple[str, dict[str, str]]] = {
+    "windows-user": (f"{API}/windows-user", {}),
+    # The sync auth chain (CouponUser), and the async one (AsyncCouponUser) below
+    "users.me": (f"{API}/coupon-users/me", {}),
+    "coupons.me": (f"{API}/coupons/me", {}),
+    "coupons.me 304": (f"{API}/coupons/me", {"If-None-Match": "etag"}),
+    "coupons.all": (f"{API}/coupons/all?limit=100", {}),
+    "campaigns": (f"{API}/campaigns/", {}),
+    "campaigns.stats": (f"{API}/campaigns/stats", {}),
+}
+ROUTE_PHASES = ("dependencies", "handler", "serialization")
+
+
+class Profile:
+    """Phase timings of the request in flight and, when tracing, its memory peaks."""
+
+    def __init__(self) -> None:
+        self.tracing = False
+        # Per request: middleware layer -> seconds spent below it, minus time in its send
+        self.net: dict[str, float] = {}
+        self.route: defaultdict[str, float] = defaultdict(float)
+        # Totals over the measured requests
+        self.seconds: defaultdict[str, float] = defaultdict(float)
+        self.peaks: Counter[str] = Counter()
+        # [bytes in use on entry, highest bytes in use seen]
+        self._frames: list[list[int]] = []
+
+    def enter(self) -> None:
+        if not self.tracing:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if self._frames:
+            self._frames[-1][1] = max(self._frames[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._frames.append([current, current])
+
+    def exit(self, phase: str) -> None:
+        if not self.tracing:
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        entry, highest = self._frames.pop()
+        highest = max(highest, peak)
+        self.peaks[phase] += highest - entry
+        if self._frames:
+            self._frames[-1][1] = max(self._frames[-1][1], highest)
+        tracemalloc.reset_peak()
+
+    def finish_request(self, layers: list[str], elapsed: float) -> None:
+        """Turn the request's nested timings into exclusive ones and add them up."""
+        nets = [self.net[layer] for layer in layers]
+        for layer, net, inner in zip(layers[:-1], nets[:-1], nets[1:], strict=True):
+            self.seconds[layer] += net - inner
+        self.seconds["routing"] += nets[-1] - sum(self.route.values())
+        for phase, seconds in self.route.items():
+            self.seconds[phase] += seconds
+        self.seconds["client"] += elapsed - nets[0]
+        self.net.clear()
+        self.route.clear()
+
+
+class TimedLayer:
+    """Stands in front of one layer of the stack and times calls into it."""
+
+    def __init__(self, name: str, app: ASGIApp, profile: Profile) -> None:
+        self.name = name
+        self.app = app
+        self.profile = profile
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        sent = 0.0
+
+        async def timed_send(message: Message) -> None:
+            nonlocal sent
+            start = time.perf_counter()
+            await send(message)
+            sent += time.perf_counter() - start
+
+        self.profile.enter()
+        start = time.perf_counter()
+        await self.app(scope, receive, timed_send)
+        self.profile.net[self.name] = time.perf_counter() - start - sent
+        self.profile.exit(self.name)
+
+
+def timed_phase(
+    phase: str, fn: Callable[..., Awaitable[Any]], profile: Profile
+) -> Callable[..., Awaitable[Any]]:
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profile.enter()
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            profile.route[phase] += time.perf_counter() - start
+            profile.exit(phase)
+
+    return wrapper
+
+
+def instrument(profile: Profile) -> list[str]:
+    """Time every middleware layer and the router's phases; returns the layers, outermost first."""
+    # FastAPI's request handler looks these up in its module on every request
+    for phase, name in zip(
+        ROUTE_PHASES,
+        ("solve_dependencies", "run_endpoint_function", "serialize_response"),
+        strict=True,
+    ):
+        setattr(
+            fastapi.routing,
+            name,
+            timed_phase(phase, getattr(fastapi.routing, name), profile),
+        )
+
+    stack = app.build_middleware_stack()
+    # Middleware instances: each holds the next layer in .app, which ASGIApp lacks
+    layers: list[Any] = []
+    node: Any = stack
+    while node is not app.router:
+        layers.append(node)
+        node = node.app
+    names = [type(layer).__name__ for layer in layers]
+    for layer, inner in zip(layers, names[1:] + ["router"], strict=True):
+        layer.app = TimedLayer(inner, layer.app, profile)
+    app.middleware_stack = TimedLayer(names[0], stack, profile)
+    return names + ["router"]
+
+
+def use_database(url: str, coupons: int) -> None:
+    """Seed a scratch database and hand its engines to app.core.db and db_async."""
+    engine = create_app_engine(url)
+    create_db_tables(engine)
+    with Session(engine) as session:
+        user = User(
+            username=USERNAME, hashed_password="!", roles=["user", "coupon_admin"]
+        )
+        campaign = Campaign(name="routes-bench")
+        session.add_all([user, campaign])
+        session.commit()
+        session.add_all(
+            Coupon(
+                code=f"ROUTES-{i:06d}",
+                campaign_id=campaign.id,
+                assigned_to_user=user.id if i < 20 else None,
+                metadata_={"store": 100 + i % 40, "tier": "gold"},
+            )
+            for i in range(coupons)
+        )
+        session.commit()
+    # Both create their engine on first use from the settings; these take its place
+    db._engine = engine
+    db_async._async_engine = create_app_async_engine(url)
+
+
+async def send_requests(
+    client: httpx.AsyncClient,
+    path: str,
+    headers: dict[str, str],
+    requests: int,
+    on_response: Callable[[float], None] = lambda elapsed: None,
+) -> None:
+    """GET `path` one request after the other; `on_response` gets each one's seconds."""
+    for _ in range(requests):
+        start = time.perf_counter()
+        r = await client.get(path, headers=headers)
+        on_response(time.perf_counter() - start)
+        if not r.is_success and r.status_code != 304:
+            raise RuntimeError(f"GET {path}: {r.status_code} {r.text[:200]}")
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    profile: Profile,
+    layers: list[str],
+    path: str,
+    headers: dict[str, str],
+    requests: int,
+) -> dict[str, float]:
+    """Mean seconds per request in each phase."""
+    profile.seconds.clear()
+    profile.peaks.clear()
+    await send_requests(
+        client,
+        path,
+        headers,
+        requests,
+        lambda elapsed: profile.finish_request(layers, elapsed),
+    )
+    return {phase: seconds / requests for phase, seconds in profile.seconds.items()}
+
+
+async def run(
+    names: list[str], requests: int, warmup: int, rounds: int, alloc_requests: int
+) -> tuple[list[str], dict[str, dict[str, Any]]]:
+    """The instrumented layers, and each route's mean seconds and peak bytes per phase."""
+    profile = Profile()
+    layers = instrument(profile)
+    results: dict[str, dict[str, Any]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            for name in names:
+                path, extra = ROUTES[name]
+                headers = {"X-Forwarded-User": USERNAME}
+                if "If-None-Match" in extra:
+                    first = await client.get(path, headers=headers)
+                    headers["If-None-Match"] = first.headers["ETag"]
+                await send_requests(client, path, headers, warmup)
+                profile.net.clear()
+                profile.route.clear()
+
+                # Keep the round with the lowest total, to damp noise
+                best: dict[str, float] | None = None
+                for _ in range(rounds):
+                    phases = await measure(
+                        client, profile, layers, path, headers, requests
+                    )
+                    if best is None or sum(phases.values()) < sum(best.values()):
+                        best = phases
+
+                profile.tracing = True
+                tracemalloc.start()
+                try:
+                    await measure(
+                        client, profile, layers, path, headers, alloc_requests
+                    )
+                finally:
+                    tracemalloc.stop()
+                    profile.tracing = False
+                peaks = {
+                    phase: peak / alloc_requests
+                    for phase, peak in profile.peaks.items()
+                }
+                results[name] = {"seconds": best, "peak_bytes": peaks}
+    return layers, results
+
+
+def report(results: dict[str, dict[str, Any]], layers: list[str]) -> None:
+    order = ["client", *layers[:-1], "routing", *ROUTE_PHASES]
+    print("µs are the phase's own; peak KB includes everything the phase called")
+    for name, result in results.items():
+        seconds, peaks = result["seconds"], result["peak_bytes"]
+        total = sum(seconds.values())
+        print(f"\n{name}: {ROUTES[name][0]}  {total * 1e6:.0f} µs/request")
+        print(f"  {'phase':<28} {'µs':>8} {'share':>6} {'peak KB':>8}")
+        for phase in order:
+            if phase not in seconds:
+                continue
+            # Peaks are recorded per layer below the router, and per router phase
+            peak = peaks.get("router" if phase == "routing" else phase)
+            print(
+                f"  {phase:<28} {seconds[phase] * 1e6:>8.1f} {seconds[phase] / total:>6.0%} "
+                f"{'' if peak is None else f'{peak / 1024:.1f}':>8}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--route",
+        action="append",
+        choices=list(ROUTES),
+        help="repeatable (default: all)",
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--alloc-requests", type=int, default=100, help="requests traced by tracemalloc"
+    )
+    parser.add_argument(
+        "--coupons", type=int, default=500, help="coupons seeded, 20 held by the user"
+    )
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_database(f"sqlite:///{directory}/routes.db", args.coupons)
+        layers, results = asyncio.run(
+            run(
+                args.route or list(ROUTES),
+                args.requests,
+                args.warmup,
+                args.rounds,
+                args.alloc_requests,
+            )
+        )
+    report(results, layers)
+    if args.json:
+        args.json.write_text(
+            json.dumps({"layers": layers, "routes": results}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    main()
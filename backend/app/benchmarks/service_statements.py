@@ -0,0 +1,133 @@
+"""Per-call cost of the hot service queries, built inline vs precompiled.
+
+"inline" builds the select on every call, as the services used to. "prebuilt"
+executes the module-level statements from app.services.statements with bound
+parameters. Both run the same query against an in-memory SQLite database, so the
+difference is Python time spent building the statement and its cache key. The
+exception is "claim": the old inline version loaded every unassigned coupon of the
+campaign, and the prebuilt one loads only the first.
+
+    python -m app.benchmarks.service_statements --calls 5000
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlmodel import Session, SQLModel, col, create_engine, select
+
+from app.models import Campaign, Coupon, User
+from app.services import statements
+
+
+def seed(session: Session) -> tuple[int, int]:
+    user = User(username="bench\\statements", hashed_password="x")
+    campaign = Campaign(name="statements")
+    session.add(user)
+    session.add(campaign)
+    session.commit()
+    session.add_all(
+        Coupon(
+            code=f"STMT-{i:04d}",
+            campaign_id=campaign.id,
+            assigned_to_user=user.id if i < 5 else None,
+        )
+        for i in range(50)
+    )
+    session.commit()
+    assert user.id is not None and campaign.id is not None
+    return user.id, campaign.id
+
+
+def build_queries(
+    user_id: int, campaign_id: int
+) -> dict[str, tuple[Callable[[Session], Any], Callable[[Session], Any]]]:
+    """(inline, prebuilt) pair per query."""
+    page = {"skip": 0, "limit": 100}
+    return {
+        "wallet": (
+            lambda s: s.exec(
+                select(Coupon).where(Coupon.assigned_to_user == user_id)
+            ).all(),
+            lambda s: s.exec(
+                statements.USER_COUPONS, params={"user_id": user_id}
+            ).all(),
+        ),
+        "available": (
+            lambda s: s.exec(
+                select(Coupon)
+                .where(col(Coupon.assigned_to_user).is_(None), Coupon.redeemed == False)  # noqa: E712
+                .offset(0)
+                .limit(100)
+            ).all(),
+            lambda s: s.exec(statements.AVAILABLE_COUPONS, params=page).all(),
+        ),
+        "campaign": (
+            lambda s: s.exec(
+                select(Coupon)
+                .where(Coupon.campaign_id == campaign_id)
+                .offset(0)
+                .limit(100)
+            ).all(),
+            lambda s: s.exec(
+                statements.CAMPAIGN_COUPONS, params={"campaign_id": campaign_id, **page}
+            ).all(),
+        ),
+        "claim": (
+            lambda s: s.exec(
+                select(Coupon).where(
+                    Coupon.campaign_id == campaign_id,
+                    col(Coupon.assigned_to_user).is_(None),
+                )
+            ).all()[:1],
+            lambda s: s.exec(
+                statements.CLAIMABLE_COUPON, params={"campaign_id": campaign_id}
+            ).first(),
+        ),
+    }
+
+
+def measure(fn: Callable[[Session], Any], session: Session, calls: int) -> float:
+    fn(session)
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(session)
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user_id, campaign_id = seed(session)
+        queries = build_queries(user_id, campaign_id)
+
+        # Interleave the variants and keep each one's best mean, to damp noise
+        best: dict[tuple[str, str], float] = {}
+        for _ in range(args.rounds):
+            for name, (inline, prebuilt) in queries.items():
+                for variant, fn in (("inline", inline), ("prebuilt", prebuilt)):
+                    mean = measure(fn, session, args.calls)
+                    key = (name, variant)
+                    best[key] = min(best.get(key, mean), mean)
+
+    print(
+        f"{'query':<10} {'inline µs':>10} {'prebuilt µs':>12} {'saved µs':>9} {'saved':>6}"
+    )
+    for name in queries:
+        inline_mean, prebuilt_mean = best[(name, "inline")], best[(name, "prebuilt")]
+        saved = inline_mean - prebuilt_mean
+        print(
+            f"{name:<10} {inline_mean * 1e6:>10.1f} {prebuilt_mean * 1e6:>12.1f}"
+            f" {saved * 1e6:>9.1f} {saved / inline_mean:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
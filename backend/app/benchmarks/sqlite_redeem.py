@@ -0,0 +1,130 @@
+"""Concurrent redeem throughput on SQLite, "compat" vs "production" profile.
+
+Each profile gets a fresh database file seeded with one campaign and a batch
+of assigned coupons. Writer threads redeem coupons through CouponService
+while reader threads keep loading wallets, like the /coupons/me traffic that
+runs alongside a redemption burst.
+
+    python -m app.benchmarks.sqlite_redeem --coupons 2000 --writers 8 --readers 8
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel
+
+from app.core.sqlite import create_sqlite_engine
+from app.models import Campaign, Coupon, User
+from app.services.coupon_service import CouponService
+
+
+def seed(engine: Engine, coupons: int) -> tuple[int, list[int]]:
+    with Session(engine) as session:
+        user = User(username="bench\\user", hashed_password="x")
+        campaign = Campaign(name="bench")
+        session.add(user)
+        session.add(campaign)
+        session.commit()
+        rows = [
+            Coupon(
+                code=f"BENCH-{i:08d}",
+                campaign_id=campaign.id,
+                assigned_to_user=user.id,
+            )
+            for i in range(coupons)
+        ]
+        session.add_all(rows)
+        session.commit()
+        assert user.id is not None
+        return user.id, [row.id for row in rows if row.id is not None]
+
+
+def run_profile(
+    profile: str, coupons: int, writers: int, readers: int
+) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(
+            f"sqlite:///{Path(tmp) / 'bench.db'}",
+            profile,
+            pool_size=writers + readers,
+            max_overflow=0,
+        )
+        SQLModel.metadata.create_all(engine)
+        user_id, coupon_ids = seed(engine, coupons)
+
+        errors = 0
+        reads = 0
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def writer(ids: list[int]) -> None:
+            nonlocal errors
+            for coupon_id in ids:
+                with Session(engine) as session:
+                    try:
+                        CouponService(session).redeem_coupon(coupon_id)
+                    except OperationalError:
+                        with lock:
+                            errors += 1
+
+        def reader() -> None:
+            nonlocal errors, reads
+            while not done.is_set():
+                with Session(engine) as session:
+                    try:
+                        CouponService(session).get_user_coupons(user_id)
+                    except OperationalError:
+                        with lock:
+                            errors += 1
+                        continue
+                with lock:
+                    reads += 1
+
+        chunks = [coupon_ids[i::writers] for i in range(writers)]
+        write_threads = [threading.Thread(target=writer, args=(c,)) for c in chunks]
+        read_threads = [threading.Thread(target=reader) for _ in range(readers)]
+
+        start = time.perf_counter()
+        for t in write_threads + read_threads:
+            t.start()
+        for t in write_threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for t in read_threads:
+            t.join()
+        engine.dispose()
+
+    return {
+        "redeems/s": coupons / elapsed,
+        "wallet reads/s": reads / elapsed,
+        "errors": errors,
+        "seconds": elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--coupons", type=int, default=2000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    print(
+        f"{'profile':<12} {'redeems/s':>10} {'reads/s':>10} {'errors':>8} {'seconds':>8}"
+    )
+    for profile in ("compat", "production"):
+        r = run_profile(profile, args.coupons, args.writers, args.readers)
+        print(
+            f"{profile:<12} {r['redeems/s']:>10.0f} {r['wallet reads/s']:>10.0f}"
+            f" {r['errors']:>8.0f} {r['seconds']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
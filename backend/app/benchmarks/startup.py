@@ -0,0 +1,113 @@
+"""Cold-start time of a worker: importing app.main and running its lifespan startup.
+
+Each run is a fresh interpreter started with `-X importtime`, as a uvicorn worker
+would be. Reports the median import and startup times, the packages that
+account for most of the import time (by self time, so the numbers add up) and
+the slowest individual modules (by cumulative time).
+
+    python -m app.benchmarks.startup --runs 5
+    python -m app.benchmarks.startup --json startup.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+CHILD = """
+import asyncio, json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+started = asyncio.run(startup())
+print(json.dumps({"import": imported - start, "startup": started - imported}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every `import time:` line."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_once() -> tuple[dict[str, float], list[tuple[str, int, int]]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(proc.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    timings: dict[str, list[float]] = defaultdict(list)
+    package_self: dict[str, list[int]] = defaultdict(list)
+    module_cumulative: dict[str, list[int]] = defaultdict(list)
+    for _ in range(args.runs):
+        times, rows = run_once()
+        for phase, seconds in times.items():
+            timings[phase].append(seconds)
+        per_package: dict[str, int] = defaultdict(int)
+        for module, self_us, cumulative_us in rows:
+            per_package[module.split(".")[0]] += self_us
+            module_cumulative[module].append(cumulative_us)
+        for package, self_us in per_package.items():
+            package_self[package].append(self_us)
+
+    result = {
+        "runs": args.runs,
+        "import_seconds": statistics.median(timings["import"]),
+        "startup_seconds": statistics.median(timings["startup"]),
+        "packages_ms": {
+            package: statistics.median(values) / 1000
+            for package, values in sorted(
+                package_self.items(), key=lambda item: -statistics.median(item[1])
+            )[: args.top]
+        },
+        "modules_ms": {
+            module: statistics.median(values) / 1000
+            for module, values in sorted(
+                module_cumulative.items(), key=lambda item: -statistics.median(item[1])
+            )[: args.top]
+        },
+    }
+
+    print(
+        f"import app.main: {result['import_seconds'] * 1000:.0f} ms, "
+        f"lifespan startup: {result['startup_seconds'] * 1000:.0f} ms "
+        f"(median of {args.runs})"
+    )
+    print("\nimport time by top-level package (self):")
+    for package, ms in result["packages_ms"].items():
+        print(f"  {ms:8.1f} ms  {package}")
+    print("\nslowest modules (cumulative):")
+    for module, ms in result["modules_ms"].items():
+        print(f"  {ms:8.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Concurrent wallet lookups through the sync and the async database stack.
+
+Serves the same `/coupons/me` query twice from one FastAPI app: once as a sync
+route on `Session` and `CouponService`, which runs in the AnyIO threadpool, and
+once as an `async def` route on `AsyncSession` and `AsyncCouponService`. All
+requests start together through httpx's ASGI transport, so the numbers show
+how each stack queues when many requests arrive together.
+
+A local SQLite query returns in microseconds, which hides the cost of holding
+a thread while waiting. `--db-wait-ms` adds a wait inside the open session to
+stand in for a round trip to a database server.
+
+    python -m app.benchmarks.wallet_concurrency --concurrency 2000 --db-wait-ms 5
+    python -m app.benchmarks.wallet_concurrency --url postgresql+psycopg://...
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db_async import create_app_async_engine
+from app.core.db_pool import get_engine_kwargs
+from app.models import Campaign, Coupon, CouponRead, User
+from app.services.coupon_service import AsyncCouponService, CouponService
+
+
+def seed(url: str, coupons: int) -> int:
+    engine = create_engine(url, **get_engine_kwargs())
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="bench\\wallet", hashed_password="x")
+        campaign = Campaign(name="wallet-bench")
+        session.add(user)
+        session.add(campaign)
+        session.commit()
+        session.add_all(
+            Coupon(
+                code=f"WALLET-{user.id}-{i:06d}",
+                campaign_id=campaign.id,
+                assigned_to_user=user.id,
+            )
+            for i in range(coupons)
+        )
+        session.commit()
+        user_id = user.id
+    engine.dispose()
+    assert user_id is not None
+    return user_id
+
+
+def build_app(url: str, user_id: int, db_wait: float) -> FastAPI:
+    engine = create_engine(url, **get_engine_kwargs())
+    async_engine = create_app_async_engine(url)
+    app = FastAPI()
+
+    @app.get("/sync", response_model=list[CouponRead])
+    def wallet_sync() -> Any:
+        with Session(engine, expire_on_commit=False) as session:
+            coupons = CouponService(session).get_user_coupons(user_id)
+            time.sleep(db_wait)
+            return coupons
+
+    @app.get("/async", response_model=list[CouponRead])
+    async def wallet_async() -> Any:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            coupons = await AsyncCouponService(session).get_user_coupons(user_id)
+            await asyncio.sleep(db_wait)
+            return coupons
+
+    app.state.engines = (engine, async_engine)
+    return app
+
+
+async def burst(
+    client: httpx.AsyncClient, path: str, concurrency: int
+) -> dict[str, float]:
+    latencies: list[float] = []
+
+    async def one() -> None:
+        start = time.perf_counter()
+        r = await client.get(path)
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "req/s": concurrency / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p99 ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "seconds": elapsed,
+    }
+
+
+async def run(
+    url: str, concurrency: int, coupons: int, db_wait: float
+) -> dict[str, dict[str, float]]:
+    user_id = seed(url, coupons)
+    app = build_app(url, user_id, db_wait)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        for path in ("/sync", "/async"):
+            await burst(client, path, 50)  # warm both pools
+            results[path] = await burst(client, path, concurrency)
+    engine, async_engine = app.state.engines
+    engine.dispose()
+    await async_engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=2000)
+    parser.add_argument("--coupons", type=int, default=5, help="coupons in the wallet")
+    parser.add_argument("--db-wait-ms", type=float, default=0.0)
+    parser.add_argument("--url", help="database URL (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        results = asyncio.run(
+            run(url, args.concurrency, args.coupons, args.db_wait_ms / 1000)
+        )
+
+    print(f"{args.concurrency} concurrent requests, {args.db_wait_ms:g} ms DB wait")
+    print(f"{'route':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'seconds':>8}")
+    for path, r in results.items():
+        print(
+            f"{path:<8} {r['req/s']:>8.0f} {r['p50 ms']:>8.1f}"
+            f" {r['p99 ms']:>8.1f} {r['seconds']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.core.invalidation import ALL_KEYS, get_invalidation_bus
+from app.core.metrics import CACHE_REQUESTS
+
+MISSING: Any = object()
+
+
+class LocalCache:
+    """Per-process cache whose entries are dropped when any worker invalidates them.
+
+    A published key evicts the entry stored under it and every entry below it:
+    "campaigns" evicts "campaigns" and "campaigns:0:100", "campaign:3" evicts
+    "campaign:3" but not "campaign:30". The TTL only bounds how long an entry can
+    survive a lost invalidation.
+    """
+
+    def __init__(
+        self, ttl: float | None = None, maxsize: int = 1024, name: str = "local"
+    ) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Hits and misses are counted in /metrics under this name
+        self._hits = CACHE_REQUESTS.labels(name, "hit")
+        self._misses = CACHE_REQUESTS.labels(name, "miss")
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        get_invalidation_bus().subscribe(self.evict)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses.inc()
+                return MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self._misses.inc()
+                return MISSING
+            self._entries.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, keys: list[str]) -> None:
+        with self._lock:
+            if ALL_KEYS in keys:
+                self._entries.clear()
+                return
+            exact = set(keys)
+            prefixes = tuple(f"{key}:" for key in keys)
+            for cached in [
+                k for k in self._entries if k in exact or k.startswith(prefixes)
+            ]:
+                del self._entries[cached]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
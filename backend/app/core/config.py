@@ -74,6 +74,97 @@ class Settings(BaseSettings):
                 path=self.POSTGRES_DB,
             ))
 
+    # Connection pool, per uvicorn worker; the Dockerfile runs 4 workers, so the
+    # database must allow 4 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 30.0
+    # Seconds after which a pooled connection is replaced (-1 disables)
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Server-side statement timeout in milliseconds, PostgreSQL only (0 disables)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    # AnyIO worker threads per worker process; 0 matches the pool capacity
+    THREADPOOL_SIZE: int = 0
+    # SQLite tuning: "compat" only enables foreign keys; "production" adds WAL,
+    # synchronous=NORMAL, busy_timeout, mmap and a larger cache
+    SQLITE_PROFILE: Literal["compat", "production"] = "compat"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    # Seconds between passive WAL checkpoints in the production profile (0 disables)
+    SQLITE_CHECKPOINT_INTERVAL: int = 300
+    # Read replicas for read-only endpoints (comma-separated URLs; empty reads the primary)
+    DB_REPLICA_URLS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    # Replicas further behind than this are skipped until they catch up
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    # Seconds between replica lag checks
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 5.0
+    # After a client's own write, its reads stay on the primary for this long
+    DB_READ_YOUR_WRITES_SECONDS: float = 10.0
+    # How workers tell each other to drop cached rows: "auto" picks LISTEN/NOTIFY on
+    # PostgreSQL and UNIX sockets (or a polled file on Windows) on SQLite
+    CACHE_INVALIDATION_BACKEND: Literal["auto", "local", "postgres", "socket", "file"] = "auto"
+    # Directory shared by the workers for the socket and file backends (default: temp dir)
+    CACHE_INVALIDATION_DIR: str = ""
+    # PostgreSQL NOTIFY channel
+    CACHE_INVALIDATION_CHANNEL: str = "cache_invalidation"
+    # Seconds between polls of the file backend
+    CACHE_INVALIDATION_POLL_INTERVAL: float = 0.05
+    # Memory-mapped file holding campaigns and resolved identities for every worker
+    # on the host, e.g. /dev/shm/coupons.cache (empty disables the shared cache)
+    SHARED_CACHE_PATH: str = ""
+    # Entries the shared cache can hold, and the largest JSON value per entry
+    SHARED_CACHE_SLOTS: int = 1024
+    SHARED_CACHE_SLOT_KB: int = 64
+    # Upper bound on an entry's age, in case an invalidation is lost
+    SHARED_CACHE_TTL_SECONDS: float = 300.0
+    # Seconds GET /campaigns/stats is served from a worker's cache; coupon and
+    # campaign changes evict it earlier
+    CAMPAIGN_STATS_CACHE_SECONDS: float = 10.0
+    # Seconds a cached listing count (?count=estimate) is reused before counting again
+    COUNT_CACHE_SECONDS: float = 30.0
+    # Rows fetched per round trip by GET /coupons/export
+    EXPORT_BATCH_SIZE: int = 5000
+    # Coupon metadata keys filtered on often (?meta.<key>=); SQLite gets an expression
+    # index per key, PostgreSQL's GIN index already covers every key
+    COUPON_METADATA_INDEXED_KEYS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = [
+        "store",
+        "tier",
+        "sku",
+    ]
+    # Response compression, in order of preference; zstd and br are skipped unless
+    # the zstandard / brotli packages are installed (empty disables compression)
+    COMPRESSION_ENCODINGS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = [
+        "zstd",
+        "br",
+        "gzip",
+    ]
+    # Bodies smaller than this many bytes are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    # Media type prefixes worth compressing (images, xlsx and zip are already compressed)
+    COMPRESSION_CONTENT_TYPES: Annotated[list[str] | str, BeforeValidator(parse_cors)] = [
+        "application/json",
+        "text/",
+        "application/javascript",
+        "application/xml",
+    ]
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    # Serve Prometheus metrics at /metrics; off by default, as they name every
+    # route and its traffic
+    METRICS_ENABLED: bool = False
+    # When set, /metrics only answers requests sending "Authorization: Bearer <token>"
+    METRICS_TOKEN: str = ""
+    # Directory where each worker keeps its metric values, summed by /metrics
+    # (default: temp dir); a starting worker merges the files of exited ones
+    METRICS_DIR: str = ""
+    # Log every SQL statement (slow; for debugging only)
+    SQL_ECHO: bool = False
+    # Requests slower than this are logged with their SQL statements
+    SLOW_REQUEST_THRESHOLD_MS: int = 500
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -91,6 +182,15 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
 
+    # bcrypt cost factor; hashes with a different cost are rehashed on next verify
+    PASSWORD_HASH_ROUNDS: int = 12
+    # Dedicated threads for hashing/verifying so bcrypt never holds request threads
+    PASSWORD_HASH_WORKERS: int = 2
+    # Worker processes for bulk hashing (0 means one per CPU)
+    PASSWORD_HASH_BULK_PROCESSES: int = 0
+    # Most users one /coupon-users/bulk request may create; each costs a bcrypt hash
+    COUPON_USERS_BULK_MAX: int = 500
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def emails_enabled(self) -> bool:
@@ -103,6 +203,14 @@ class Settings(BaseSettings):
     WINDOWS_ADMIN_USERS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
     # Domain part to append when converting Windows usernames into a valid User.email
     WINDOWS_EMAIL_DOMAIN: str = "windows.localdomain"
+    # Ordered identity resolvers tried for Windows auth: iis_header, proxy_header, native,
+    # jwt (the username of the user whose id a Bearer token carries)
+    WINDOWS_IDENTITY_RESOLVERS: Annotated[
+        list[str] | str, BeforeValidator(parse_cors)
+    ] = ["iis_header", "native"]
+    # User header set by a reverse proxy; only trusted from WINDOWS_TRUSTED_PROXIES addresses
+    WINDOWS_PROXY_USER_HEADER: str = "X-Remote-User"
+    WINDOWS_TRUSTED_PROXIES: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
 
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
@@ -1,32 +1,109 @@
-from sqlmodel import Session, create_engine, select
-from sqlalchemy import event
-from sqlalchemy.engine import Engine
+import threading
+from typing import Any
+
+from sqlalchemy import DDL, event, inspect
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine, make_url
+from sqlmodel import Session, SQLModel, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.db_pool import get_engine_kwargs, get_postgres_connect_args
+from app.core.query_stats import instrument_engine
+from app.core.sqlite import create_sqlite_engine
 from app.models import UserOld, UserCreateOld, Item
+# Registers the flush listeners that keep the campaign rollups current
+import app.services.rollups  # noqa: F401
+# Registers the flush listeners that bump the version stamps behind the ETags
+import app.services.versions  # noqa: F401
+# Registers the SQLite indexes of the hot coupon metadata keys
+import app.services.coupon_metadata  # noqa: F401
+
+
+def create_app_engine(url: str) -> Engine:
+    """Engine with the app's pool settings; SQLite also gets the selected profile."""
+    if make_url(url).get_backend_name() == "sqlite":
+        engine = create_sqlite_engine(url, settings.SQLITE_PROFILE, echo=settings.SQL_ECHO)
+    else:
+        engine = create_engine(
+            url,
+            echo=settings.SQL_ECHO,
+            connect_args=get_postgres_connect_args(),
+            **get_engine_kwargs(),
+        )
+    instrument_engine(engine)
+    return engine
+
+
+# Created on first use rather than at import, like the async engine
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_app_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    return _engine
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps `from app.core.db import engine` working for scripts and tests
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# The trigram operator classes of the search indexes
+event.listen(
+    SQLModel.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(  # type: ignore[no-untyped-call]
+        dialect="postgresql"
+    ),
+)
+
+
+def create_db_tables(bind: Engine | None = None) -> None:
+    """Create any missing tables and indexes. Run by init_db and, for local SQLite, at startup.
+
+    create_all only indexes the tables it creates, so indexes added to a model
+    later are created here for tables that already existed.
+    """
+    bind = bind or get_engine()
+    SQLModel.metadata.create_all(bind)
+    _upgrade_columns(bind)
+    existing = _index_names(bind)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+
+
+def _index_names(bind: Engine) -> set[str]:
+    # Read from the catalog: reflection skips SQLite's expression indexes
+    if bind.dialect.name == "sqlite":
+        query = "SELECT name FROM sqlite_master WHERE type = 'index'"
+    else:
+        query = "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"
+    with bind.connect() as connection:
+        return set(connection.exec_driver_sql(query).scalars())
+
+
+def _upgrade_columns(bind: Engine) -> None:
+    """Column type changes create_all does not make to existing tables."""
+    if bind.dialect.name != "postgresql":
+        return
+    columns = {column["name"]: column for column in inspect(bind).get_columns("coupon")}
+    # coupon.metadata_ was created as JSON, which a GIN index cannot cover
+    if not isinstance(columns["metadata_"]["type"], JSONB):
+        with bind.begin() as connection:
+            connection.exec_driver_sql(
+                "ALTER TABLE coupon ALTER COLUMN metadata_ TYPE jsonb USING metadata_::jsonb"
+            )
 
-# Create engine with connect_args for SQLite
-if "sqlite" in str(settings.SQLALCHEMY_DATABASE_URI):
-    engine = create_engine(
-        str(settings.SQLALCHEMY_DATABASE_URI),
-        echo=True,
-        connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
-
-# SQLite specific configuration
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    if "sqlite" in str(settings.SQLALCHEMY_DATABASE_URI):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
-
-# Create tables
-from sqlmodel import SQLModel
-SQLModel.metadata.create_all(engine)
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
@@ -41,6 +118,8 @@ def init_db(session: Session) -> None:
 
     # This works because the models are already imported and registered from app.models
     # SQLModel.metadata.create_all(engine)
+    # The coupon tables are not in the Alembic history yet, so create them here
+    create_db_tables(session.get_bind().engine)
 
     user = session.exec(
         select(UserOld).where(UserOld.email == settings.FIRST_SUPERUSER)
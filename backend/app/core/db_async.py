@@ -0,0 +1,67 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import settings
+from app.core.db_pool import get_engine_kwargs, get_postgres_connect_args
+from app.core.query_stats import instrument_engine
+from app.core.sqlite import get_sqlite_engine_args, install_sqlite_pragmas
+
+# Created on first use, so workers that never serve an async route don't open a pool
+_async_engine: AsyncEngine | None = None
+
+
+def get_async_database_url(url: str) -> str:
+    """Swap the driver of the sync database URL for its asyncio counterpart.
+
+    psycopg 3 serves both, so `postgresql+psycopg` stays as it is and
+    create_async_engine picks its async dialect; SQLite goes through aiosqlite.
+    """
+    sa_url = make_url(url)
+    if sa_url.get_backend_name() == "sqlite":
+        sa_url = sa_url.set(drivername="sqlite+aiosqlite")
+    elif sa_url.get_backend_name() == "postgresql":
+        sa_url = sa_url.set(drivername="postgresql+psycopg")
+    return sa_url.render_as_string(hide_password=False)
+
+
+def create_app_async_engine(url: str) -> AsyncEngine:
+    async_url = get_async_database_url(url)
+    if make_url(async_url).get_backend_name() == "sqlite":
+        connect_args, engine_kwargs = get_sqlite_engine_args(
+            settings.SQLITE_PROFILE, is_async=True
+        )
+        engine = create_async_engine(
+            async_url,
+            echo=settings.SQL_ECHO,
+            connect_args=connect_args,
+            **engine_kwargs,
+        )
+        install_sqlite_pragmas(engine.sync_engine, settings.SQLITE_PROFILE)
+    else:
+        engine = create_async_engine(
+            async_url,
+            echo=settings.SQL_ECHO,
+            connect_args=get_postgres_connect_args(),
+            **get_engine_kwargs(is_async=True),
+        )
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_app_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    return _async_engine
+
+
+def peek_async_engine() -> AsyncEngine | None:
+    """The async engine if something already created it, without creating it."""
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
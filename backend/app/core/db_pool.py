@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from typing import Any
+
+import anyio.to_thread
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUTS,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAIT,
+)
+
+# Set by configure_threadpool(); the limiter itself is only reachable from the event loop
+_threadpool_size: int | None = None
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection.
+
+    `QueuePool limit ... reached` timeouts are counted too, so saturation shows
+    up in the stats before it shows up as 500s.
+    """
+
+    # Label of this pool's series in /metrics
+    metrics_label = "sync"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            DB_POOL_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            DB_POOL_CHECKOUTS.labels(self.metrics_label).inc()
+            DB_POOL_WAIT.labels(self.metrics_label).observe(waited)
+        DB_POOL_CHECKED_OUT.labels(self.metrics_label).inc()
+        return record
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        DB_POOL_CHECKED_OUT.labels(self.metrics_label).dec()
+        super()._do_return_conn(record)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """The same accounting for engines created with `create_async_engine`."""
+
+    metrics_label = "async"
+
+
+def get_pool_capacity() -> int:
+    return settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+def get_engine_kwargs(*, is_async: bool = False) -> dict[str, Any]:
+    """Pool settings shared by every engine we create."""
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_postgres_connect_args() -> dict[str, Any]:
+    connect_args: dict[str, Any] = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = (
+            f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        )
+    return connect_args
+
+
+def configure_threadpool() -> None:
+    """Size the AnyIO worker threadpool to the DB pool capacity.
+
+    Sync endpoints and dependencies each hold a thread while they use a
+    connection; with more threads than connections the extra threads just
+    queue inside the pool until `pool_timeout` fires. Must run in the event loop.
+    """
+    global _threadpool_size
+    _threadpool_size = settings.THREADPOOL_SIZE or get_pool_capacity()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = _threadpool_size
+
+
+def get_pool_stats(engine: Engine) -> dict[str, Any]:
+    """Snapshot of this worker's pool. Each uvicorn worker has its own pool."""
+    pool = engine.pool
+    stats: dict[str, Any] = {
+        "pid": os.getpid(),
+        "pool_class": type(pool).__name__,
+        "status": pool.status(),
+        "threadpool_size": _threadpool_size,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                wait_seconds_total=pool.wait_seconds_total,
+                wait_seconds_max=pool.wait_seconds_max,
+                wait_seconds_avg=(
+                    pool.wait_seconds_total / pool.checkouts if pool.checkouts else 0.0
+                ),
+            )
+    return stats
@@ -0,0 +1,210 @@
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable, Mapping
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.db import create_app_engine
+from app.core.db_async import create_app_async_engine
+
+logger = logging.getLogger(__name__)
+
+# Set by ReadYourWritesMiddleware: reads stay on the primary until this time
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# Session.info key set on sessions bound to a replica
+REPLICA_SESSION = "replica"
+
+# Zero when the replica has replayed everything it received; otherwise the age of
+# the last replayed transaction. Also 0 on a primary, where both functions are NULL.
+PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+def is_replica_session(session: Session | AsyncSession) -> bool:
+    """Whether the session reads from a replica, which may lag the primary."""
+    return bool(session.info.get(REPLICA_SESSION))
+
+
+def measure_replica_lag(replica_engine: Engine) -> float:
+    """Seconds the replica is behind its primary."""
+    if replica_engine.dialect.name != "postgresql":
+        # SQLite "replicas" are separate files, only used for local testing
+        return 0.0
+    with replica_engine.connect() as conn:
+        return float(conn.execute(PG_REPLICA_LAG_SQL).scalar_one())
+
+
+@dataclass
+class Replica:
+    url: str
+    engine: Engine
+    # Unknown until the first check; infinite when the check failed
+    lag: float | None = None
+    _async_engine: AsyncEngine | None = field(default=None, repr=False)
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        if self._async_engine is None:
+            self._async_engine = create_app_async_engine(self.url)
+        return self._async_engine
+
+    @property
+    def display_url(self) -> str:
+        return make_url(self.url).render_as_string(hide_password=True)
+
+
+class ReplicaRouter:
+    """Picks the engine for read-only sessions.
+
+    Replicas are used round-robin; one whose last lag check failed or exceeded
+    `max_lag` is skipped, and when none is usable reads go to the primary.
+    Lag is measured by `refresh_lag`, which the app lifespan runs periodically,
+    so choosing an engine never waits on the database.
+    """
+
+    def __init__(
+        self,
+        replica_urls: list[str],
+        max_lag: float,
+        lag_probe: Callable[[Engine], float] = measure_replica_lag,
+    ) -> None:
+        self.replicas = [
+            Replica(url=url, engine=create_app_engine(url))
+            for url in replica_urls
+            if url
+        ]
+        self.max_lag = max_lag
+        self.lag_probe = lag_probe
+        self._lock = threading.Lock()
+        self._cycle = itertools.cycle(self.replicas)
+
+    def _is_usable(self, replica: Replica) -> bool:
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def choose(self) -> Replica | None:
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if self._is_usable(replica):
+                    return replica
+        return None
+
+    def refresh_lag(self) -> None:
+        for replica in self.replicas:
+            try:
+                lag = self.lag_probe(replica.engine)
+            except Exception:
+                logger.warning(
+                    "Replica %s unreachable", replica.display_url, exc_info=True
+                )
+                lag = math.inf
+            if lag > self.max_lag:
+                logger.warning(
+                    "Replica %s is %.1fs behind; reading from other replicas or the primary",
+                    replica.display_url,
+                    lag,
+                )
+            replica.lag = lag
+
+    def status(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "url": replica.display_url,
+                "lag_seconds": replica.lag,
+                "usable": self._is_usable(replica),
+            }
+            for replica in self.replicas
+        ]
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose()
+            if replica._async_engine is not None:
+                await replica._async_engine.dispose()
+
+
+_router: ReplicaRouter | None = None
+
+
+def get_replica_router() -> ReplicaRouter:
+    global _router
+    if _router is None:
+        urls = settings.DB_REPLICA_URLS
+        _router = ReplicaRouter(
+            [urls] if isinstance(urls, str) else urls,
+            settings.DB_REPLICA_MAX_LAG_SECONDS,
+        )
+    return _router
+
+
+async def run_replica_lag_checks(router: ReplicaRouter, interval: float) -> None:
+    """Re-measure replica lag until cancelled (started from the app lifespan)."""
+    while True:
+        await asyncio.sleep(interval)
+        await run_in_threadpool(router.refresh_lag)
+
+
+@dataclass
+class WriteMarker:
+    wrote: bool = False
+
+
+# Set per request by ReadYourWritesMiddleware. Like current_query_stats, worker
+# threads get a copy of the context that still points at the same marker.
+current_write_marker: ContextVar[WriteMarker | None] = ContextVar(
+    "current_write_marker", default=None
+)
+
+
+def _mark_write() -> None:
+    marker = current_write_marker.get()
+    if marker is not None:
+        marker.wrote = True
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(_session: Session, _flush_context: Any) -> None:
+    _mark_write()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state: ORMExecuteState) -> None:
+    # session.execute(insert/update/delete) writes without a flush
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        _mark_write()
+
+
+def reads_from_primary(cookies: Mapping[str, str]) -> bool:
+    """Whether this request wrote, or its client wrote within the read-your-writes window."""
+    marker = current_write_marker.get()
+    if marker is not None and marker.wrote:
+        return True
+    try:
+        return float(cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def choose_read_replica(cookies: Mapping[str, str]) -> Replica | None:
+    """The replica a read-only request should use, or None to read the primary."""
+    return None if reads_from_primary(cookies) else get_replica_router().choose()
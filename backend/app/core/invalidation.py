@@ -0,0 +1,373 @@
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Campaign, Coupon, User, UserOld
+
+logger = logging.getLogger(__name__)
+
+# Published instead of the keys when the subscriber may have missed messages
+ALL_KEYS = "*"
+# pg_notify payloads must stay under 8000 bytes
+MAX_PG_PAYLOAD = 7900
+
+Handler = Callable[[list[str]], None]
+
+
+def _lookup_keys(obj: Any, attr: str, prefix: str) -> list[str]:
+    """Keys for the current and previous value of a lookup column like username.
+
+    A row changed after it was expired (e.g. by an earlier commit) has no
+    previous value to hand, so every key under the prefix is published instead.
+    """
+    state = inspect(obj)
+    history = state.attrs[attr].history
+    if history.added and not history.deleted and not state.pending:
+        return [prefix]
+    values = {getattr(obj, attr), *history.deleted}
+    return [f"{prefix}:{value}" for value in values if value]
+
+
+def campaign_keys(campaign: Campaign) -> list[str]:
+    return ["campaigns", f"campaign:{campaign.id}"]
+
+
+def coupon_keys(_coupon: Coupon) -> list[str]:
+    return ["campaigns:stats"]
+
+
+def user_keys(user: User) -> list[str]:
+    return [f"user:{user.id}", *_lookup_keys(user, "username", "user:name")]
+
+
+def user_old_keys(user: UserOld) -> list[str]:
+    return [f"user_old:{user.id}", *_lookup_keys(user, "email", "user_old:email")]
+
+
+# Models whose changes other workers must hear about, and the keys each change publishes
+INVALIDATION_KEYS: dict[type, Callable[[Any], list[str]]] = {
+    Campaign: campaign_keys,
+    Coupon: coupon_keys,
+    User: user_keys,
+    UserOld: user_old_keys,
+}
+
+
+class InvalidationBus:
+    """In-process bus: publishing only reaches this worker's subscribers.
+
+    Subclasses also deliver to the other workers. Handlers run on whatever
+    thread delivers the message, so caches that subscribe must be thread-safe.
+    """
+
+    # True when publish_in_transaction does the delivery (PostgreSQL NOTIFY)
+    transactional = False
+
+    def __init__(self) -> None:
+        self._handlers: list[Handler] = []
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def dispatch(self, keys: list[str]) -> None:
+        for handler in self._handlers:
+            try:
+                handler(keys)
+            except Exception:
+                logger.exception("Cache invalidation handler failed")
+
+    def publish(self, keys: list[str]) -> None:
+        """Deliver to the other workers; this worker already dispatched locally."""
+
+    def publish_in_transaction(self, connection: Connection, keys: list[str]) -> None:
+        """Queue the keys inside the caller's transaction, if the backend can."""
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """LISTEN/NOTIFY: reaches every worker in every container on the database.
+
+    NOTIFY runs inside the writing transaction, so other workers only hear about
+    committed changes, and the notification needs no extra round trip or connection.
+    """
+
+    transactional = True
+
+    def __init__(self, dsn: str, channel: str) -> None:
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def publish_in_transaction(self, connection: Connection, keys: list[str]) -> None:
+        payload = json.dumps(keys)
+        if len(payload) > MAX_PG_PAYLOAD:
+            payload = json.dumps([ALL_KEYS])
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": self.channel, "payload": payload},
+        )
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="cache-invalidation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _listen(self) -> None:
+        import psycopg
+
+        first = True
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f'LISTEN "{self.channel}"')
+                    if not first:
+                        # Anything published while we were disconnected is lost
+                        self.dispatch([ALL_KEYS])
+                    first = False
+                    while not self._stopped.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.warning(
+                    "Cache invalidation listener lost its connection", exc_info=True
+                )
+                self._stopped.wait(1.0)
+
+
+class SocketInvalidationBus(InvalidationBus):
+    """UNIX datagram sockets in a shared directory, one per worker on the host.
+
+    For SQLite deployments, where every worker runs on the same machine.
+    """
+
+    def __init__(self, directory: Path, name: str | None = None) -> None:
+        super().__init__()
+        self.directory = directory
+        self.path = directory / f"{name or os.getpid()}.sock"
+        self._sock: socket.socket | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self.path))
+        sock.settimeout(1.0)
+        self._sock = sock
+        self._thread = threading.Thread(
+            target=self._listen, name="cache-invalidation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.path.unlink(missing_ok=True)
+
+    def publish(self, keys: list[str]) -> None:
+        payload = json.dumps(keys).encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for peer in self.directory.glob("*.sock"):
+                if peer == self.path:
+                    continue
+                try:
+                    sender.sendto(payload, str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Left behind by a worker that died without cleaning up
+                    peer.unlink(missing_ok=True)
+                except OSError:
+                    logger.warning("Could not notify %s", peer, exc_info=True)
+
+    def _listen(self) -> None:
+        while (sock := self._sock) is not None:
+            try:
+                payload = sock.recv(65536)
+            except TimeoutError:
+                continue
+            except OSError:
+                return  # closed by stop()
+            self.dispatch(json.loads(payload))
+
+
+class FileInvalidationBus(InvalidationBus):
+    """Shared append-only log that every worker polls.
+
+    Fallback for hosts without UNIX datagram sockets (Windows); delivery takes
+    up to CACHE_INVALIDATION_POLL_INTERVAL.
+    """
+
+    # The log is truncated by the first writer that finds it larger than this
+    MAX_SIZE = 1024 * 1024
+
+    def __init__(
+        self, directory: Path, poll_interval: float, name: str | None = None
+    ) -> None:
+        super().__init__()
+        self.path = directory / "invalidations.log"
+        self.poll_interval = poll_interval
+        self.name = name or str(os.getpid())
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._poll,
+            args=(self.path.stat().st_size,),
+            name="cache-invalidation",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def publish(self, keys: list[str]) -> None:
+        line = json.dumps({"from": self.name, "keys": keys}) + "\n"
+        mode = (
+            "w"
+            if self.path.exists() and self.path.stat().st_size > self.MAX_SIZE
+            else "a"
+        )
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(line)
+
+    def _poll(self, offset: int) -> None:
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                size = self.path.stat().st_size
+                if size < offset:
+                    # Truncated by a writer; lines written before we looked are lost
+                    offset = 0
+                    self.dispatch([ALL_KEYS])
+                if size == offset:
+                    continue
+                with open(self.path, encoding="utf-8") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except OSError:
+                logger.warning("Could not read %s", self.path, exc_info=True)
+                continue
+            # Only consume complete lines; a writer may be mid-append
+            complete, _, _ = chunk.rpartition("\n")
+            if not complete:
+                continue
+            offset += len(complete.encode("utf-8")) + 1
+            for line in complete.splitlines():
+                message = json.loads(line)
+                if message["from"] != self.name:
+                    self.dispatch(message["keys"])
+
+
+def build_invalidation_bus(backend: str) -> InvalidationBus:
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI))
+    directory = Path(
+        settings.CACHE_INVALIDATION_DIR
+        or Path(tempfile.gettempdir()) / "app-cache-invalidation"
+    )
+    if backend == "auto":
+        if url.get_backend_name() == "postgresql":
+            backend = "postgres"
+        elif hasattr(socket, "AF_UNIX") and os.name != "nt":
+            backend = "socket"
+        else:
+            backend = "file"
+    if backend == "postgres":
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresInvalidationBus(dsn, settings.CACHE_INVALIDATION_CHANNEL)
+    if backend == "socket":
+        return SocketInvalidationBus(directory)
+    if backend == "file":
+        return FileInvalidationBus(directory, settings.CACHE_INVALIDATION_POLL_INTERVAL)
+    return InvalidationBus()
+
+
+_bus: InvalidationBus | None = None
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    global _bus
+    if _bus is None:
+        _bus = build_invalidation_bus(settings.CACHE_INVALIDATION_BACKEND)
+    return _bus
+
+
+def invalidate(keys: Iterable[str]) -> None:
+    """Evict `keys` in every worker now, for changes made outside the ORM."""
+    keys = sorted(set(keys))
+    bus = get_invalidation_bus()
+    bus.dispatch(keys)
+    if bus.transactional:
+        from app.core.db import get_engine
+
+        with get_engine().begin() as conn:
+            bus.publish_in_transaction(conn, keys)
+    else:
+        bus.publish(keys)
+
+
+# Keys collected from flushes, published once the transaction commits
+PENDING_KEYS = "pending_invalidation_keys"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidation_keys(session: Session, _flush_context: Any) -> None:
+    keys: set[str] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        key_func = INVALIDATION_KEYS.get(type(obj))
+        if key_func is not None:
+            keys.update(key_func(obj))
+    if not keys:
+        return
+    bus = get_invalidation_bus()
+    if bus.transactional:
+        bus.publish_in_transaction(session.connection(), sorted(keys))
+    session.info.setdefault(PENDING_KEYS, set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_invalidation_keys(session: Session) -> None:
+    keys = session.info.pop(PENDING_KEYS, None)
+    if not keys:
+        return
+    bus = get_invalidation_bus()
+    bus.dispatch(sorted(keys))
+    if not bus.transactional:
+        bus.publish(sorted(keys))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidation_keys(session: Session) -> None:
+    session.info.pop(PENDING_KEYS, None)
@@ -0,0 +1,535 @@
+"""Prometheus metrics, summed over every uvicorn worker on the host.
+
+Each worker process counts into its own memory-mapped file in METRICS_DIR
+(`metrics-<pid>.db`), so recording a sample is a dict lookup and an 8-byte
+write, with no lock shared between processes. GET /metrics, whichever worker
+serves it, reads every worker's file and adds them up:
+
+- counters and histograms include workers that have exited, so the totals never
+  go backwards when a worker is replaced; a starting worker folds the files of
+  exited ones into its own (`merge_dead_workers`), so they don't pile up;
+- gauges only include live workers, and a worker zeroes its own on shutdown.
+
+With METRICS_ENABLED off, recording does nothing and no file is created.
+
+A file is a 16-byte header (bytes used) followed by entries of a length-prefixed
+key, padded to 8 bytes, and a float64 value. Entries are only ever appended, and
+the header is updated after the entry is complete, so a reader never sees half
+of one.
+
+Histogram buckets are stored per bucket rather than cumulatively, so an
+observation writes two values (its bucket and the sum); the exposition adds
+them up.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+from app.core.config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# bytes used
+FILE_HEADER = struct.Struct("<Q")
+FILE_HEADER_SIZE = 16
+KEY_LENGTH = struct.Struct("<I")
+VALUE = struct.Struct("<d")
+INITIAL_FILE_SIZE = 64 * 1024
+
+# Seconds; request latencies from a cached read to a slow import
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class ValuesFile:
+    """One process's samples: key -> float64, in a memory-mapped file it alone writes."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        path.touch(exist_ok=True)
+        self._file = open(path, "r+b")
+        size = max(os.fstat(self._file.fileno()).st_size, INITIAL_FILE_SIZE)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._positions: dict[str, int] = {}
+        self._used = FILE_HEADER.unpack_from(self._map, 0)[0] or FILE_HEADER_SIZE
+        # A replaced worker with a recycled pid carries on from its predecessor's values
+        for key, position in _entries(self._map, self._used):
+            self._positions[key] = position
+        FILE_HEADER.pack_into(self._map, 0, self._used)
+
+    def _position(self, key: str) -> int:
+        position = self._positions.get(key)
+        if position is None:
+            encoded = key.encode()
+            entry_size = _padded(KEY_LENGTH.size + len(encoded)) + VALUE.size
+            if self._used + entry_size > len(self._map):
+                self._grow(self._used + entry_size)
+            start = self._used + KEY_LENGTH.size
+            KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+            self._map[start : start + len(encoded)] = encoded
+            position = self._used + entry_size - VALUE.size
+            VALUE.pack_into(self._map, position, 0.0)
+            self._used += entry_size
+            FILE_HEADER.pack_into(self._map, 0, self._used)
+            self._positions[key] = position
+        return position
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def add(self, key: str, amount: float) -> None:
+        with self._lock:
+            position = self._position(key)
+            (value,) = VALUE.unpack_from(self._map, position)
+            VALUE.pack_into(self._map, position, value + amount)
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            VALUE.pack_into(self._map, self._position(key), value)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._positions)
+
+    def close(self) -> None:
+        with self._lock:
+            self._map.close()
+            self._file.close()
+
+
+class DiscardedValues:
+    """Stands in for a process's file while metrics are disabled."""
+
+    def add(self, key: str, amount: float) -> None:
+        pass
+
+    def set(self, key: str, value: float) -> None:
+        pass
+
+    def keys(self) -> list[str]:
+        return []
+
+
+DISCARDED = DiscardedValues()
+
+
+def _entries(data: Any, used: int) -> Iterator[tuple[str, int]]:
+    """(key, value position) of each complete entry in a file's first `used` bytes."""
+    offset = FILE_HEADER_SIZE
+    while offset + KEY_LENGTH.size <= used:
+        (length,) = KEY_LENGTH.unpack_from(data, offset)
+        start = offset + KEY_LENGTH.size
+        key = bytes(data[start : start + length]).decode()
+        position = offset + _padded(KEY_LENGTH.size + length)
+        if position + VALUE.size > used:
+            break
+        yield key, position
+        offset = position + VALUE.size
+
+
+def read_values(path: Path) -> dict[str, float]:
+    """Every sample in another process's file, read without locking it."""
+    data = path.read_bytes()
+    if len(data) < FILE_HEADER_SIZE:
+        return {}
+    used = min(FILE_HEADER.unpack_from(data, 0)[0], len(data))
+    return {
+        key: VALUE.unpack_from(data, position)[0]
+        for key, position in _entries(data, used)
+    }
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill would terminate it; a worker that died keeps its gauges
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _label_string(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+
+
+class Metric:
+    kind = ""
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._children_lock = threading.Lock()
+
+    def _key(self, suffix: str, values: tuple[str, ...]) -> str:
+        return f"{self.name}|{suffix}|{json.dumps(values)}"
+
+    def labels(self, *values: Any) -> Any:
+        """The child for these label values, in `labelnames` order; created once."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._children_lock:
+                child = self._children.setdefault(key, self._child(key))
+        return child
+
+    def _child(self, values: tuple[str, ...]) -> Any:
+        raise NotImplementedError
+
+    def render(self, samples: dict[str, float]) -> list[str]:
+        """Exposition lines from the samples summed over the workers."""
+        lines = []
+        for key, value in sorted(samples.items()):
+            values = key.split("|", 2)[2]
+            labels = _label_string(self.labelnames, tuple(json.loads(values)))
+            braces = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{braces} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    def __init__(self, registry: "MetricsRegistry", key: str) -> None:
+        self.registry = registry
+        self.key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.registry.values().add(self.key, amount)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _child(self, values: tuple[str, ...]) -> _CounterChild:
+        return _CounterChild(self.registry, self._key("", values))
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0) -> None:
+        self.registry.values().add(self.key, -amount)
+
+    def set(self, value: float) -> None:
+        self.registry.values().set(self.key, value)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _child(self, values: tuple[str, ...]) -> _GaugeChild:
+        return _GaugeChild(self.registry, self._key("", values))
+
+
+class _HistogramChild:
+    def __init__(self, histogram: "Histogram", values: tuple[str, ...]) -> None:
+        self.registry = histogram.registry
+        self.buckets = histogram.buckets
+        self.bucket_keys = [
+            histogram._key(f"b{i}", values) for i in range(len(histogram.buckets) + 1)
+        ]
+        self.sum_key = histogram._key("sum", values)
+
+    def observe(self, value: float) -> None:
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        values = self.registry.values()
+        values.add(self.bucket_keys[index], 1.0)
+        values.add(self.sum_key, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, *args: Any, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self, values: tuple[str, ...]) -> _HistogramChild:
+        return _HistogramChild(self, values)
+
+    def render(self, samples: dict[str, float]) -> list[str]:
+        series: dict[str, dict[str, float]] = {}
+        for key, value in samples.items():
+            _, suffix, values = key.split("|", 2)
+            series.setdefault(values, {})[suffix] = value
+        bounds = [*(_format_value(b) for b in self.buckets), "+Inf"]
+        lines = []
+        for values, parts in sorted(series.items()):
+            labels = _label_string(self.labelnames, tuple(json.loads(values)))
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0.0
+            for i, bound in enumerate(bounds):
+                cumulative += parts.get(f"b{i}", 0.0)
+                lines.append(
+                    f'{self.name}_bucket{{{prefix}le="{bound}"}} {_format_value(cumulative)}'
+                )
+            braces = f"{{{labels}}}" if labels else ""
+            lines.append(
+                f"{self.name}_sum{braces} {_format_value(parts.get('sum', 0.0))}"
+            )
+            lines.append(f"{self.name}_count{braces} {_format_value(cumulative)}")
+        return lines
+
+
+MetricT = TypeVar("MetricT", bound=Metric)
+
+
+class MetricsRegistry:
+    """The metrics of this app; samples go to this process's file in `directory`.
+
+    While `enabled` returns False, samples are dropped and no file is created.
+    """
+
+    def __init__(
+        self,
+        directory: Callable[[], Path],
+        enabled: Callable[[], bool] = lambda: True,
+    ) -> None:
+        self._directory = directory
+        self._enabled = enabled
+        self._metrics: dict[str, Metric] = {}
+        self._values: ValuesFile | None = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> Path:
+        return self._directory()
+
+    def values(self) -> ValuesFile | DiscardedValues:
+        """This process's file, opened on first use (and again in a forked child)."""
+        if not self._enabled():
+            return DISCARDED
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    self._values = ValuesFile(
+                        self.directory / f"metrics-{os.getpid()}.db"
+                    )
+                    self._pid = os.getpid()
+        assert self._values is not None
+        return self._values
+
+    def _register(self, metric: MetricT) -> MetricT:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(
+            Histogram(self, name, documentation, labelnames, buckets=buckets)
+        )
+
+    def zero_gauges(self) -> None:
+        """Drop this worker's gauges from the totals, for a clean shutdown."""
+        if self._pid != os.getpid():
+            return
+        values = self.values()
+        for key in values.keys():
+            metric = self._metrics.get(key.split("|", 1)[0])
+            if isinstance(metric, Gauge):
+                values.set(key, 0.0)
+
+    def _worker_files(self) -> Iterator[tuple[int, Path]]:
+        for path in sorted(self.directory.glob("metrics-*.db")):
+            try:
+                yield int(path.stem.removeprefix("metrics-")), path
+            except ValueError:
+                continue
+
+    def merge_dead_workers(self) -> int:
+        """Fold the counters and histograms of exited workers into this process's file.
+
+        Their gauges are dropped, as /metrics already leaves them out. Each file is
+        first renamed out of the way, so of several workers starting at once only
+        one merges it. Returns the number of files merged.
+        """
+        if not self._enabled() or not self.directory.is_dir():
+            return 0
+        values = self.values()
+        merged = 0
+        for pid, path in self._worker_files():
+            if _alive(pid):
+                continue
+            claimed = path.with_name(f"{path.name}.merging-{os.getpid()}")
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                # Claimed by another starting worker
+                continue
+            for key, value in read_values(claimed).items():
+                metric = self._metrics.get(key.split("|", 1)[0])
+                if metric is not None and not isinstance(metric, Gauge):
+                    values.add(key, value)
+            claimed.unlink()
+            merged += 1
+        return merged
+
+    def collect(self) -> dict[str, float]:
+        """Every sample summed over the workers' files."""
+        totals: dict[str, float] = {}
+        for pid, path in self._worker_files():
+            try:
+                samples = read_values(path)
+            except FileNotFoundError:
+                # Merged into a starting worker's file since the listing
+                continue
+            alive = _alive(pid)
+            for key, value in samples.items():
+                metric = self._metrics.get(key.split("|", 1)[0])
+                if metric is None or (isinstance(metric, Gauge) and not alive):
+                    continue
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self) -> str:
+        """The Prometheus text exposition of every registered metric."""
+        by_metric: dict[str, dict[str, float]] = {}
+        for key, value in self.collect().items():
+            by_metric.setdefault(key.split("|", 1)[0], {})[key] = value
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(by_metric.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry(
+    lambda: Path(settings.METRICS_DIR or Path(tempfile.gettempdir()) / "app-metrics"),
+    lambda: settings.METRICS_ENABLED,
+)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "Requests served, by route, method and status",
+    ("route", "method", "status"),
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Request latency, by route and method",
+    ("route", "method"),
+)
+DB_QUERIES = REGISTRY.counter(
+    "db_queries_total", "SQL statements run, by route", ("route",)
+)
+DB_QUERY_DURATION = REGISTRY.counter(
+    "db_query_duration_seconds_total",
+    "Time spent in SQL statements, by route",
+    ("route",),
+)
+DB_POOL_CHECKOUTS = REGISTRY.counter(
+    "db_pool_checkouts_total", "Connections taken from the pool", ("pool",)
+)
+DB_POOL_TIMEOUTS = REGISTRY.counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT", ("pool",)
+)
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ("pool",),
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKED_OUT = REGISTRY.gauge(
+    "db_pool_checked_out",
+    "Connections in use; saturated at (DB_POOL_SIZE + DB_MAX_OVERFLOW) per worker",
+    ("pool",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total",
+    "Cache lookups, by cache and hit or miss",
+    ("cache", "result"),
+)
+COUPON_IMPORT_ROWS = REGISTRY.counter(
+    "coupon_import_rows_total", "Coupons created by file imports", ("format",)
+)
+COUPON_IMPORT_DURATION = REGISTRY.histogram(
+    "coupon_import_duration_seconds",
+    "Time to parse and insert an import file",
+    ("format",),
+)
+COUPON_ASSIGNMENT_DURATION = REGISTRY.histogram(
+    "coupon_assignment_duration_seconds",
+    "Time to assign a campaign coupon to a user, by outcome",
+    ("result",),
+)
@@ -0,0 +1,233 @@
+import zlib
+from collections.abc import Callable
+from typing import Protocol, cast
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+class Compressor(Protocol):
+    """Streaming encoder: `compress` may hold data back, `finish` returns the rest."""
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        # wbits 16 + 15 writes the gzip header and trailer around the deflate stream
+        self._encoder = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._encoder.compress(data)
+
+    def finish(self) -> bytes:
+        return self._encoder.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._encoder = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return cast(bytes, self._encoder.process(data))
+
+    def finish(self) -> bytes:
+        return cast(bytes, self._encoder.finish())
+
+
+class ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._encoder = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return cast(bytes, self._encoder.compress(data))
+
+    def finish(self) -> bytes:
+        return cast(bytes, self._encoder.flush())
+
+
+def available_encodings() -> dict[str, Callable[[], Compressor]]:
+    """Content-Encoding name -> compressor factory, for the installed libraries."""
+    encodings: dict[str, Callable[[], Compressor]] = {}
+    if ZSTD_AVAILABLE:
+        encodings["zstd"] = lambda: ZstdCompressor(settings.COMPRESSION_ZSTD_LEVEL)
+    if BROTLI_AVAILABLE:
+        encodings["br"] = lambda: BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY)
+    encodings["gzip"] = lambda: GzipCompressor(settings.COMPRESSION_GZIP_LEVEL)
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, preferred: list[str]) -> str | None:
+    """The first of `preferred` the client accepts (q > 0), or None for identity."""
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in preferred:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """Compress response bodies with zstd, brotli or gzip, as the client accepts.
+
+    Only COMPRESSION_CONTENT_TYPES are compressed, and only once the body
+    reaches COMPRESSION_MINIMUM_SIZE: smaller bodies gain less than the header
+    and CPU cost. Streamed responses (e.g. the CSV export) are compressed chunk
+    by chunk without buffering the whole body. zstd and brotli need the
+    `zstandard` and `brotli` packages; without them clients get gzip.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int | None = None,
+        encodings: list[str] | None = None,
+        content_types: list[str] | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = (
+            settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        )
+        factories = available_encodings()
+        self.factories = {
+            name: factories[name]
+            for name in (
+                settings.COMPRESSION_ENCODINGS if encodings is None else encodings
+            )
+            if name in factories
+        }
+        self.content_types = tuple(
+            settings.COMPRESSION_CONTENT_TYPES
+            if content_types is None
+            else content_types
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), list(self.factories)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(
+            send,
+            encoding,
+            self.factories[encoding],
+            self.minimum_size,
+            self.content_types,
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Holds back the start message until the body shows whether to compress."""
+
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        factory: Callable[[], Compressor],
+        minimum_size: int,
+        content_types: tuple[str, ...],
+    ) -> None:
+        self._send = send
+        self.encoding = encoding
+        self.factory = factory
+        self.minimum_size = minimum_size
+        self.content_types = content_types
+        self.start: Message = {}
+        # Body held back while it is still below minimum_size
+        self.pending: list[bytes] = []
+        self.pending_size = 0
+        self.compressor: Compressor | None = None
+        self.passthrough = False
+
+    def _compressible(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return media_type.startswith(self.content_types)
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not self._compressible(message)
+            if self.passthrough:
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.compressor is not None:
+            data = self.compressor.compress(body)
+            if not more_body:
+                data += self.compressor.finish()
+            if data or not more_body:
+                await self._send(
+                    {"type": "http.response.body", "body": data, "more_body": more_body}
+                )
+            return
+
+        self.pending.append(body)
+        self.pending_size += len(body)
+        # Never encode an empty body (304, 204, HEAD), whatever the threshold
+        if self.pending_size < max(self.minimum_size, 1):
+            if more_body:
+                return
+            # Complete and still small: sent as it was
+            await self._send(self.start)
+            await self._send(
+                {"type": "http.response.body", "body": b"".join(self.pending)}
+            )
+            return
+
+        headers = MutableHeaders(scope=self.start)
+        del headers["content-length"]
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        await self._send(self.start)
+        self.compressor = self.factory()
+        data = self.compressor.compress(b"".join(self.pending))
+        self.pending = []
+        if not more_body:
+            data += self.compressor.finish()
+        await self._send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
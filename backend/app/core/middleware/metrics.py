@@ -0,0 +1,62 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    DB_QUERIES,
+    DB_QUERY_DURATION,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+)
+from app.core.query_stats import current_query_stats
+
+# Label for requests no route matched, so 404 scans cannot grow the series count
+UNMATCHED = "unmatched"
+# Any other method a client sends is counted under OTHER_METHOD, for the same reason
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+OTHER_METHOD = "other"
+
+
+class MetricsMiddleware:
+    """Record each request's latency, status and SQL statements per route.
+
+    Routes are labelled with their OpenAPI operation id (`custom_generate_unique_id`,
+    e.g. "coupons-read_my_coupons"), which stays the same whatever the path
+    parameters. Must run inside ServerTimingMiddleware, which counts the SQL.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            name = (
+                getattr(route, "unique_id", None)
+                or getattr(route, "name", None)
+                or UNMATCHED
+            )
+            method = scope["method"] if scope["method"] in METHODS else OTHER_METHOD
+            HTTP_REQUESTS.labels(name, method, status).inc()
+            HTTP_REQUEST_DURATION.labels(name, method).observe(
+                time.perf_counter() - start
+            )
+            stats = current_query_stats.get()
+            if stats is not None and stats.count:
+                DB_QUERIES.labels(name).inc(stats.count)
+                DB_QUERY_DURATION.labels(name).inc(stats.seconds)
@@ -0,0 +1,44 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db_replicas import READ_PRIMARY_COOKIE, WriteMarker, current_write_marker
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client's reads on the primary for a while after it writes.
+
+    Any ORM flush or DML statement during the request marks it as a write. The
+    response then sets a short-lived cookie that `get_read_db` checks, so the
+    client sees its own change even if the replicas have not replayed it yet,
+    whichever worker serves its next request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = WriteMarker()
+        token = current_write_marker.set(marker)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and marker.wrote:
+                window = settings.DB_READ_YOUR_WRITES_SECONDS
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{READ_PRIMARY_COOKIE}={time.time() + window:.3f}; "
+                    f"Max-Age={int(window)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            current_write_marker.reset(token)
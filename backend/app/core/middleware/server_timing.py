@@ -0,0 +1,71 @@
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.query_stats import QueryStats, current_query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """Count SQL per request and report it in a `Server-Timing` header.
+
+    Requests slower than SLOW_REQUEST_THRESHOLD_MS are logged together with
+    their statements, grouped so that repeated (N+1) queries stand out.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(scope, stats, start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            if elapsed * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+                _log_slow_request(scope, stats, elapsed)
+
+
+def _server_timing(scope: Scope, stats: QueryStats, start: float) -> str:
+    metrics = [
+        f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries"',
+    ]
+    identity_timings = (scope.get("state") or {}).get("identity_timings")
+    if identity_timings:
+        metrics.append(f"identity;dur={sum(identity_timings.values()) * 1000:.2f}")
+    metrics.append(f"app;dur={(time.perf_counter() - start) * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+def _log_slow_request(scope: Scope, stats: QueryStats, elapsed: float) -> None:
+    lines = [
+        f"  {times}x {' '.join(statement.split())}"
+        for statement, times in stats.repeated_statements()
+    ]
+    logger.warning(
+        "Slow request %s %s: %.1f ms, %d queries in %.1f ms\n%s",
+        scope["method"],
+        scope["path"],
+        elapsed * 1000,
+        stats.count,
+        stats.seconds * 1000,
+        "\n".join(lines),
+    )
@@ -1,12 +1,27 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-
-class WindowsAuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        user = request.headers.get("X-Forwarded-User")
-        if user:
-            request.state.windows_user = user
-        else:
-            request.state.windows_user = None
-        response = await call_next(request)
-        return response
\ No newline at end of file
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+FORWARDED_USER_HEADER = b"x-forwarded-user"
+
+
+class WindowsAuthMiddleware:
+    """Copy the IIS `X-Forwarded-User` header into `request.state.windows_user`.
+
+    Written as a plain ASGI middleware rather than on top of BaseHTTPMiddleware:
+    it only reads the request headers, so there is no need for the extra task
+    and body-streaming wrapper that BaseHTTPMiddleware puts around every call.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            user = None
+            # ASGI header names are already lower-cased bytes
+            for name, value in scope["headers"]:
+                if name == FORWARDED_USER_HEADER:
+                    user = value.decode("latin-1")
+                    break
+            # Request.state is backed by scope["state"]; keep any lifespan state in it
+            scope.setdefault("state", {})["windows_user"] = user or None
+        await self.app(scope, receive, send)
@@ -0,0 +1,62 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements kept per request for the slow-request log; counts and time are always exact
+MAX_RECORDED_STATEMENTS = 200
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    statements: list[tuple[str, float]] = field(default_factory=list)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append((statement, seconds))
+
+    def repeated_statements(self) -> list[tuple[str, int]]:
+        """Statements ordered by how often they ran; N+1 loops float to the top."""
+        return Counter(statement for statement, _ in self.statements).most_common()
+
+
+# Set per request by ServerTimingMiddleware. Worker threads get a copy of the
+# context, but it still points at the same QueryStats object, so they add to it.
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def _before_cursor_execute(conn: Any, *_: Any) -> None:
+    if current_query_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+    stats = current_query_stats.get()
+    starts = conn.info.get("query_start")
+    if stats is None or not starts:
+        return
+    stats.record(statement, time.perf_counter() - starts.pop())
+
+
+def _handle_error(exception_context: Any) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute every statement run on `engine` to the current request."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -1,3 +1,8 @@
+import asyncio
+import multiprocessing
+import threading
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 import jwt
@@ -6,11 +11,21 @@ from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning the rounds also makes passlib flag hashes with any other cost as
+# needing an update, which is what drives rehash-on-verify below.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS,
+)
 
 
 ALGORITHM = "HS256"
 
+_executor_lock = threading.Lock()
+_hash_executor: ThreadPoolExecutor | None = None
+_bulk_executor: ProcessPoolExecutor | None = None
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
@@ -33,4 +48,105 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password and return a replacement hash if the stored one is outdated.
+
+    The second item is only set when the password matched and the stored hash
+    was produced with a different cost (or a deprecated scheme).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def get_hash_executor() -> Executor:
+    """Return the bounded thread pool reserved for password hashing.
+
+    bcrypt releases the GIL, so a small pool caps CPU spent on hashing without
+    borrowing threads from the AnyIO pool that serves the request handlers.
+    """
+    global _hash_executor
+    if _hash_executor is None:
+        with _executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="password-hash",
+                )
+    return _hash_executor
+
+
+def get_bulk_hash_executor() -> Executor:
+    """Return the process pool used for hashing many passwords at once.
+
+    Workers are spawned rather than forked: a fork copies the server's threads'
+    locks (the hashing pool, the DB pool, logging) in whatever state they are in.
+    """
+    global _bulk_executor
+    if _bulk_executor is None:
+        with _executor_lock:
+            if _bulk_executor is None:
+                _bulk_executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_BULK_PROCESSES or None,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _bulk_executor
+
+
+def shutdown_hash_executors() -> None:
+    global _hash_executor, _bulk_executor
+    with _executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+        if _bulk_executor is not None:
+            # Joined, so no worker process outlives the server
+            _bulk_executor.shutdown(wait=True, cancel_futures=True)
+            _bulk_executor = None
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_hash_executor(), verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_hash_executor(), verify_and_update_password, plain_password, hashed_password
+    )
+
+
+def get_password_hashes_bulk(passwords: Sequence[str]) -> list[str]:
+    """Hash many passwords in the process pool, preserving input order.
+
+    A single password is hashed in the calling thread, since spinning up a
+    worker process costs more than one bcrypt round.
+    """
+    if len(passwords) <= 1:
+        return [get_password_hash(password) for password in passwords]
+    return list(get_bulk_hash_executor().map(get_password_hash, passwords))
+
+
+async def get_password_hashes_bulk_async(passwords: Sequence[str]) -> list[str]:
+    if len(passwords) <= 1:
+        return [await get_password_hash_async(password) for password in passwords]
+    loop = asyncio.get_running_loop()
+    executor = get_bulk_hash_executor()
+    futures = [
+        loop.run_in_executor(executor, get_password_hash, password)
+        for password in passwords
+    ]
+    return list(await asyncio.gather(*futures))
@@ -0,0 +1,368 @@
+"""Read cache in a memory-mapped file shared by every worker on the host.
+
+One copy of the reference data (campaigns, resolved identities) serves all the
+workers, and a key is loaded from the database by one worker while the others
+wait for it, so neither memory use nor cold misses grow with the worker count.
+
+The file is a fixed table of slots; a key lives in the slot its hash picks and
+a colliding key simply replaces it. Each slot carries:
+
+- a seqlock version, odd while a writer is copying, so readers never lock and
+  retry the rare read that overlapped a write. A writer that died mid-copy
+  leaves it odd: readers give up after READ_ATTEMPTS and count a miss, the next
+  write starts again from the even version below, and attaching to the file
+  clears such slots;
+- a generation, bumped by every eviction, so a value loaded before a commit is
+  not stored after that commit's invalidation;
+- a fill lease, so only one worker loads a missing key at a time.
+
+Writers take a byte-range lock on the slot (plus a thread lock, as fcntl locks
+are per process) only while copying bytes, never while loading. Evictions
+arrive through the cache invalidation bus, so values are JSON documents keyed
+like the bus keys ("campaigns:0:100", "user:name:<username>").
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from hashlib import blake2b
+from typing import Any
+
+from app.core.config import settings
+from app.core.invalidation import ALL_KEYS, get_invalidation_bus
+from app.core.metrics import CACHE_REQUESTS
+
+try:
+    import fcntl
+
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: slots are only locked within the process
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MISSING: Any = object()
+PENDING: Any = object()
+
+MAGIC = b"APPSHM01"
+# magic, slot count, slot size
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+# version, generation, expires, lease expires, key length, value length
+SLOT_HEADER = struct.Struct("<QQddHI")
+SlotHeader = tuple[int, int, float, float, int, int]
+KEY_OFFSET = 64
+VALUE_OFFSET = 256
+MAX_KEY_SIZE = VALUE_OFFSET - KEY_OFFSET
+# How long a worker may take to load a key before others stop waiting for it
+LEASE_SECONDS = 2.0
+# How often a worker waiting for another one's load checks for the value
+WAIT_INTERVAL = 0.005
+# Reads of a slot that keep finding a write in progress before it counts as a miss
+READ_ATTEMPTS = 100
+
+CACHE_HITS = CACHE_REQUESTS.labels("shared", "hit")
+# Includes keys another worker was still loading
+CACHE_MISSES = CACHE_REQUESTS.labels("shared", "miss")
+
+
+class SharedCache:
+    def __init__(self, path: str, slots: int, slot_size: int, ttl: float) -> None:
+        if slot_size <= VALUE_OFFSET:
+            raise ValueError(f"Slots must be larger than {VALUE_OFFSET} bytes")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.ttl = ttl
+        self._thread_locks = [threading.Lock() for _ in range(slots)]
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = HEADER_SIZE + slots * slot_size
+        with self._file_lock(0):
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            header = os.read(self._fd, HEADER.size)
+            if len(header) < HEADER.size or HEADER.unpack(header) != (
+                MAGIC,
+                slots,
+                slot_size,
+            ):
+                # New file, or one laid out by a differently configured deployment
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, HEADER.pack(MAGIC, slots, slot_size))
+        self._mm = mmap.mmap(self._fd, size)
+        self._repair_torn_slots()
+
+    def _repair_torn_slots(self) -> None:
+        """Clear slots left mid-write by a worker that died, in this run or an earlier one."""
+        for index in range(self.slots):
+            if not SLOT_HEADER.unpack_from(self._mm, self._offset(index))[0] % 2:
+                continue
+            with self._locked(index) as (version, generation, *_):
+                # Writers hold the lock while the version is odd, so this write is torn
+                if version % 2:
+                    self._write(index, version, generation + 1, 0.0, 0.0, b"", b"")
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    def _slot(self, key: bytes) -> int:
+        return (
+            int.from_bytes(blake2b(key, digest_size=8).digest(), "little") % self.slots
+        )
+
+    def _offset(self, index: int) -> int:
+        return HEADER_SIZE + index * self.slot_size
+
+    @contextmanager
+    def _file_lock(self, offset: int) -> Iterator[None]:
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, offset)
+
+    def _key_at(self, index: int, key_len: int) -> bytes:
+        start = self._offset(index) + KEY_OFFSET
+        return self._mm[start : start + key_len]
+
+    @contextmanager
+    def _locked(self, index: int) -> Iterator[SlotHeader]:
+        """Exclusive access to a slot; yields its header fields."""
+        offset = self._offset(index)
+        with self._thread_locks[index], self._file_lock(offset):
+            header: SlotHeader = SLOT_HEADER.unpack_from(self._mm, offset)
+            yield header
+
+    def _write(
+        self,
+        index: int,
+        version: int,
+        generation: int,
+        expires: float,
+        lease: float,
+        key: bytes,
+        value: bytes,
+    ) -> None:
+        """Rewrite a slot; the caller holds its lock."""
+        offset = self._offset(index)
+        mm = self._mm
+        # Odd only if a writer died mid-copy; building on it would keep the slot odd
+        base = version & ~1
+        struct.pack_into("<Q", mm, offset, base + 1)
+        mm[offset + KEY_OFFSET : offset + KEY_OFFSET + len(key)] = key
+        mm[offset + VALUE_OFFSET : offset + VALUE_OFFSET + len(value)] = value
+        SLOT_HEADER.pack_into(
+            mm, offset, base + 1, generation, expires, lease, len(key), len(value)
+        )
+        struct.pack_into("<Q", mm, offset, base + 2)
+
+    def _read(self, index: int) -> tuple[int, float, float, bytes, bytes] | None:
+        """(generation, expires, lease, key, value) as one consistent snapshot.
+
+        None if every attempt overlapped a write, or a dead writer's torn one.
+        """
+        offset = self._offset(index)
+        mm = self._mm
+        for _ in range(READ_ATTEMPTS):
+            version, generation, expires, lease, key_len, value_len = (
+                SLOT_HEADER.unpack_from(mm, offset)
+            )
+            if version % 2:
+                time.sleep(0)
+                continue
+            key = mm[offset + KEY_OFFSET : offset + KEY_OFFSET + key_len]
+            value = mm[offset + VALUE_OFFSET : offset + VALUE_OFFSET + value_len]
+            if struct.unpack_from("<Q", mm, offset)[0] == version:
+                return generation, expires, lease, key, value
+        return None
+
+    def _poll(self, key: bytes) -> Any:
+        """The stored value, PENDING while a worker holds the lease to load it, else MISSING."""
+        snapshot = self._read(self._slot(key))
+        if snapshot is None:
+            return MISSING
+        _, expires, lease, stored_key, value = snapshot
+        if stored_key != key:
+            return MISSING
+        now = time.time()
+        if value and expires >= now:
+            return json.loads(value)
+        return PENDING if lease > now else MISSING
+
+    def get(self, key: str) -> Any:
+        value = self._poll(key.encode())
+        return MISSING if value is PENDING else value
+
+    def begin_fill(self, key: str) -> int | None:
+        """Take the lease to load `key`; returns the generation to pass to `finish_fill`.
+
+        None means another worker is loading it (or just did): wait for it instead.
+        """
+        raw_key = key.encode()
+        if len(raw_key) > MAX_KEY_SIZE:
+            raise ValueError(f"Shared cache keys are limited to {MAX_KEY_SIZE} bytes")
+        index = self._slot(raw_key)
+        now = time.time()
+        with self._locked(index) as (
+            version,
+            generation,
+            expires,
+            lease,
+            key_len,
+            value_len,
+        ):
+            if self._key_at(index, key_len) == raw_key and (
+                lease > now or (value_len and expires > now)
+            ):
+                return None
+            self._write(
+                index, version, generation, 0.0, now + LEASE_SECONDS, raw_key, b""
+            )
+            return generation
+
+    def finish_fill(self, key: str, generation: int, value: Any) -> bool:
+        """Store a loaded value, unless it was invalidated while it was loading."""
+        raw_key = key.encode()
+        data = json.dumps(value, separators=(",", ":")).encode()
+        if VALUE_OFFSET + len(data) > self.slot_size:
+            logger.debug(
+                "%s is too large for the shared cache (%d bytes)", key, len(data)
+            )
+            self.abort_fill(key, generation)
+            return False
+        index = self._slot(raw_key)
+        with self._locked(index) as (version, current, _, _, key_len, _):
+            # An eviction since begin_fill bumped the generation and cleared the lease
+            if self._key_at(index, key_len) != raw_key or current != generation:
+                return False
+            self._write(
+                index, version, generation, time.time() + self.ttl, 0.0, raw_key, data
+            )
+            return True
+
+    def abort_fill(self, key: str, generation: int) -> None:
+        """Give up the lease, so whoever waits for the key loads it at once."""
+        raw_key = key.encode()
+        index = self._slot(raw_key)
+        with self._locked(index) as (version, current, _, _, key_len, _):
+            if self._key_at(index, key_len) == raw_key and current == generation:
+                self._write(index, version, generation, 0.0, 0.0, raw_key, b"")
+
+    def evict(self, keys: list[str]) -> None:
+        """Drop `keys` and every key below them ("campaigns" drops "campaigns:0:100")."""
+        everything = ALL_KEYS in keys
+        exact = {key.encode() for key in keys}
+        prefixes = tuple(f"{key}:".encode() for key in keys)
+
+        def matches(stored_key: bytes) -> bool:
+            return bool(stored_key) and (
+                everything or stored_key in exact or stored_key.startswith(prefixes)
+            )
+
+        for index in range(self.slots):
+            snapshot = self._read(index)
+            # A slot that cannot be read consistently is checked under its lock
+            if snapshot is not None and not matches(snapshot[3]):
+                continue
+            with self._locked(index) as (version, generation, _, _, key_len, _):
+                stored_key = self._key_at(index, key_len)
+                if matches(stored_key):
+                    # Keep the key so a fill that is in flight sees the new generation
+                    self._write(
+                        index, version, generation + 1, 0.0, 0.0, stored_key, b""
+                    )
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        raw_key = key.encode()
+        if len(raw_key) > MAX_KEY_SIZE:
+            return loader()
+        value = self._poll(raw_key)
+        (CACHE_MISSES if value is MISSING or value is PENDING else CACHE_HITS).inc()
+        if value is MISSING:
+            generation = self.begin_fill(key)
+            if generation is not None:
+                try:
+                    value = loader()
+                except BaseException:
+                    self.abort_fill(key, generation)
+                    raise
+                self.finish_fill(key, generation, value)
+                return value
+            value = self._poll(raw_key)
+        while value is PENDING:
+            time.sleep(WAIT_INTERVAL)
+            value = self._poll(raw_key)
+        # MISSING now means the lease holder gave up or its value was invalidated
+        return loader() if value is MISSING else value
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """`get_or_load` for an async loader; waiting for another worker yields the loop."""
+        raw_key = key.encode()
+        if len(raw_key) > MAX_KEY_SIZE:
+            return await loader()
+        value = self._poll(raw_key)
+        (CACHE_MISSES if value is MISSING or value is PENDING else CACHE_HITS).inc()
+        if value is MISSING:
+            generation = self.begin_fill(key)
+            if generation is not None:
+                try:
+                    value = await loader()
+                except BaseException:
+                    self.abort_fill(key, generation)
+                    raise
+                self.finish_fill(key, generation, value)
+                return value
+            value = self._poll(raw_key)
+        while value is PENDING:
+            await asyncio.sleep(WAIT_INTERVAL)
+            value = self._poll(raw_key)
+        return await loader() if value is MISSING else value
+
+
+_cache: SharedCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache | None:
+    """The host's shared cache, or None when SHARED_CACHE_PATH is not set."""
+    global _cache
+    if _cache is None and settings.SHARED_CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                cache = SharedCache(
+                    settings.SHARED_CACHE_PATH,
+                    settings.SHARED_CACHE_SLOTS,
+                    settings.SHARED_CACHE_SLOT_KB * 1024,
+                    settings.SHARED_CACHE_TTL_SECONDS,
+                )
+                get_invalidation_bus().subscribe(cache.evict)
+                _cache = cache
+    return _cache
+
+
+def shared_get_or_load(key: str, loader: Callable[[], Any]) -> Any:
+    """`loader()` through the shared cache when it is enabled; the value must be JSON."""
+    cache = get_shared_cache()
+    if cache is None:
+        return loader()
+    return cache.get_or_load(key, loader)
+
+
+async def shared_aget_or_load(key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """`shared_get_or_load` for an async loader."""
+    cache = get_shared_cache()
+    if cache is None:
+        return await loader()
+    return await cache.aget_or_load(key, loader)
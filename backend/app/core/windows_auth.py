@@ -1,6 +1,19 @@
 import os
 import getpass
-from typing import Tuple
+import logging
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional, Protocol, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from starlette.requests import HTTPConnection
+
+from app.core import db
+from app.core.config import settings
+from app.core.security import verify_access_token
+from app.models import User
 
 try:
     import win32api
@@ -14,40 +27,197 @@ try:
 except ImportError:
     LDAP3_AVAILABLE = False
 
-def get_windows_user(request) -> Tuple[str, str]:
+logger = logging.getLogger(__name__)
+
+
+class IdentityResolver(Protocol):
+    """One step of the identity chain.
+
+    `mode` is reported back to callers as the auth mode, `resolve` returns the
+    username or None to let the next resolver try.
     """
-    Returns Windows username using:
-    1. X-Forwarded-User header (IIS)
-    2. os.getlogin()
-    3. getpass.getuser()
-    4. win32api.GetUserName()
-    
-    Returns:
-        Tuple[str, str]: (username, auth_mode)
+
+    mode: str
+
+    def resolve(self, request: HTTPConnection) -> Optional[str]: ...
+
+
+@dataclass
+class IdentityResult:
+    username: Optional[str]
+    mode: str
+    # Seconds spent in each resolver that ran, in chain order
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+class IISHeaderResolver:
+    """X-Forwarded-User injected by IIS (already parsed by WindowsAuthMiddleware)."""
+
+    mode = "iis"
+
+    def resolve(self, request: HTTPConnection) -> Optional[str]:
+        state = request.scope.get("state") or {}
+        if "windows_user" in state:
+            username: Optional[str] = state["windows_user"]
+            return username
+        return request.headers.get("X-Forwarded-User")
+
+
+class TrustedProxyHeaderResolver:
+    """A user header set by a reverse proxy, honoured only from trusted proxy addresses."""
+
+    mode = "proxy"
+
+    def __init__(self, header: str, trusted_proxies: list[str]) -> None:
+        self.header = header
+        self.trusted_proxies = frozenset(trusted_proxies)
+
+    def resolve(self, request: HTTPConnection) -> Optional[str]:
+        if not request.client or request.client.host not in self.trusted_proxies:
+            return None
+        return request.headers.get(self.header)
+
+
+@lru_cache(maxsize=1)
+def get_native_identity() -> Optional[str]:
     """
-    # 1. IIS mode (if header exists)
-    iis_user = request.headers.get("X-Forwarded-User")
-    if iis_user:
-        return iis_user, "iis"
+    Returns the identity of the server process using:
+    1. os.getlogin()
+    2. getpass.getuser()
+    3. win32api.GetUserName()
 
-    # 2. Local native mode
+    The process identity can't change while we run, so this is computed once
+    (see `warm_identity_resolvers`) instead of retrying failing calls per request.
+    """
     try:
-        return os.getlogin(), "native"
-    except:
+        return os.getlogin()
+    except Exception:
         pass
 
     try:
-        return getpass.getuser(), "native"
-    except:
+        return getpass.getuser()
+    except Exception:
         pass
 
     if WIN32_AVAILABLE:
         try:
-            return win32api.GetUserName(), "native"
-        except:
+            return str(win32api.GetUserName())
+        except Exception:
             pass
 
-    return None, "unknown"
+    return None
+
+
+class NativeIdentityResolver:
+    """The account the server process runs as (local/native mode)."""
+
+    mode = "native"
+
+    def resolve(self, request: HTTPConnection) -> Optional[str]:
+        return get_native_identity()
+
+
+class JWTResolver:
+    """The user a valid Bearer token was issued to.
+
+    The token's `sub` is a user id, never a username: it is looked up to return
+    that user's username, and a token for an unknown id resolves to nobody.
+    """
+
+    mode = "jwt"
+
+    def __init__(self, bind: Optional[Engine] = None) -> None:
+        self.bind = bind
+
+    def resolve(self, request: HTTPConnection) -> Optional[str]:
+        authorization = request.headers.get("Authorization")
+        if not authorization or not authorization.startswith("Bearer "):
+            return None
+        payload = verify_access_token(authorization[len("Bearer ") :])
+        if not payload:
+            return None
+        try:
+            user_id = int(payload["sub"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        with Session(self.bind or db.engine) as session:
+            return session.exec(select(User.username).where(User.id == user_id)).first()
+
+
+class IdentityResolverChain:
+    def __init__(self, resolvers: list[IdentityResolver]) -> None:
+        self.resolvers = resolvers
+
+    def resolve(self, request: HTTPConnection) -> IdentityResult:
+        timings: dict[str, float] = {}
+        for resolver in self.resolvers:
+            start = time.perf_counter()
+            username = resolver.resolve(request)
+            timings[resolver.mode] = time.perf_counter() - start
+            if username:
+                return IdentityResult(username=username, mode=resolver.mode, timings=timings)
+        return IdentityResult(username=None, mode="unknown", timings=timings)
+
+
+def build_resolver(name: str) -> IdentityResolver:
+    if name == "iis_header":
+        return IISHeaderResolver()
+    if name == "proxy_header":
+        return TrustedProxyHeaderResolver(
+            header=settings.WINDOWS_PROXY_USER_HEADER,
+            trusted_proxies=list(settings.WINDOWS_TRUSTED_PROXIES),
+        )
+    if name == "native":
+        return NativeIdentityResolver()
+    if name == "jwt":
+        return JWTResolver()
+    raise ValueError(f"Unknown identity resolver: {name}")
+
+
+@lru_cache(maxsize=1)
+def get_identity_chain() -> IdentityResolverChain:
+    return IdentityResolverChain(
+        [build_resolver(name) for name in settings.WINDOWS_IDENTITY_RESOLVERS]
+    )
+
+
+def warm_identity_resolvers() -> None:
+    """Build the configured chain and resolve the static native identity at startup."""
+    chain = get_identity_chain()
+    if any(isinstance(r, NativeIdentityResolver) for r in chain.resolvers):
+        start = time.perf_counter()
+        identity = get_native_identity()
+        logger.info(
+            "Native identity resolved as %r in %.3f ms",
+            identity,
+            (time.perf_counter() - start) * 1000,
+        )
+
+
+def resolve_identity(request: HTTPConnection) -> IdentityResult:
+    """Run the configured resolver chain and record per-resolver timings on the request."""
+    result = get_identity_chain().resolve(request)
+    request.scope.setdefault("state", {})["identity_timings"] = result.timings
+    logger.debug(
+        "Identity %r via %s (%s)",
+        result.username,
+        result.mode,
+        ", ".join(f"{mode}={seconds * 1e6:.0f}us" for mode, seconds in result.timings.items()),
+    )
+    return result
+
+
+def get_windows_user(request) -> Tuple[Optional[str], str]:
+    """
+    Returns Windows username using the configured resolver chain
+    (`WINDOWS_IDENTITY_RESOLVERS`, by default the IIS header then the
+    native process identity).
+
+    Returns:
+        Tuple[Optional[str], str]: (username, auth_mode)
+    """
+    result = resolve_identity(request)
+    return result.username, result.mode
 
 def get_user_details(username: str) -> dict:
     """
@@ -61,12 +231,12 @@ def get_user_details(username: str) -> dict:
         "groups": [],
         "email": None
     }
-    
+
     if not LDAP3_AVAILABLE:
         return details
-        
+
     # TODO: Implement LDAP lookup for domain joined machines
     # This would require domain controller information and proper authentication
     # For now, we'll return the basic information
-    
-    return details
\ No newline at end of file
+
+    return details
@@ -3,16 +3,25 @@ from typing import Any
 
 from sqlmodel import Session, select
 
-from app.core.security import get_password_hash, verify_password
+from app.core.security import (
+    get_password_hash,
+    get_password_hashes_bulk,
+    verify_and_update_password,
+)
 # Import all models directly from their source files
 from app.models.item import Item, ItemCreate
 from app.models.user import User, UserCreate, UserUpdate
 from app.models.user_old import UserOld, UserCreateOld, UserUpdateOld, UpdatePassword
 from app.models.other import Message, Token, TokenPayload, NewPassword
 
-def create_user(*, session: Session, user_create: UserCreateOld) -> UserOld:
+def create_user(
+    *, session: Session, user_create: UserCreateOld, hashed_password: str | None = None
+) -> UserOld:
+    # Callers on the request path hash off-thread and pass the result in
+    if hashed_password is None:
+        hashed_password = get_password_hash(user_create.password)
     db_obj = UserOld.model_validate(
-        user_create, update={"hashed_password": get_password_hash(user_create.password)}
+        user_create, update={"hashed_password": hashed_password}
     )
     session.add(db_obj)
     session.commit()
@@ -36,17 +45,45 @@ def create_windows_user(*, session: Session, user_create: UserCreateOld) -> User
     session.refresh(db_obj)
     return db_obj
 
-def create_coupon_user(*, session: Session, user_create: UserCreate) -> User:
+def create_coupon_user(
+    *, session: Session, user_create: UserCreate, hashed_password: str | None = None
+) -> User:
     """Create a new coupon user."""
     # For coupon users, we'll hash the password normally
+    if hashed_password is None:
+        hashed_password = get_password_hash(user_create.password)
     db_obj = User.model_validate(
-        user_create, update={"hashed_password": get_password_hash(user_create.password)}
+        user_create, update={"hashed_password": hashed_password}
     )
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
     return db_obj
 
+def create_coupon_users(
+    *,
+    session: Session,
+    users_create: list[UserCreate],
+    hashed_passwords: list[str] | None = None,
+) -> list[User]:
+    """Create many coupon users in a single transaction.
+
+    Passwords are hashed in the bulk process pool unless already provided.
+    """
+    if hashed_passwords is None:
+        hashed_passwords = get_password_hashes_bulk(
+            [user_create.password for user_create in users_create]
+        )
+    db_objs = [
+        User.model_validate(user_create, update={"hashed_password": hashed_password})
+        for user_create, hashed_password in zip(users_create, hashed_passwords, strict=True)
+    ]
+    session.add_all(db_objs)
+    session.commit()
+    for db_obj in db_objs:
+        session.refresh(db_obj)
+    return db_objs
+
 def create_coupon_windows_user(*, session: Session, user_create: UserCreate) -> User:
     """Create a user for Windows authentication without hashing the password.
     
@@ -64,12 +101,18 @@ def create_coupon_windows_user(*, session: Session, user_create: UserCreate) ->
     session.refresh(db_obj)
     return db_obj
 
-def update_user(*, session: Session, db_user: UserOld, user_in: UserUpdateOld) -> Any:
+def update_user(
+    *,
+    session: Session,
+    db_user: UserOld,
+    user_in: UserUpdateOld,
+    hashed_password: str | None = None,
+) -> Any:
     user_data = user_in.model_dump(exclude_unset=True)
     extra_data = {}
     if "password" in user_data:
-        password = user_data["password"]
-        hashed_password = get_password_hash(password)
+        if hashed_password is None:
+            hashed_password = get_password_hash(user_data["password"])
         extra_data["hashed_password"] = hashed_password
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
@@ -99,8 +142,15 @@ def authenticate(*, session: Session, email: str, password: str) -> UserOld | No
     db_user = get_user_by_email(session=session, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, db_user.hashed_password)
+    if not verified:
         return None
+    if new_hash:
+        # Stored hash used an older cost factor; upgrade it transparently
+        db_user.hashed_password = new_hash
+        session.add(db_user)
+        session.commit()
+        session.refresh(db_user)
     return db_user
 
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: int) -> Item:
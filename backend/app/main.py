@@ -1,22 +1,87 @@
-import sentry_sdk
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.routes import metrics
 from app.core.config import settings
+from app.core.db import create_db_tables, get_engine
+from app.core.db_async import dispose_async_engine
+from app.core.db_pool import configure_threadpool
+from app.core.db_replicas import get_replica_router, run_replica_lag_checks
+from app.core.invalidation import get_invalidation_bus
+from app.core.metrics import REGISTRY
+from app.core.security import shutdown_hash_executors
+from app.core.shared_cache import get_shared_cache
+from app.core.sqlite import checkpoint_wal, run_wal_checkpoints
+from app.core.windows_auth import warm_identity_resolvers
+from app.core.middleware.compression import CompressionMiddleware
+from app.core.middleware.metrics import MetricsMiddleware
+from app.core.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.core.middleware.server_timing import ServerTimingMiddleware
 from app.core.middleware.windows_auth import WindowsAuthMiddleware
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
+    # Imported only when enabled; it pulls in its HTTP stack
+    import sentry_sdk
+
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    configure_threadpool()
+    engine = get_engine()
+    if settings.ENVIRONMENT == "local":
+        # Elsewhere the prestart script creates the schema once, before the workers start
+        await run_in_threadpool(create_db_tables, engine)
+    warm_identity_resolvers()
+    invalidation_bus = get_invalidation_bus()
+    invalidation_bus.start()
+    # Attach to (or lay out) the host's shared cache file before serving
+    get_shared_cache()
+    REGISTRY.merge_dead_workers()
+    wal_checkpoints = None
+    if (
+        engine.dialect.name == "sqlite"
+        and settings.SQLITE_PROFILE == "production"
+        and settings.SQLITE_CHECKPOINT_INTERVAL
+    ):
+        wal_checkpoints = asyncio.create_task(
+            run_wal_checkpoints(engine, settings.SQLITE_CHECKPOINT_INTERVAL)
+        )
+    replica_router = get_replica_router()
+    replica_lag_checks = None
+    if replica_router.replicas:
+        # Replicas stay unused until their lag has been measured once
+        replica_router.refresh_lag()
+        replica_lag_checks = asyncio.create_task(
+            run_replica_lag_checks(replica_router, settings.DB_REPLICA_LAG_CHECK_INTERVAL)
+        )
+    yield
+    if replica_lag_checks is not None:
+        replica_lag_checks.cancel()
+    await replica_router.dispose()
+    if wal_checkpoints is not None:
+        wal_checkpoints.cancel()
+        checkpoint_wal(engine, "TRUNCATE")
+    invalidation_bus.stop()
+    await dispose_async_engine()
+    shutdown_hash_executors()
+    REGISTRY.zero_gauges()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Add Windows authentication middleware
@@ -30,6 +95,22 @@ if settings.all_cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing", "X-Total-Count", "ETag"],
     )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
\ No newline at end of file
+if settings.DB_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.COMPRESSION_ENCODINGS:
+    app.add_middleware(CompressionMiddleware)
+
+if settings.METRICS_ENABLED:
+    # Inside ServerTimingMiddleware, whose per-request SQL counts it reports
+    app.add_middleware(MetricsMiddleware)
+
+# Outermost, so the timings cover the whole middleware stack
+app.add_middleware(ServerTimingMiddleware)
+
+app.include_router(api_router, prefix=settings.API_V1_STR)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
\ No newline at end of file
@@ -1,15 +1,19 @@
 # Models package
 from app.models.user import User, UserCreate, UserRead, UserUpdate
-from app.models.campaign import Campaign, CampaignCreate, CampaignRead, CampaignUpdate
-from app.models.coupon import Coupon, CouponCreate, CouponRead, CouponUpdate
+from app.models.campaign import Campaign, CampaignCreate, CampaignRead, CampaignStats, CampaignUpdate
+from app.models.coupon import Coupon, CouponCreate, CouponRead, CouponSearchPage, CouponUpdate
+from app.models.rollup import CampaignHourlyRollup, CampaignTimeseriesPoint
+from app.models.version import ResourceVersion
 from app.models.user_old import UserBaseOld, UserCreateOld, UserRegister, UserUpdateOld, UserUpdateMe, UserOld, UserOutOld
 from app.models.item import ItemBase, ItemCreate, ItemUpdate, Item, ItemOut
 from app.models.other import Message, Token, TokenPayload, NewPassword
 
 __all__ = [
     "User", "UserCreate", "UserRead", "UserUpdate",
-    "Campaign", "CampaignCreate", "CampaignRead", "CampaignUpdate",
-    "Coupon", "CouponCreate", "CouponRead", "CouponUpdate",
+    "Campaign", "CampaignCreate", "CampaignRead", "CampaignStats", "CampaignUpdate",
+    "Coupon", "CouponCreate", "CouponRead", "CouponSearchPage", "CouponUpdate",
+    "CampaignHourlyRollup", "CampaignTimeseriesPoint",
+    "ResourceVersion",
     "UserBaseOld", "UserCreateOld", "UserRegister", "UserUpdateOld", "UserUpdateMe", "UserOld", "UserOutOld",
     "ItemBase", "ItemCreate", "ItemUpdate", "Item", "ItemOut",
     "Message", "Token", "TokenPayload", "NewPassword"
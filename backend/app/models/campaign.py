@@ -1,4 +1,5 @@
 from typing import Optional, List
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 from datetime import datetime
 
@@ -12,6 +13,17 @@ class CampaignBase(SQLModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Campaign(CampaignBase, table=True):
+    __table_args__ = tuple(
+        # Campaign name and description search, see Coupon
+        Index(
+            f"ix_campaign_{column}_trgm",
+            column,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql")
+        for column in ("name", "description")
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     # Use string reference to avoid circular import
     coupons: List["Coupon"] = Relationship(back_populates="campaign")
@@ -22,6 +34,15 @@ class CampaignCreate(CampaignBase):
 class CampaignRead(CampaignBase):
     id: int
 
+class CampaignStats(SQLModel):
+    campaign_id: int
+    name: str
+    total: int
+    assigned: int
+    redeemed: int
+    # Neither assigned nor redeemed
+    available: int
+
 class CampaignUpdate(SQLModel):
     name: Optional[str] = None
     description: Optional[str] = None
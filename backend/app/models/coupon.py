@@ -1,6 +1,7 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from sqlmodel import Field, Relationship, SQLModel
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON, text
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 
 # Import models for forward reference resolution
@@ -10,16 +11,39 @@ from app.models.user import User
 
 class CouponBase(SQLModel):
     code: str = Field(unique=True, index=True, max_length=255)
-    campaign_id: Optional[int] = Field(default=None, foreign_key="campaign.id")
+    campaign_id: Optional[int] = Field(default=None, foreign_key="campaign.id", index=True)
     assigned_to_user: Optional[int] = Field(default=None, foreign_key="user.id")
     assigned_at: Optional[datetime] = None
     redeemed: bool = Field(default=False)
     redeemed_at: Optional[datetime] = None
-    metadata_: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    # JSONB on PostgreSQL, so the GIN index below can serve ?meta.<key>= filters
+    metadata_: Optional[Dict[str, Any]] = Field(
+        default=None, sa_column=Column(JSON().with_variant(JSONB, "postgresql"))
+    )
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Coupon(CouponBase, table=True):
+    __table_args__ = (
+        # Code search (/coupons/search): trigrams serve ILIKE '%q%' on PostgreSQL;
+        # SQLite's LIKE is case-insensitive and can use a NOCASE index for 'q%'
+        Index(
+            "ix_coupon_code_trgm",
+            "code",
+            postgresql_using="gin",
+            postgresql_ops={"code": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_coupon_code_nocase", text("code COLLATE NOCASE")).ddl_if(dialect="sqlite"),
+        # Metadata filters (`@>`) on any key; SQLite's per-key indexes are in
+        # app.services.coupon_metadata
+        Index(
+            "ix_coupon_metadata_gin",
+            "metadata_",
+            postgresql_using="gin",
+            postgresql_ops={"metadata_": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     assigned_user: Optional[User] = Relationship(back_populates="coupons")
     # Use string reference to avoid circular import
@@ -38,4 +62,9 @@ class CouponUpdate(SQLModel):
     assigned_at: Optional[datetime] = None
     redeemed: Optional[bool] = None
     redeemed_at: Optional[datetime] = None
-    metadata_: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    metadata_: Optional[Dict[str, Any]] = None
+
+class CouponSearchPage(SQLModel):
+    data: List[CouponRead]
+    # Pass as `after` to get the next page; None on the last page
+    next_after: Optional[int] = None
\ No newline at end of file
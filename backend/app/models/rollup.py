@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class CampaignHourlyRollup(SQLModel, table=True):
+    # Coupons assigned and redeemed per campaign per hour (UTC, truncated to the
+    # hour). Kept up to date by app.services.rollups as coupons change, so charts
+    # never scan the coupon table.
+    campaign_id: int = Field(
+        foreign_key="campaign.id", primary_key=True, ondelete="CASCADE"
+    )
+    hour: datetime = Field(primary_key=True)
+    assigned: int = Field(default=0)
+    redeemed: int = Field(default=0)
+
+
+class CampaignTimeseriesPoint(SQLModel):
+    hour: datetime
+    assigned: int
+    redeemed: int
@@ -0,0 +1,9 @@
+from sqlmodel import Field, SQLModel
+
+
+class ResourceVersion(SQLModel, table=True):
+    # Counter bumped by app.services.versions in the same transaction as every
+    # change to the resource it names ("campaigns", "wallet:<user id>"); the
+    # read routes turn it into their ETag
+    key: str = Field(primary_key=True, max_length=64)
+    version: int = Field(default=0)
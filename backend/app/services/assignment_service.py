@@ -1,9 +1,19 @@
 from typing import List, Optional
-from sqlmodel import Session, select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.coupon import Coupon
 from app.models.user import User
 from app.models.campaign import Campaign
+from app.core.metrics import COUPON_ASSIGNMENT_DURATION
+from app.services.statements import CLAIMABLE_COUPON
 from datetime import datetime
+import time
+
+def _record_assignment(coupon: Optional[Coupon], start: float) -> None:
+    # "none": missing campaign or user, or no unassigned coupon left
+    COUPON_ASSIGNMENT_DURATION.labels("assigned" if coupon else "none").observe(
+        time.perf_counter() - start
+    )
 
 class AssignmentService:
     def __init__(self, session: Session):
@@ -11,6 +21,12 @@ class AssignmentService:
 
     def assign_campaign_coupons_to_user(self, campaign_id: int, user_id: int) -> Optional[Coupon]:
         """Assign one unassigned coupon from a campaign to a user."""
+        start = time.perf_counter()
+        coupon = self._assign_campaign_coupon(campaign_id, user_id)
+        _record_assignment(coupon, start)
+        return coupon
+
+    def _assign_campaign_coupon(self, campaign_id: int, user_id: int) -> Optional[Coupon]:
         # Check if campaign exists
         campaign = self.session.get(Campaign, campaign_id)
         if not campaign:
@@ -21,17 +37,13 @@ class AssignmentService:
         if not user:
             return None
 
-        # Find unassigned coupons belonging to that campaign
-        statement = select(Coupon).where(
-            Coupon.campaign_id == campaign_id,
-            Coupon.assigned_to_user.is_(None)
-        )
-        
-        unassigned_coupons = self.session.exec(statement).all()
+        # Find an unassigned coupon belonging to that campaign;
+        # only one coupon is assigned per user (as per business rule)
+        coupon_to_assign = self.session.exec(
+            CLAIMABLE_COUPON, params={"campaign_id": campaign_id}
+        ).first()
         
-        # Assign only one coupon per user (as per business rule)
-        if unassigned_coupons:
-            coupon_to_assign = unassigned_coupons[0]
+        if coupon_to_assign:
             coupon_to_assign.assigned_to_user = user_id
             coupon_to_assign.assigned_at = datetime.utcnow()
             coupon_to_assign.updated_at = datetime.utcnow()
@@ -52,4 +64,57 @@ class AssignmentService:
             if assigned_coupon:
                 assigned_coupons.append(assigned_coupon)
                 
-        return assigned_coupons
\ No newline at end of file
+        return assigned_coupons
+
+
+class AsyncAssignmentService:
+    """AssignmentService on an AsyncSession, for the `async def` campaign routes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def assign_campaign_coupons_to_user(self, campaign_id: int, user_id: int) -> Optional[Coupon]:
+        """Assign one unassigned coupon from a campaign to a user."""
+        start = time.perf_counter()
+        coupon = await self._assign_campaign_coupon(campaign_id, user_id)
+        _record_assignment(coupon, start)
+        return coupon
+
+    async def _assign_campaign_coupon(self, campaign_id: int, user_id: int) -> Optional[Coupon]:
+        # Check if campaign exists
+        campaign = await self.session.get(Campaign, campaign_id)
+        if not campaign:
+            return None
+
+        # Check if user exists
+        user = await self.session.get(User, user_id)
+        if not user:
+            return None
+
+        # Only one coupon is assigned per user, so fetch just the first candidate
+        coupon_to_assign = (
+            await self.session.exec(CLAIMABLE_COUPON, params={"campaign_id": campaign_id})
+        ).first()
+
+        if coupon_to_assign:
+            coupon_to_assign.assigned_to_user = user_id
+            coupon_to_assign.assigned_at = datetime.utcnow()
+            coupon_to_assign.updated_at = datetime.utcnow()
+
+            self.session.add(coupon_to_assign)
+            await self.session.commit()
+            await self.session.refresh(coupon_to_assign)
+            return coupon_to_assign
+
+        return None
+
+    async def assign_coupons_to_users(self, campaign_id: int, user_ids: List[int]) -> List[Coupon]:
+        """Assign coupons from a campaign to multiple users."""
+        assigned_coupons = []
+
+        for user_id in user_ids:
+            assigned_coupon = await self.assign_campaign_coupons_to_user(campaign_id, user_id)
+            if assigned_coupon:
+                assigned_coupons.append(assigned_coupon)
+
+        return assigned_coupons
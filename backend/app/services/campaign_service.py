@@ -1,6 +1,19 @@
+from datetime import datetime
 from typing import List, Optional
-from sqlmodel import Session, select
-from app.models.campaign import Campaign, CampaignCreate, CampaignUpdate
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.cache import MISSING, LocalCache
+from app.core.config import settings
+from app.core.db_replicas import is_replica_session
+from app.models.campaign import Campaign, CampaignCreate, CampaignStats, CampaignUpdate
+from app.models.rollup import CampaignTimeseriesPoint
+from app.services.rollups import densify
+from app.services.statements import CAMPAIGN_STATS, CAMPAIGN_TIMESERIES, CAMPAIGNS_PAGE
+
+# Evicted by the invalidation bus whenever a coupon or campaign changes
+campaign_stats_cache = LocalCache(
+    ttl=settings.CAMPAIGN_STATS_CACHE_SECONDS, maxsize=1, name="campaign_stats"
+)
 
 class CampaignService:
     def __init__(self, session: Session):
@@ -12,8 +25,28 @@ class CampaignService:
 
     def get_campaigns(self, skip: int = 0, limit: int = 100) -> List[Campaign]:
         """Get all campaigns with pagination."""
-        statement = select(Campaign).offset(skip).limit(limit)
-        return self.session.exec(statement).all()
+        return self.session.exec(CAMPAIGNS_PAGE, params={"skip": skip, "limit": limit}).all()
+
+    def get_campaign_stats(self) -> List[CampaignStats]:
+        """Get coupon counts for every campaign."""
+        return [CampaignStats.model_validate(row._mapping) for row in self.session.exec(CAMPAIGN_STATS)]
+
+    def get_cached_campaign_stats(self) -> List[CampaignStats]:
+        """Get coupon counts for every campaign, from this worker's cache when current."""
+        stats: List[CampaignStats] = campaign_stats_cache.get("campaigns:stats")
+        if stats is MISSING:
+            stats = self.get_campaign_stats()
+            # A lagging replica would cache counts an eviction has already dropped
+            if not is_replica_session(self.session):
+                campaign_stats_cache.set("campaigns:stats", stats)
+        return stats
+
+    def get_campaign_timeseries(
+        self, campaign_id: int, since: datetime, until: datetime
+    ) -> List[CampaignTimeseriesPoint]:
+        """Get hourly assignment and redemption counts from the rollups."""
+        params = {"campaign_id": campaign_id, "since": since, "until": until}
+        return densify(self.session.exec(CAMPAIGN_TIMESERIES, params=params).all(), since, until)
 
     def create_campaign(self, campaign_create: CampaignCreate) -> Campaign:
         """Create a new campaign."""
@@ -46,4 +79,77 @@ class CampaignService:
             
         self.session.delete(db_campaign)
         self.session.commit()
-        return True
\ No newline at end of file
+        return True
+
+
+class AsyncCampaignService:
+    """CampaignService on an AsyncSession, for the `async def` campaign routes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_campaign(self, campaign_id: int) -> Optional[Campaign]:
+        """Get a campaign by ID."""
+        return await self.session.get(Campaign, campaign_id)
+
+    async def get_campaigns(self, skip: int = 0, limit: int = 100) -> List[Campaign]:
+        """Get all campaigns with pagination."""
+        return (
+            await self.session.exec(CAMPAIGNS_PAGE, params={"skip": skip, "limit": limit})
+        ).all()
+
+    async def get_campaign_stats(self) -> List[CampaignStats]:
+        """Get coupon counts for every campaign."""
+        rows = await self.session.exec(CAMPAIGN_STATS)
+        return [CampaignStats.model_validate(row._mapping) for row in rows]
+
+    async def get_cached_campaign_stats(self) -> List[CampaignStats]:
+        """Get coupon counts for every campaign, from this worker's cache when current."""
+        stats: List[CampaignStats] = campaign_stats_cache.get("campaigns:stats")
+        if stats is MISSING:
+            stats = await self.get_campaign_stats()
+            # A lagging replica would cache counts an eviction has already dropped
+            if not is_replica_session(self.session):
+                campaign_stats_cache.set("campaigns:stats", stats)
+        return stats
+
+    async def get_campaign_timeseries(
+        self, campaign_id: int, since: datetime, until: datetime
+    ) -> List[CampaignTimeseriesPoint]:
+        """Get hourly assignment and redemption counts from the rollups."""
+        params = {"campaign_id": campaign_id, "since": since, "until": until}
+        rows = (await self.session.exec(CAMPAIGN_TIMESERIES, params=params)).all()
+        return densify(rows, since, until)
+
+    async def create_campaign(self, campaign_create: CampaignCreate) -> Campaign:
+        """Create a new campaign."""
+        db_campaign = Campaign.model_validate(campaign_create)
+        self.session.add(db_campaign)
+        await self.session.commit()
+        await self.session.refresh(db_campaign)
+        return db_campaign
+
+    async def update_campaign(self, campaign_id: int, campaign_update: CampaignUpdate) -> Optional[Campaign]:
+        """Update an existing campaign."""
+        db_campaign = await self.get_campaign(campaign_id)
+        if not db_campaign:
+            return None
+
+        campaign_data = campaign_update.dict(exclude_unset=True)
+        for key, value in campaign_data.items():
+            setattr(db_campaign, key, value)
+
+        self.session.add(db_campaign)
+        await self.session.commit()
+        await self.session.refresh(db_campaign)
+        return db_campaign
+
+    async def delete_campaign(self, campaign_id: int) -> bool:
+        """Delete a campaign."""
+        db_campaign = await self.get_campaign(campaign_id)
+        if not db_campaign:
+            return False
+
+        await self.session.delete(db_campaign)
+        await self.session.commit()
+        return True
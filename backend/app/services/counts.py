@@ -0,0 +1,122 @@
+"""Row counts for paginated listings, at the price the client asks for.
+
+`?count=` picks the price per request:
+
+- `none`: no count.
+- `exact`: COUNT(*) over the listing's filters, a full scan of what matches.
+- `estimate`: whatever the listing registered as its cheap count. That is the
+  planner's table size for whole-table listings (`pg_class.reltuples`, or
+  SQLite's largest rowid), totals derived from the campaign stats counters, or
+  an exact count cached for COUNT_CACHE_SECONDS.
+
+Every strategy takes a sync Session; async routes run them through
+`AsyncSession.run_sync`.
+"""
+
+from collections.abc import Callable
+from typing import Any, Literal
+
+from sqlalchemy import Select, Table, func, literal_column, select
+from sqlmodel import Session
+
+from app.core.cache import MISSING, LocalCache
+from app.core.config import settings
+from app.models.campaign import CampaignStats
+from app.services.campaign_service import CampaignService
+
+CountMode = Literal["none", "estimate", "exact"]
+
+# A listing's count, given its session and statement parameters
+Counter = Callable[[Session, dict[str, Any]], int]
+
+# Not evicted on writes: an estimate may be COUNT_CACHE_SECONDS behind
+count_cache = LocalCache(ttl=settings.COUNT_CACHE_SECONDS, maxsize=4096, name="counts")
+
+
+def count_statement(statement: Select[Any]) -> Select[Any]:
+    """COUNT(*) of the rows `statement` selects, ignoring its ordering and paging."""
+    return select(func.count()).select_from(
+        statement.order_by(None).limit(None).offset(None).subquery()
+    )
+
+
+def exact(statement: Select[Any]) -> Counter:
+    counter = count_statement(statement)
+
+    def count(session: Session, params: dict[str, Any]) -> int:
+        return int(session.execute(counter, params).scalar_one())
+
+    return count
+
+
+def cached(name: str, statement: Select[Any]) -> Counter:
+    """An exact count, reused for COUNT_CACHE_SECONDS per distinct parameters."""
+    count_exactly = exact(statement)
+
+    def count(session: Session, params: dict[str, Any]) -> int:
+        key = f"count:{name}:{sorted(params.items())}"
+        total = count_cache.get(key)
+        if total is MISSING:
+            total = count_exactly(session, params)
+            count_cache.set(key, total)
+        return int(total)
+
+    return count
+
+
+def table_size(table: Table) -> Counter:
+    """The planner's idea of the table's size: no scan, but as stale as the last ANALYZE.
+
+    SQLite keeps no live estimate, so it is the largest rowid there: one index
+    probe, exact until rows are deleted.
+    """
+    count_exactly = cached(table.name, select(table))
+
+    def count(session: Session, params: dict[str, Any]) -> int:
+        dialect = session.get_bind().dialect
+        if dialect.name == "sqlite":
+            statement: Select[tuple[int]] = select(
+                func.coalesce(func.max(literal_column("rowid")), 0)
+            )
+            return int(session.execute(statement.select_from(table)).scalar_one())
+        name = dialect.identifier_preparer.format_table(table)  # type: ignore[no-untyped-call]
+        reltuples = session.execute(
+            select(literal_column("reltuples"))
+            .select_from(literal_column("pg_class"))
+            .where(literal_column("oid") == func.to_regclass(name))
+        ).scalar()
+        # -1 (or NULL) until the table is first vacuumed or analyzed
+        if reltuples is None or reltuples < 0:
+            return count_exactly(session, params)
+        return int(reltuples)
+
+    return count
+
+
+def from_campaign_stats(
+    derive: Callable[[list[CampaignStats], dict[str, Any]], int],
+) -> Counter:
+    """A count derived from the per-campaign counters of GET /campaigns/stats.
+
+    Shares its cache, which every coupon commit evicts, so it is current;
+    coupons outside any campaign are not counted.
+    """
+
+    def count(session: Session, params: dict[str, Any]) -> int:
+        return derive(CampaignService(session).get_cached_campaign_stats(), params)
+
+    return count
+
+
+def resolve_count(
+    session: Session,
+    mode: CountMode,
+    statement: Select[Any],
+    params: dict[str, Any],
+    estimate: Counter,
+) -> int | None:
+    if mode == "none":
+        return None
+    if mode == "exact":
+        return exact(statement)(session, params)
+    return estimate(session, params)
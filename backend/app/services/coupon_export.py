@@ -0,0 +1,166 @@
+"""Full coupon exports, for finance reconciliation.
+
+Rows are fetched `EXPORT_BATCH_SIZE` at a time (`yield_per`: a server-side
+cursor on PostgreSQL, `fetchmany` on SQLite) and written out batch by batch,
+so memory stays flat however large the campaign is.
+"""
+
+import csv
+import io
+import os
+import tempfile
+from collections.abc import AsyncIterator, Sequence
+from datetime import date
+from typing import Any, Literal
+
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select
+
+from app.core.config import settings
+from app.models.campaign import Campaign
+from app.models.coupon import Coupon
+from app.models.user import User
+
+ExportStatus = Literal["available", "assigned", "redeemed"]
+
+EXPORT_COLUMNS = (
+    "id",
+    "code",
+    "campaign_id",
+    "campaign",
+    "assigned_to_user",
+    "assigned_username",
+    "assigned_at",
+    "redeemed",
+    "redeemed_at",
+    "created_at",
+)
+
+# Spreadsheet apps read a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Rows per xlsx worksheet, header included; longer exports continue on a new sheet
+XLSX_MAX_ROWS = 1_048_576
+
+
+def export_statement(
+    campaign_id: int | None = None, status: ExportStatus | None = None
+) -> Select[Any]:
+    """Coupons matching the filters, as plain rows in EXPORT_COLUMNS order."""
+    statement: Select[Any] = (
+        select(  # type: ignore[call-overload, misc]  # sqlmodel types select() up to 4 columns
+            Coupon.id,
+            Coupon.code,
+            Coupon.campaign_id,
+            Campaign.name,
+            Coupon.assigned_to_user,
+            User.username,
+            Coupon.assigned_at,
+            Coupon.redeemed,
+            Coupon.redeemed_at,
+            Coupon.created_at,
+        )
+        .outerjoin(Campaign, Coupon.campaign_id == Campaign.id)
+        .outerjoin(User, Coupon.assigned_to_user == User.id)
+        .order_by(col(Coupon.id))
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    if campaign_id is not None:
+        statement = statement.where(Coupon.campaign_id == campaign_id)
+    if status == "available":
+        statement = statement.where(
+            col(Coupon.assigned_to_user).is_(None),
+            Coupon.redeemed == False,  # noqa: E712
+        )
+    elif status == "assigned":
+        statement = statement.where(
+            col(Coupon.assigned_to_user).is_not(None),
+            Coupon.redeemed == False,  # noqa: E712
+        )
+    elif status == "redeemed":
+        statement = statement.where(Coupon.redeemed == True)  # noqa: E712
+    return statement
+
+
+def export_filename(
+    extension: str, campaign_id: int | None = None, status: ExportStatus | None = None
+) -> str:
+    parts = ["coupons"]
+    if campaign_id is not None:
+        parts.append(f"campaign-{campaign_id}")
+    if status is not None:
+        parts.append(status)
+    parts.append(date.today().isoformat())
+    return f"{'-'.join(parts)}.{extension}"
+
+
+def _csv_cell(value: Any) -> Any:
+    """Quote text that would run as a formula, e.g. a coupon code "=1+1", with a leading '."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _csv_chunk(rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_cell(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_csv(
+    engine: AsyncEngine, statement: Select[Any]
+) -> AsyncIterator[bytes]:
+    """The export as CSV, one chunk per fetched batch.
+
+    Opens its own session: the request's session is closed before a streamed
+    body is sent.
+    """
+    yield _csv_chunk([EXPORT_COLUMNS])
+    async with AsyncSession(engine) as session:
+        result = await session.stream(statement)
+        async for rows in result.partitions():
+            yield _csv_chunk(rows)
+
+
+def write_xlsx(engine: Engine, statement: Select[Any]) -> str:
+    """Write the export to a temporary xlsx file and return its path.
+
+    xlsx is a zip archive that can only be finished once every row is known, so
+    it is built on disk with openpyxl's write-only workbook (rows go straight to
+    temporary files, not memory) and sent once complete.
+    """
+    from openpyxl import Workbook  # type: ignore[import-untyped]
+    from openpyxl.cell import WriteOnlyCell  # type: ignore[import-untyped]
+
+    workbook = Workbook(write_only=True)
+    sheet: Any = None
+    sheet_rows = XLSX_MAX_ROWS
+    with Session(engine) as session:
+        for row in session.exec(statement):
+            if sheet_rows == XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Coupons {len(workbook.worksheets) + 1}")
+                sheet.append(EXPORT_COLUMNS)
+                sheet_rows = 1
+            cells = []
+            for value in row:
+                if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+                    # openpyxl stores text starting with "=" as a formula; keep it a string
+                    value = WriteOnlyCell(sheet, value)
+                    value.data_type = "s"
+                cells.append(value)
+            sheet.append(cells)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet("Coupons 1").append(EXPORT_COLUMNS)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
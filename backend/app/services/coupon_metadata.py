@@ -0,0 +1,121 @@
+"""Filtering coupons on their metadata_ (`?meta.store=123&meta.tier=gold`).
+
+On PostgreSQL metadata_ is JSONB with one GIN index (jsonb_path_ops), so a
+filter is a containment test (`@>`) that the index serves for any key. SQLite
+has no such index: each key in COUPON_METADATA_INDEXED_KEYS gets an expression
+index on `json_extract(metadata_, '$.<key>')`, which a filter written with the
+same expression uses. Other keys still filter, by scanning.
+"""
+
+import json
+import re
+from collections.abc import Mapping
+from typing import Any, TypeVar
+
+from sqlalchemy import Index, Select, and_, bindparam, cast, func, literal_column, or_
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import col
+from starlette.datastructures import QueryParams
+
+from app.core.config import settings
+from app.models.coupon import Coupon
+
+FILTER_PREFIX = "meta."
+# Dots separate nested keys: meta.store.region
+KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*")
+
+# key -> accepted values, any of which matches
+MetadataFilters = dict[str, list[str]]
+
+SelectT = TypeVar("SelectT", bound=Select[Any])
+
+
+def _path(key: str) -> Any:
+    # A literal rather than a bound path, so it is the expression that was indexed
+    return literal_column(f"'$.{key}'")
+
+
+def _index_name(key: str) -> str:
+    return "ix_coupon_metadata_" + re.sub(r"[^A-Za-z0-9_]", "_", key)
+
+
+METADATA_INDEXES = [
+    Index(
+        _index_name(key),
+        func.json_extract(col(Coupon.metadata_), _path(key)),
+    ).ddl_if(dialect="sqlite")
+    for key in settings.COUPON_METADATA_INDEXED_KEYS
+    if KEY_PATTERN.fullmatch(key)
+]
+
+
+def parse_metadata_filters(query_params: QueryParams) -> MetadataFilters:
+    """The `meta.<key>=<value>` parameters; a repeated key matches any of its values."""
+    filters: MetadataFilters = {}
+    for name in query_params.keys():
+        if not name.startswith(FILTER_PREFIX):
+            continue
+        key = name[len(FILTER_PREFIX) :]
+        if not KEY_PATTERN.fullmatch(key):
+            raise ValueError(f"Invalid metadata key: {key!r}")
+        filters[key] = query_params.getlist(name)
+    return filters
+
+
+def _candidates(values: list[str]) -> list[Any]:
+    """Each value as given, and as the JSON number or boolean it spells.
+
+    Query strings are text, while imported metadata holds `"store": 123` as
+    often as `"store": "123"`; either matches.
+    """
+    candidates: list[Any] = []
+    for value in values:
+        candidates.append(value)
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            continue
+        if isinstance(parsed, int | float) and parsed not in candidates:
+            candidates.append(parsed)
+    return candidates
+
+
+def _nested(key: str, value: Any) -> dict[str, Any]:
+    *parents, leaf = key.split(".")
+    document = {leaf: value}
+    for part in reversed(parents):
+        document = {part: document}
+    return document
+
+
+def metadata_criteria(filters: Mapping[str, list[str]], dialect: str) -> list[Any]:
+    criteria = []
+    for key, values in filters.items():
+        candidates = _candidates(values)
+        if dialect == "postgresql":
+            criteria.append(
+                or_(
+                    *(
+                        col(Coupon.metadata_).op("@>")(
+                            cast(
+                                bindparam(None, _nested(key, value), type_=JSONB), JSONB
+                            )
+                        )
+                        for value in candidates
+                    )
+                )
+            )
+        else:
+            criteria.append(
+                func.json_extract(Coupon.metadata_, _path(key)).in_(candidates)
+            )
+    return criteria
+
+
+def filter_by_metadata(
+    statement: SelectT, filters: Mapping[str, list[str]] | None, dialect: str
+) -> SelectT:
+    """`statement` restricted to coupons whose metadata matches every filter."""
+    if not filters:
+        return statement
+    return statement.where(and_(*metadata_criteria(filters, dialect)))
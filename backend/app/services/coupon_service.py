@@ -1,10 +1,93 @@
-from typing import List, Optional
-from sqlmodel import Session, select
-from app.models.coupon import Coupon, CouponCreate, CouponUpdate
+from collections.abc import Sequence
+from typing import Any, List, Literal, Optional, cast
+from sqlmodel import Session
+from sqlmodel.sql.expression import SelectOfScalar
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.coupon import Coupon, CouponCreate, CouponSearchPage, CouponUpdate
 from app.models.user import User
 from app.models.campaign import Campaign
+from app.services.coupon_metadata import MetadataFilters, SelectT, filter_by_metadata
+from app.services.counts import (
+    CountMode,
+    Counter,
+    cached,
+    exact,
+    from_campaign_stats,
+    resolve_count,
+    table_size,
+)
+from app.services.statements import (
+    AVAILABLE_COUPONS,
+    CAMPAIGN_COUPONS,
+    COUPON_SEARCH,
+    COUPON_SEARCH_SQLITE,
+    COUPONS_PAGE,
+    SearchStatements,
+    UNASSIGNED_COUPONS,
+    USER_COUPONS,
+)
 from datetime import datetime
 
+SearchMatch = Literal["prefix", "contains"]
+
+
+def _search_pattern(query: str, match: SearchMatch) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if match == "prefix" else f"%{escaped}%"
+
+
+def _search_statements(dialect: str) -> SearchStatements:
+    return COUPON_SEARCH_SQLITE if dialect == "sqlite" else COUPON_SEARCH
+
+
+def _search_query(
+    statements: SearchStatements,
+    pattern: str,
+    campaign_ids: Sequence[Optional[int]],
+    after: int,
+    limit: int,
+) -> tuple[SelectOfScalar[Coupon], dict[str, Any]]:
+    params = {
+        "pattern": pattern,
+        "after": after,
+        # One row more than the page tells whether there is a next one
+        "limit": limit + 1,
+    }
+    if not campaign_ids:
+        return statements.by_code, params
+    return statements.coupons, {**params, "campaign_ids": campaign_ids}
+
+
+# Each listing's statement, and how it answers ?count=estimate when unfiltered
+COUPON_COUNTS: dict[str, tuple[SelectOfScalar[Coupon], Counter]] = {
+    "all": (COUPONS_PAGE, table_size(Coupon.__table__)),  # type: ignore[attr-defined]
+    # One user's few coupons: the exact count is already the cheap one
+    "user": (USER_COUPONS, exact(USER_COUPONS)),
+    "unassigned": (
+        UNASSIGNED_COUPONS,
+        from_campaign_stats(lambda stats, params: sum(s.total - s.assigned for s in stats)),
+    ),
+    "available": (
+        AVAILABLE_COUPONS,
+        from_campaign_stats(lambda stats, params: sum(s.available for s in stats)),
+    ),
+    "campaign": (
+        CAMPAIGN_COUPONS,
+        from_campaign_stats(
+            lambda stats, params: next(
+                (s.total for s in stats if s.campaign_id == params["campaign_id"]), 0
+            )
+        ),
+    ),
+}
+
+
+def _search_page(coupons: Sequence[Coupon], limit: int) -> CouponSearchPage:
+    if len(coupons) > limit:
+        return CouponSearchPage(data=list(coupons[:limit]), next_after=coupons[limit - 1].id)
+    return CouponSearchPage(data=list(coupons))
+
+
 class CouponService:
     def __init__(self, session: Session):
         self.session = session
@@ -13,33 +96,81 @@ class CouponService:
         """Get a coupon by ID."""
         return self.session.get(Coupon, coupon_id)
 
-    def get_coupons(self, skip: int = 0, limit: int = 100) -> List[Coupon]:
+    def _filtered(self, statement: SelectT, metadata: Optional[MetadataFilters]) -> SelectT:
+        if not metadata:
+            return statement
+        return filter_by_metadata(statement, metadata, self.session.get_bind().dialect.name)
+
+    def get_coupons(
+        self, skip: int = 0, limit: int = 100, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
         """Get all coupons with pagination."""
-        statement = select(Coupon).offset(skip).limit(limit)
-        return self.session.exec(statement).all()
+        return self.session.exec(
+            self._filtered(COUPONS_PAGE, metadata), params={"skip": skip, "limit": limit}
+        ).all()
 
-    def get_user_coupons(self, user_id: int) -> List[Coupon]:
+    def get_user_coupons(
+        self, user_id: int, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
         """Get all coupons assigned to a specific user."""
-        statement = select(Coupon).where(Coupon.assigned_to_user == user_id)
-        return self.session.exec(statement).all()
+        return self.session.exec(
+            self._filtered(USER_COUPONS, metadata), params={"user_id": user_id}
+        ).all()
 
-    def get_unassigned_coupons(self, skip: int = 0, limit: int = 100) -> List[Coupon]:
+    def get_unassigned_coupons(
+        self, skip: int = 0, limit: int = 100, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
         """Get all unassigned coupons."""
-        statement = select(Coupon).where(Coupon.assigned_to_user.is_(None)).offset(skip).limit(limit)
-        return self.session.exec(statement).all()
+        return self.session.exec(
+            self._filtered(UNASSIGNED_COUPONS, metadata), params={"skip": skip, "limit": limit}
+        ).all()
 
-    def get_available_coupons(self, skip: int = 0, limit: int = 100) -> List[Coupon]:
+    def get_available_coupons(
+        self, skip: int = 0, limit: int = 100, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
         """Get all available (unassigned and unredeemed) coupons."""
-        statement = select(Coupon).where(
-            Coupon.assigned_to_user.is_(None),
-            Coupon.redeemed == False
-        ).offset(skip).limit(limit)
-        return self.session.exec(statement).all()
+        return self.session.exec(
+            self._filtered(AVAILABLE_COUPONS, metadata), params={"skip": skip, "limit": limit}
+        ).all()
 
-    def get_campaign_coupons(self, campaign_id: int, skip: int = 0, limit: int = 100) -> List[Coupon]:
+    def get_campaign_coupons(
+        self,
+        campaign_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        metadata: Optional[MetadataFilters] = None,
+    ) -> List[Coupon]:
         """Get all coupons for a specific campaign."""
-        statement = select(Coupon).where(Coupon.campaign_id == campaign_id).offset(skip).limit(limit)
-        return self.session.exec(statement).all()
+        return self.session.exec(
+            self._filtered(CAMPAIGN_COUPONS, metadata),
+            params={"campaign_id": campaign_id, "skip": skip, "limit": limit},
+        ).all()
+
+    def count_coupons(
+        self,
+        listing: str,
+        mode: CountMode,
+        params: Optional[dict[str, Any]] = None,
+        metadata: Optional[MetadataFilters] = None,
+    ) -> Optional[int]:
+        """Count a listing of COUPON_COUNTS (None for count=none)."""
+        statement, estimate = COUPON_COUNTS[listing]
+        if metadata:
+            # The table size and campaign counters know nothing of metadata
+            statement = self._filtered(statement, metadata)
+            estimate = cached(f"coupons:{listing}:{sorted(metadata.items())}", statement)
+        return resolve_count(self.session, mode, statement, params or {}, estimate)
+
+    def search_coupons(
+        self, query: str, match: SearchMatch = "contains", after: int = 0, limit: int = 50
+    ) -> CouponSearchPage:
+        """Coupons whose code, campaign name or campaign description match, by id."""
+        statements = _search_statements(self.session.get_bind().dialect.name)
+        pattern = _search_pattern(query, match)
+        campaign_ids = self.session.exec(statements.campaigns, params={"pattern": pattern}).all()
+        statement, params = _search_query(statements, pattern, campaign_ids, after, limit)
+        coupons = self.session.exec(statement, params=params).all()
+        return _search_page(coupons, limit)
 
     def create_coupon(self, coupon_create: CouponCreate) -> Coupon:
         """Create a new coupon."""
@@ -113,4 +244,180 @@ class CouponService:
         self.session.add(db_coupon)
         self.session.commit()
         self.session.refresh(db_coupon)
-        return db_coupon
\ No newline at end of file
+        return db_coupon
+
+
+class AsyncCouponService:
+    """CouponService on an AsyncSession, for the `async def` coupon routes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_coupon(self, coupon_id: int) -> Optional[Coupon]:
+        """Get a coupon by ID."""
+        return await self.session.get(Coupon, coupon_id)
+
+    def _filtered(self, statement: SelectT, metadata: Optional[MetadataFilters]) -> SelectT:
+        if not metadata:
+            return statement
+        return filter_by_metadata(statement, metadata, self.session.get_bind().dialect.name)
+
+    async def get_coupons(
+        self, skip: int = 0, limit: int = 100, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
+        """Get all coupons with pagination."""
+        return (
+            await self.session.exec(
+                self._filtered(COUPONS_PAGE, metadata), params={"skip": skip, "limit": limit}
+            )
+        ).all()
+
+    async def get_user_coupons(
+        self, user_id: int, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
+        """Get all coupons assigned to a specific user."""
+        return (
+            await self.session.exec(
+                self._filtered(USER_COUPONS, metadata), params={"user_id": user_id}
+            )
+        ).all()
+
+    async def get_unassigned_coupons(
+        self, skip: int = 0, limit: int = 100, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
+        """Get all unassigned coupons."""
+        return (
+            await self.session.exec(
+                self._filtered(UNASSIGNED_COUPONS, metadata),
+                params={"skip": skip, "limit": limit},
+            )
+        ).all()
+
+    async def get_available_coupons(
+        self, skip: int = 0, limit: int = 100, metadata: Optional[MetadataFilters] = None
+    ) -> List[Coupon]:
+        """Get all available (unassigned and unredeemed) coupons."""
+        return (
+            await self.session.exec(
+                self._filtered(AVAILABLE_COUPONS, metadata),
+                params={"skip": skip, "limit": limit},
+            )
+        ).all()
+
+    async def get_campaign_coupons(
+        self,
+        campaign_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        metadata: Optional[MetadataFilters] = None,
+    ) -> List[Coupon]:
+        """Get all coupons for a specific campaign."""
+        return (
+            await self.session.exec(
+                self._filtered(CAMPAIGN_COUPONS, metadata),
+                params={"campaign_id": campaign_id, "skip": skip, "limit": limit},
+            )
+        ).all()
+
+    async def count_coupons(
+        self,
+        listing: str,
+        mode: CountMode,
+        params: Optional[dict[str, Any]] = None,
+        metadata: Optional[MetadataFilters] = None,
+    ) -> Optional[int]:
+        """Count a listing of COUPON_COUNTS (None for count=none)."""
+        if mode == "none":
+            return None
+        return await self.session.run_sync(
+            lambda session: CouponService(cast(Session, session)).count_coupons(
+                listing, mode, params, metadata
+            )
+        )
+
+    async def search_coupons(
+        self, query: str, match: SearchMatch = "contains", after: int = 0, limit: int = 50
+    ) -> CouponSearchPage:
+        """Coupons whose code, campaign name or campaign description match, by id."""
+        statements = _search_statements(self.session.get_bind().dialect.name)
+        pattern = _search_pattern(query, match)
+        campaign_ids = (
+            await self.session.exec(statements.campaigns, params={"pattern": pattern})
+        ).all()
+        statement, params = _search_query(statements, pattern, campaign_ids, after, limit)
+        coupons = (await self.session.exec(statement, params=params)).all()
+        return _search_page(coupons, limit)
+
+    async def create_coupon(self, coupon_create: CouponCreate) -> Coupon:
+        """Create a new coupon."""
+        db_coupon = Coupon.model_validate(coupon_create)
+        self.session.add(db_coupon)
+        await self.session.commit()
+        await self.session.refresh(db_coupon)
+        return db_coupon
+
+    async def update_coupon(self, coupon_id: int, coupon_update: CouponUpdate) -> Optional[Coupon]:
+        """Update an existing coupon."""
+        db_coupon = await self.get_coupon(coupon_id)
+        if not db_coupon:
+            return None
+
+        coupon_data = coupon_update.dict(exclude_unset=True)
+        for key, value in coupon_data.items():
+            setattr(db_coupon, key, value)
+
+        # Update the updated_at timestamp
+        db_coupon.updated_at = datetime.utcnow()
+
+        self.session.add(db_coupon)
+        await self.session.commit()
+        await self.session.refresh(db_coupon)
+        return db_coupon
+
+    async def delete_coupon(self, coupon_id: int) -> bool:
+        """Delete a coupon."""
+        db_coupon = await self.get_coupon(coupon_id)
+        if not db_coupon:
+            return False
+
+        await self.session.delete(db_coupon)
+        await self.session.commit()
+        return True
+
+    async def redeem_coupon(self, coupon_id: int) -> Optional[Coupon]:
+        """Redeem a coupon."""
+        db_coupon = await self.get_coupon(coupon_id)
+        if not db_coupon:
+            return None
+
+        if db_coupon.redeemed:
+            return db_coupon  # Already redeemed
+
+        db_coupon.redeemed = True
+        db_coupon.redeemed_at = datetime.utcnow()
+        db_coupon.updated_at = datetime.utcnow()
+
+        self.session.add(db_coupon)
+        await self.session.commit()
+        await self.session.refresh(db_coupon)
+        return db_coupon
+
+    async def assign_coupon_to_user(self, coupon_id: int, user_id: int) -> Optional[Coupon]:
+        """Assign a coupon to a user."""
+        db_coupon = await self.get_coupon(coupon_id)
+        if not db_coupon:
+            return None
+
+        # Check if user exists
+        user = await self.session.get(User, user_id)
+        if not user:
+            return None
+
+        db_coupon.assigned_to_user = user_id
+        db_coupon.assigned_at = datetime.utcnow()
+        db_coupon.updated_at = datetime.utcnow()
+
+        self.session.add(db_coupon)
+        await self.session.commit()
+        await self.session.refresh(db_coupon)
+        return db_coupon
@@ -0,0 +1,96 @@
+"""What the flush listeners behind the rollups and the resource versions share.
+
+Both keep a table in step with the coupons a flush writes: before the flush,
+while the old values are still known, they work out what changes; after it,
+they add that to their table with an upsert on the flush's connection.
+"""
+
+from collections.abc import Callable, Sequence
+from typing import Any, TypeVar
+
+from sqlalchemy import Table, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, RowMapping
+from sqlalchemy.orm import Session, UOWTransaction
+from sqlalchemy.orm.attributes import instance_state
+from sqlmodel import select
+
+from app.models.coupon import Coupon
+
+T = TypeVar("T")
+
+# Read back together, once per coupon and flush, when a changed one was never loaded
+STORED_COLUMNS = ("campaign_id", "assigned_to_user", "assigned_at", "redeemed_at")
+_STORED_ROWS = "stored_coupon_rows"
+
+
+def _stored_row(
+    session: Session, flush_context: UOWTransaction, coupon: Coupon
+) -> RowMapping:
+    rows: dict[int | None, RowMapping] = flush_context.attributes.setdefault(
+        _STORED_ROWS, {}
+    )
+    if coupon.id not in rows:
+        columns = [getattr(Coupon, name) for name in STORED_COLUMNS]
+        statement = select(*columns).where(Coupon.id == coupon.id)
+        rows[coupon.id] = session.connection().execute(statement).one()._mapping
+    return rows[coupon.id]
+
+
+def previous_values(
+    session: Session,
+    flush_context: UOWTransaction,
+    coupon: Coupon,
+    names: Sequence[str],
+) -> tuple[Any, ...]:
+    """The coupon's `names` as they are in the database, before this flush."""
+    state = instance_state(coupon)
+    values = []
+    for name in names:
+        history = state.attrs[name].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.added:
+            # Changed after being expired, so the old value was never loaded
+            values.append(_stored_row(session, flush_context, coupon)[name])
+        else:
+            values.append(getattr(coupon, name))
+    return tuple(values)
+
+
+def add_counts(
+    connection: Connection,
+    table: Table,
+    rows: list[dict[str, Any]],
+    keys: Sequence[str],
+    counters: Sequence[str],
+) -> None:
+    """Insert `rows`, adding their `counters` to the rows already holding the same `keys`."""
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[key] for key in keys],
+        set_={name: table.c[name] + statement.excluded[name] for name in counters},
+    )
+    connection.execute(statement)
+
+
+def track_flushes(
+    name: str,
+    compute: Callable[[Session, UOWTransaction], T],
+    apply: Callable[[Connection, T], None],
+) -> None:
+    """Run `compute` before every flush and `apply` its result, if any, after it."""
+
+    @event.listens_for(Session, "before_flush")
+    def _compute(
+        session: Session, flush_context: UOWTransaction, _instances: Any
+    ) -> None:
+        # Replaced, not accumulated: a failed flush is retried with the same history
+        session.info[name] = compute(session, flush_context)
+
+    @event.listens_for(Session, "after_flush")
+    def _apply(session: Session, _flush_context: UOWTransaction) -> None:
+        pending = session.info.pop(name, None)
+        if pending:
+            apply(session.connection(), pending)
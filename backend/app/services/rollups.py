@@ -0,0 +1,186 @@
+"""Hourly per-campaign assignment and redemption counts.
+
+The rollup table is kept equal to what `backfill_rollups` would compute from the
+coupon table: every flush that assigns, redeems, moves, un-redeems or deletes a
+coupon adds the difference between the coupon's old and new contribution to its
+buckets, in the same transaction. Charts then read a few hundred rollup rows
+instead of scanning coupons.
+"""
+
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import DateTime, delete, func, type_coerce
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, UOWTransaction
+from sqlmodel import col, select
+
+from app.models.campaign import Campaign
+from app.models.coupon import Coupon
+from app.models.rollup import CampaignHourlyRollup, CampaignTimeseriesPoint
+from app.services.flush_tracking import add_counts, previous_values, track_flushes
+
+# (campaign_id, hour, "assigned" | "redeemed") -> count
+Buckets = Counter[tuple[int, datetime, str]]
+
+TRACKED = ("campaign_id", "assigned_at", "redeemed_at")
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    """The start of the moment's hour, as the naive UTC the coupon columns hold."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _contribution(
+    campaign_id: int | None, assigned_at: Any, redeemed_at: Any
+) -> Buckets:
+    buckets: Buckets = Counter()
+    if campaign_id is None:
+        return buckets
+    if assigned_at is not None:
+        buckets[(campaign_id, hour_bucket(assigned_at), "assigned")] += 1
+    if redeemed_at is not None:
+        buckets[(campaign_id, hour_bucket(redeemed_at), "redeemed")] += 1
+    return buckets
+
+
+def _old_contribution(
+    session: Session, flush_context: UOWTransaction, coupon: Coupon
+) -> Buckets:
+    return _contribution(*previous_values(session, flush_context, coupon, TRACKED))
+
+
+def _new_contribution(coupon: Coupon) -> Buckets:
+    return _contribution(coupon.campaign_id, coupon.assigned_at, coupon.redeemed_at)
+
+
+def coupon_deltas(session: Session, flush_context: UOWTransaction) -> Buckets:
+    """Bucket changes implied by the coupons this flush will write."""
+    deltas: Buckets = Counter()
+    with session.no_autoflush:
+        for coupon in session.new:
+            if isinstance(coupon, Coupon):
+                deltas.update(_new_contribution(coupon))
+        for coupon in session.dirty:
+            if isinstance(coupon, Coupon) and session.is_modified(coupon):
+                deltas.subtract(_old_contribution(session, flush_context, coupon))
+                deltas.update(_new_contribution(coupon))
+        for coupon in session.deleted:
+            if isinstance(coupon, Coupon):
+                deltas.subtract(_old_contribution(session, flush_context, coupon))
+    return deltas
+
+
+# Rollup rows per upsert: 4 bound values each, within SQLite's historical
+# 999-variable limit, and no statement grows with the size of a backfill
+UPSERT_BATCH_SIZE = 200
+
+
+def apply_deltas(connection: Connection, deltas: Buckets) -> None:
+    rows: dict[tuple[int, datetime], dict[str, Any]] = {}
+    for (campaign_id, hour, field), count in deltas.items():
+        if count:
+            row = rows.setdefault(
+                (campaign_id, hour),
+                {
+                    "campaign_id": campaign_id,
+                    "hour": hour,
+                    "assigned": 0,
+                    "redeemed": 0,
+                },
+            )
+            row[field] += count
+    batch = list(rows.values())
+    for start in range(0, len(batch), UPSERT_BATCH_SIZE):
+        _upsert_rows(connection, batch[start : start + UPSERT_BATCH_SIZE])
+
+
+def _upsert_rows(connection: Connection, rows: list[dict[str, Any]]) -> None:
+    # Coupons left behind by a deleted campaign have no buckets, as in backfill_rollups
+    live = set(
+        connection.execute(
+            select(Campaign.id).where(
+                col(Campaign.id).in_({row["campaign_id"] for row in rows})
+            )
+        ).scalars()
+    )
+    rows = [row for row in rows if row["campaign_id"] in live]
+    if not rows:
+        return
+    add_counts(
+        connection,
+        CampaignHourlyRollup.__table__,  # type: ignore[attr-defined]
+        rows,
+        ["campaign_id", "hour"],
+        ["assigned", "redeemed"],
+    )
+
+
+track_flushes("pending_rollup_deltas", coupon_deltas, apply_deltas)
+
+
+def _hour_of(column: Any, dialect: str) -> Any:
+    if dialect == "postgresql":
+        return func.date_trunc("hour", column)
+    return type_coerce(func.strftime("%Y-%m-%d %H:00:00", column), DateTime)
+
+
+def backfill_rollups(session: Session, campaign_id: int | None = None) -> int:
+    """Recompute the rollups (of one campaign, or all) from the coupon table.
+
+    Replaces the existing buckets and commits. Returns the number of buckets written.
+    """
+    dialect = session.get_bind().dialect.name
+    buckets: Buckets = Counter()
+    for field, column in (
+        ("assigned", col(Coupon.assigned_at)),
+        ("redeemed", col(Coupon.redeemed_at)),
+    ):
+        hour = _hour_of(column, dialect)
+        statement = (
+            select(Coupon.campaign_id, hour, func.count())
+            # Inner join: coupons left behind by a deleted campaign have no buckets
+            .join(Campaign, col(Campaign.id) == Coupon.campaign_id)
+            .where(column.is_not(None))
+            .group_by(col(Coupon.campaign_id), hour)
+        )
+        if campaign_id is not None:
+            statement = statement.where(Coupon.campaign_id == campaign_id)
+        for bucket_campaign, bucket_hour, count in session.execute(statement):
+            buckets[(bucket_campaign, bucket_hour, field)] = count
+
+    existing = delete(CampaignHourlyRollup)
+    if campaign_id is not None:
+        existing = existing.where(col(CampaignHourlyRollup.campaign_id) == campaign_id)
+    session.execute(existing)
+    apply_deltas(session.connection(), buckets)
+    session.commit()
+    return len({(c, h) for c, h, _ in buckets})
+
+
+# Longest range /campaigns/{id}/timeseries returns, in hourly points
+MAX_TIMESERIES_HOURS = 24 * 92
+
+
+def densify(
+    rows: Sequence[CampaignHourlyRollup], since: datetime, until: datetime
+) -> list[CampaignTimeseriesPoint]:
+    """One point per hour from `since` to `until`, zero where nothing happened."""
+    by_hour = {row.hour: row for row in rows}
+    points = []
+    hour = hour_bucket(since)
+    while hour <= until:
+        row = by_hour.get(hour)
+        points.append(
+            CampaignTimeseriesPoint(
+                hour=hour,
+                assigned=row.assigned if row else 0,
+                redeemed=row.redeemed if row else 0,
+            )
+        )
+        hour += timedelta(hours=1)
+    return points
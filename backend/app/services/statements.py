@@ -0,0 +1,169 @@
+"""Hot service queries, built once at import.
+
+Each statement takes its values as bound parameters (`session.exec(STMT,
+params={...})`), so a call skips building the select and its WHERE clause.
+SQLAlchemy's compiled cache then finds the SQL under the same key every time.
+"""
+
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+from sqlalchemy import bindparam, case, func, literal_column, or_, union
+from sqlmodel import col, select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.models.campaign import Campaign
+from app.models.coupon import Coupon
+from app.models.rollup import CampaignHourlyRollup
+from app.models.version import ResourceVersion
+
+# params: user_id
+USER_COUPONS = select(Coupon).where(Coupon.assigned_to_user == bindparam("user_id"))
+
+# params: key. The ETag check of the conditional reads, run before their listing.
+RESOURCE_VERSION = select(ResourceVersion.version).where(
+    ResourceVersion.key == bindparam("key")
+)
+
+# params: skip, limit
+COUPONS_PAGE = select(Coupon).offset(bindparam("skip")).limit(bindparam("limit"))
+
+# params: skip, limit
+UNASSIGNED_COUPONS = (
+    select(Coupon)
+    .where(col(Coupon.assigned_to_user).is_(None))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+# params: skip, limit
+AVAILABLE_COUPONS = (
+    select(Coupon)
+    .where(col(Coupon.assigned_to_user).is_(None), Coupon.redeemed == False)  # noqa: E712
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+# params: campaign_id, skip, limit
+CAMPAIGN_COUPONS = (
+    select(Coupon)
+    .where(Coupon.campaign_id == bindparam("campaign_id"))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+# params: campaign_id. One coupon per user, so only the first candidate is loaded.
+CLAIMABLE_COUPON = (
+    select(Coupon)
+    .where(
+        Coupon.campaign_id == bindparam("campaign_id"),
+        col(Coupon.assigned_to_user).is_(None),
+    )
+    .limit(1)
+)
+
+
+class SearchStatements(NamedTuple):
+    """Coupon search, see CouponService.search_coupons.
+
+    The campaigns are looked up first: given their ids rather than a subquery,
+    SQLite can tell a selective list from a dense one, and no list at all means
+    the cheaper `by_code` statement.
+    """
+
+    # params: pattern (LIKE, with "\\" as escape)
+    campaigns: SelectOfScalar[int | None]
+    # params: pattern, campaign_ids, after (last id seen, 0 for the first page), limit
+    coupons: SelectOfScalar[Coupon]
+    # params: pattern, after, limit
+    by_code: SelectOfScalar[Coupon]
+
+
+def _search_statements(
+    matches: Callable[[Any], Any], code_key: Any = col(Coupon.id)
+) -> SearchStatements:
+    # Code and campaign hits are each fetched as their own keyset page and then
+    # merged, so each stays on its own index instead of the planner walking the
+    # primary key to satisfy an OR.
+    code_hits = (
+        select(Coupon.id)
+        .where(matches(Coupon.code), code_key > bindparam("after"))
+        .order_by(code_key)
+        .limit(bindparam("limit"))
+        .subquery()
+    )
+    campaign_hits = (
+        select(Coupon.id)
+        .where(
+            col(Coupon.campaign_id).in_(bindparam("campaign_ids", expanding=True)),
+            col(Coupon.id) > bindparam("after"),
+        )
+        .order_by(col(Coupon.id))
+        .limit(bindparam("limit"))
+        .subquery()
+    )
+    hits = union(select(code_hits.c.id), select(campaign_hits.c.id))
+    return SearchStatements(
+        campaigns=select(col(Campaign.id)).where(
+            or_(matches(Campaign.name), matches(Campaign.description))
+        ),
+        coupons=select(Coupon)
+        .where(col(Coupon.id).in_(hits))
+        .order_by(col(Coupon.id))
+        .limit(bindparam("limit")),
+        by_code=select(Coupon)
+        .where(matches(Coupon.code), code_key > bindparam("after"))
+        .order_by(code_key)
+        .limit(bindparam("limit")),
+    )
+
+
+# ILIKE for the trigram indexes on PostgreSQL
+COUPON_SEARCH = _search_statements(
+    lambda column: column.ilike(bindparam("pattern"), escape="\\")
+)
+# SQLite's LIKE is already case-insensitive, and ILIKE's lower() would hide the
+# NOCASE index. Given a bound LIMIT, SQLite walks the rowid for ORDER BY id
+# instead of the code index; the unary + keeps it off the rowid.
+COUPON_SEARCH_SQLITE = _search_statements(
+    lambda column: column.like(bindparam("pattern"), escape="\\"),
+    code_key=literal_column("+coupon.id"),
+)
+
+# params: skip, limit
+CAMPAIGNS_PAGE = select(Campaign).offset(bindparam("skip")).limit(bindparam("limit"))
+
+# params: campaign_id, since, until (hours, inclusive)
+CAMPAIGN_TIMESERIES = (
+    select(CampaignHourlyRollup)
+    .where(
+        CampaignHourlyRollup.campaign_id == bindparam("campaign_id"),
+        CampaignHourlyRollup.hour >= bindparam("since"),
+        CampaignHourlyRollup.hour <= bindparam("until"),
+    )
+    .order_by(col(CampaignHourlyRollup.hour))
+)
+
+# No params. Coupon counts for every campaign in one pass over the coupons;
+# COUNT skips the NULLs a CASE without ELSE yields for non-matching rows.
+CAMPAIGN_STATS = (
+    select(  # type: ignore[call-overload]  # sqlmodel types select() up to 4 columns
+        col(Campaign.id).label("campaign_id"),
+        Campaign.name,
+        func.count(col(Coupon.id)).label("total"),
+        func.count(col(Coupon.assigned_to_user)).label("assigned"),
+        func.count(case((col(Coupon.redeemed) == True, 1))).label("redeemed"),  # noqa: E712
+        func.count(
+            case(
+                (
+                    col(Coupon.assigned_to_user).is_(None)
+                    & (col(Coupon.redeemed) == False),  # noqa: E712
+                    1,
+                )
+            )
+        ).label("available"),
+    )
+    .outerjoin(Coupon, col(Coupon.campaign_id) == Campaign.id)
+    .group_by(Campaign.id, Campaign.name)
+    .order_by(Campaign.id)
+)
@@ -0,0 +1,84 @@
+"""Version stamps behind the ETags of the polled read routes.
+
+Every flush that changes a campaign bumps the "campaigns" version, and every
+flush that changes a coupon held by a user (assigned, redeemed, edited, handed
+to someone else or deleted) bumps that user's "wallet:<id>" version, in the
+same transaction as the change. A conditional GET then costs one primary-key
+lookup: when the client's ETag still names the current version the route
+answers 304 without running its listing.
+"""
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, UOWTransaction
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.campaign import Campaign
+from app.models.coupon import Coupon
+from app.models.version import ResourceVersion
+from app.services.flush_tracking import add_counts, previous_values, track_flushes
+from app.services.statements import RESOURCE_VERSION
+
+CAMPAIGNS = "campaigns"
+
+
+def wallet_key(user_id: int) -> str:
+    return f"wallet:{user_id}"
+
+
+def _previous_holder(
+    session: Session, flush_context: UOWTransaction, coupon: Coupon
+) -> int | None:
+    names = ("assigned_to_user",)
+    holder: int | None = previous_values(session, flush_context, coupon, names)[0]
+    return holder
+
+
+def changed_keys(session: Session, flush_context: UOWTransaction) -> set[str]:
+    """Versions the objects this flush will write invalidate."""
+    keys: set[str] = set()
+    holders: set[int | None] = set()
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Campaign):
+                keys.add(CAMPAIGNS)
+            elif isinstance(obj, Coupon):
+                holders.add(obj.assigned_to_user)
+        for obj in session.dirty:
+            if not session.is_modified(obj):
+                continue
+            if isinstance(obj, Campaign):
+                keys.add(CAMPAIGNS)
+            elif isinstance(obj, Coupon):
+                holders.update(
+                    (
+                        _previous_holder(session, flush_context, obj),
+                        obj.assigned_to_user,
+                    )
+                )
+        for obj in session.deleted:
+            if isinstance(obj, Campaign):
+                keys.add(CAMPAIGNS)
+            elif isinstance(obj, Coupon):
+                holders.add(_previous_holder(session, flush_context, obj))
+    keys.update(wallet_key(user_id) for user_id in holders if user_id is not None)
+    return keys
+
+
+def bump_versions(connection: Connection, keys: set[str]) -> None:
+    # Sorted, so concurrent writers lock the rows in the same order
+    rows = [{"key": key, "version": 1} for key in sorted(keys)]
+    table = ResourceVersion.__table__  # type: ignore[attr-defined]
+    add_counts(connection, table, rows, ["key"], ["version"])
+
+
+track_flushes("pending_resource_versions", changed_keys, bump_versions)
+
+
+def get_version(session: Session, key: str) -> int:
+    """The current version of `key`; 0 until its resource first changes."""
+    version = session.execute(RESOURCE_VERSION, {"key": key}).scalar()
+    return int(version or 0)
+
+
+async def aget_version(session: AsyncSession, key: str) -> int:
+    return (await session.exec(RESOURCE_VERSION, params={"key": key})).first() or 0
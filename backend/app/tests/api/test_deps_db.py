@@ -0,0 +1,82 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, field_validator
+from sqlmodel import Session, select
+
+from app.api import deps, deps_coupon
+from app.api.deps_db import AsyncSessionDep, SessionDep, UnitOfWorkRoute
+
+observed: dict[str, Any] = {}
+
+
+class Out(BaseModel):
+    value: int
+
+    @field_validator("value")
+    @classmethod
+    def record_transaction_state(cls, v: int) -> int:
+        # Runs during response serialization, after the endpoint returned
+        observed["in_transaction"] = observed["session"].in_transaction()
+        return v
+
+
+def first_dep(session: Session = Depends(deps.get_db)) -> Session:
+    return session
+
+
+def second_dep(session: Session = Depends(deps_coupon.get_db)) -> Session:
+    return session
+
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+@router.get("/shared")
+def shared(
+    a: Session = Depends(first_dep), b: Session = Depends(second_dep)
+) -> dict[str, bool]:
+    return {"same": a is b}
+
+
+@router.get("/query", response_model=Out)
+def query(session: SessionDep) -> Any:
+    observed["session"] = session
+    session.exec(select(1)).one()
+    assert session.in_transaction()
+    return {"value": 1}
+
+
+@router.get("/async-query", response_model=Out)
+async def async_query(session: AsyncSessionDep) -> Any:
+    observed["session"] = session
+    (await session.exec(select(1))).one()
+    assert session.in_transaction()
+    return {"value": 1}
+
+
+app = FastAPI()
+app.include_router(router)
+
+
+def test_session_is_shared_across_deps_modules() -> None:
+    with TestClient(app) as client:
+        r = client.get("/shared")
+    assert r.json() == {"same": True}
+
+
+def test_connection_released_before_serialization() -> None:
+    observed.clear()
+    with TestClient(app) as client:
+        r = client.get("/query")
+    assert r.status_code == 200
+    assert observed["in_transaction"] is False
+
+
+def test_async_connection_released_before_serialization() -> None:
+    observed.clear()
+    with TestClient(app) as client:
+        r = client.get("/async-query")
+    assert r.status_code == 200
+    assert observed["in_transaction"] is False
@@ -0,0 +1,97 @@
+import gzip
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.middleware.compression import CompressionMiddleware, choose_encoding
+
+PAYLOAD = [
+    {"code": f"CODE-{i}", "metadata_": {"store": i % 7, "tier": "gold"}}
+    for i in range(200)
+]
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500, encodings=["gzip"])
+
+
+@app.get("/coupons")
+def coupons(n: int = 200) -> list[dict[str, Any]]:
+    return PAYLOAD[:n]
+
+
+@app.get("/export")
+def export() -> StreamingResponse:
+    def rows() -> Iterator[str]:
+        for i in range(1000):
+            yield f"CODE-{i},gold\n"
+
+    return StreamingResponse(rows(), media_type="text/csv")
+
+
+@app.get("/png")
+def png() -> Response:
+    return Response(b"\x89PNG" + b"\0" * 4000, media_type="image/png")
+
+
+@app.get("/encoded")
+def encoded() -> Response:
+    body = gzip.compress(b"x" * 4000)
+    return PlainTextResponse(body, headers={"Content-Encoding": "gzip"})
+
+
+@pytest.fixture
+def client() -> TestClient:
+    # Undecoded, so the assertions see what went over the wire
+    return TestClient(app, headers={"Accept-Encoding": "gzip"})
+
+
+def raw(client: TestClient, path: str, **headers: str) -> tuple[dict[str, str], bytes]:
+    with client.stream("GET", path, headers=headers) as r:
+        return dict(r.headers), b"".join(r.iter_raw())
+
+
+def test_large_json_is_gzipped(client: TestClient) -> None:
+    headers, body = raw(client, "/coupons")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert "content-length" not in headers
+    plain = client.get("/coupons", headers={"Accept-Encoding": "identity"}).content
+    assert gzip.decompress(body) == plain
+    assert len(body) < len(gzip.decompress(body)) / 4
+
+
+def test_small_and_excluded_bodies_are_sent_as_is(client: TestClient) -> None:
+    headers, body = raw(client, "/coupons?n=2")
+    assert "content-encoding" not in headers
+    assert int(headers["content-length"]) == len(body)
+
+    headers, _ = raw(client, "/png")
+    assert "content-encoding" not in headers
+    headers, body = raw(client, "/encoded")
+    assert gzip.decompress(body) == b"x" * 4000
+
+    headers, _ = raw(client, "/coupons", **{"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in headers
+
+
+def test_streamed_responses_are_compressed_incrementally(client: TestClient) -> None:
+    headers, body = raw(client, "/export")
+    assert headers["content-encoding"] == "gzip"
+    assert (
+        gzip.decompress(body)
+        == "".join(f"CODE-{i},gold\n" for i in range(1000)).encode()
+    )
+
+
+def test_choose_encoding() -> None:
+    preferred = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, deflate, br", preferred) == "br"
+    assert choose_encoding("br;q=0, gzip;q=0.5", preferred) == "gzip"
+    assert choose_encoding("*", preferred) == "zstd"
+    assert choose_encoding("*, zstd;q=0", preferred) == "br"
+    assert choose_encoding("identity", preferred) is None
+    assert choose_encoding("", preferred) is None
@@ -0,0 +1,46 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.middleware.server_timing import ServerTimingMiddleware
+from app.core.query_stats import instrument_engine
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+instrument_engine(engine)
+
+app = FastAPI()
+app.add_middleware(ServerTimingMiddleware)
+
+
+@app.get("/queries/{n}")
+def run_queries(n: int) -> dict[str, int]:
+    with engine.connect() as conn:
+        for _ in range(n):
+            conn.execute(text("SELECT 1"))
+    return {"n": n}
+
+
+def test_server_timing_counts_queries() -> None:
+    with TestClient(app) as client:
+        r = client.get("/queries/3")
+    assert r.status_code == 200
+    timing = r.headers["Server-Timing"]
+    assert 'desc="3 queries"' in timing
+    assert "app;dur=" in timing
+
+
+def test_slow_requests_log_grouped_statements(
+    caplog: pytest.LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+    with caplog.at_level(logging.WARNING), TestClient(app) as client:
+        client.get("/queries/4")
+    assert "4 queries" in caplog.text
+    assert "4x SELECT 1" in caplog.text
@@ -0,0 +1,26 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.middleware.windows_auth import WindowsAuthMiddleware
+
+app = FastAPI()
+app.add_middleware(WindowsAuthMiddleware)
+
+
+@app.get("/whoami")
+def whoami(request: Request) -> dict[str, str | None]:
+    return {"windows_user": request.state.windows_user}
+
+
+def test_forwarded_user_is_copied_to_state() -> None:
+    with TestClient(app) as client:
+        r = client.get("/whoami", headers={"X-Forwarded-User": "DOMAIN\\alice"})
+    assert r.status_code == 200
+    assert r.json() == {"windows_user": "DOMAIN\\alice"}
+
+
+def test_missing_forwarded_user_sets_none() -> None:
+    with TestClient(app) as client:
+        r = client.get("/whoami")
+    assert r.status_code == 200
+    assert r.json() == {"windows_user": None}
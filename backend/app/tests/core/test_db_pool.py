@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.db_pool import InstrumentedQueuePool, get_pool_stats
+
+
+def test_pool_stats_track_checkouts_and_timeouts() -> None:
+    engine = create_engine(
+        "sqlite://",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        stats = get_pool_stats(engine)
+        assert stats["checked_out"] == 1
+        assert stats["overflow"] == 0
+
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = get_pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
+    engine.dispose()
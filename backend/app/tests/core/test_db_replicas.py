@@ -0,0 +1,112 @@
+import math
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.api.deps_db import (
+    AsyncReadSessionDep,
+    ReadSessionDep,
+    SessionDep,
+    UnitOfWorkRoute,
+)
+from app.core import db_replicas
+from app.core.db_replicas import READ_PRIMARY_COOKIE, ReplicaRouter
+from app.core.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.models import Campaign
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+# The file of the connection's main database; a pooled connection that has run
+# a UNION or a sort also lists its "temp" database
+DATABASE_FILE = text("SELECT file FROM pragma_database_list WHERE name = 'main'")
+
+
+@router.get("/read")
+def read(session: ReadSessionDep) -> str:
+    return Path(session.execute(DATABASE_FILE).scalar_one()).name
+
+
+@router.get("/async-read")
+async def async_read(session: AsyncReadSessionDep) -> str:
+    return Path((await session.execute(DATABASE_FILE)).scalar_one()).name
+
+
+@router.post("/write")
+def write(session: SessionDep) -> None:
+    session.add(Campaign(name="read-your-writes"))
+    session.flush()
+    session.rollback()
+
+
+app = FastAPI()
+app.include_router(router)
+app.add_middleware(ReadYourWritesMiddleware)
+
+
+def use_replicas(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, names: list[str], lag: float = 0.0
+) -> ReplicaRouter:
+    replica_router = ReplicaRouter(
+        [f"sqlite:///{tmp_path / name}" for name in names],
+        max_lag=5.0,
+        lag_probe=lambda _engine: lag,
+    )
+    replica_router.refresh_lag()
+    monkeypatch.setattr(db_replicas, "_router", replica_router)
+    return replica_router
+
+
+def test_reads_round_robin_over_replicas(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    use_replicas(monkeypatch, tmp_path, ["a.db", "b.db"])
+    with TestClient(app) as client:
+        names = [client.get("/read").json() for _ in range(4)]
+        assert client.get("/async-read").json() in {"a.db", "b.db"}
+    assert names == ["a.db", "b.db", "a.db", "b.db"]
+
+
+def test_lagging_or_unreachable_replica_falls_back_to_primary(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    replica_router = use_replicas(monkeypatch, tmp_path, ["a.db"], lag=30.0)
+    with TestClient(app) as client:
+        assert client.get("/read").json() == "test.db"
+
+        def unreachable(_engine: object) -> float:
+            raise OSError("connection refused")
+
+        replica_router.lag_probe = unreachable
+        replica_router.refresh_lag()
+        assert replica_router.replicas[0].lag == math.inf
+        assert client.get("/async-read").json() == "test.db"
+
+
+def test_reads_stay_on_primary_after_own_write(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    use_replicas(monkeypatch, tmp_path, ["a.db"])
+    with TestClient(app) as client:
+        assert client.get("/read").json() == "a.db"
+        r = client.post("/write")
+        assert READ_PRIMARY_COOKIE in r.cookies
+        assert client.get("/read").json() == "test.db"
+        assert client.get("/async-read").json() == "test.db"
+
+        client.cookies.set(READ_PRIMARY_COOKIE, str(time.time() - 1))
+        assert client.get("/read").json() == "a.db"
+
+
+def test_reads_without_replicas_use_primary(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    use_replicas(monkeypatch, tmp_path, [])
+    with TestClient(app) as client:
+        assert client.get("/read").json() == "test.db"
+        r = client.get("/read")
+    assert READ_PRIMARY_COOKIE not in r.cookies
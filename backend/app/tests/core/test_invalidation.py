@@ -0,0 +1,124 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core import invalidation
+from app.core.cache import MISSING, LocalCache
+from app.core.invalidation import (
+    FileInvalidationBus,
+    InvalidationBus,
+    SocketInvalidationBus,
+)
+from app.models import Campaign, Coupon, User
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def bus(monkeypatch: pytest.MonkeyPatch) -> InvalidationBus:
+    local_bus = InvalidationBus()
+    monkeypatch.setattr(invalidation, "_bus", local_bus)
+    return local_bus
+
+
+def test_cache_evicts_key_and_entries_below_it(bus: InvalidationBus) -> None:
+    cache = LocalCache()
+    for key in ("campaigns", "campaigns:0:100", "campaign:3", "campaign:30"):
+        cache.set(key, key)
+
+    bus.dispatch(["campaigns", "campaign:3"])
+
+    assert cache.get("campaigns") is MISSING
+    assert cache.get("campaigns:0:100") is MISSING
+    assert cache.get("campaign:3") is MISSING
+    assert cache.get("campaign:30") == "campaign:30"
+
+
+@pytest.mark.parametrize(
+    "make_bus",
+    [
+        lambda directory, name: SocketInvalidationBus(directory, name=name),
+        lambda directory, name: FileInvalidationBus(directory, 0.01, name=name),
+    ],
+    ids=["socket", "file"],
+)
+def test_bus_delivers_to_other_workers(
+    tmp_path: Path, make_bus: Callable[[Path, str], InvalidationBus]
+) -> None:
+    publisher, subscriber = make_bus(tmp_path, "a"), make_bus(tmp_path, "b")
+    received: list[list[str]] = []
+    published: list[list[str]] = []
+    subscriber.subscribe(received.append)
+    publisher.subscribe(published.append)
+    publisher.start()
+    subscriber.start()
+    try:
+        publisher.publish(["campaign:1", "campaigns"])
+        assert wait_for(lambda: received == [["campaign:1", "campaigns"]])
+        # The publisher evicted locally when it committed; it does not hear itself
+        assert published == []
+    finally:
+        publisher.stop()
+        subscriber.stop()
+
+
+def test_commit_publishes_keys_of_changed_rows(bus: InvalidationBus) -> None:
+    received: list[list[str]] = []
+    bus.subscribe(received.append)
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        campaign = Campaign(name="invalidation")
+        user = User(username="DOMAIN\\old.name", hashed_password="x")
+        session.add(campaign)
+        session.add(user)
+        session.commit()
+        assert received == [
+            ["campaign:1", "campaigns", "user:1", "user:name:DOMAIN\\old.name"]
+        ]
+
+        received.clear()
+        session.refresh(user)
+        user.username = "DOMAIN\\new.name"
+        session.add(user)
+        session.commit()
+        # Readers cached under the old username must drop it too
+        assert received == [
+            ["user:1", "user:name:DOMAIN\\new.name", "user:name:DOMAIN\\old.name"]
+        ]
+
+        received.clear()
+        # Expired by the commit, so the old name is unknown: drop every cached name
+        user.username = "DOMAIN\\third.name"
+        session.add(user)
+        session.commit()
+        assert received == [["user:1", "user:name"]]
+
+        received.clear()
+        campaign.name = "rolled back"
+        session.add(campaign)
+        session.flush()
+        session.rollback()
+        assert received == []
+
+
+@pytest.mark.usefixtures("bus")
+def test_coupon_changes_evict_campaign_stats() -> None:
+    cache = LocalCache()
+    cache.set("campaigns:stats", [])
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Coupon(code="STATS-EVICT"))
+        session.commit()
+    assert cache.get("campaigns:stats") is MISSING
@@ -0,0 +1,158 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import metrics
+from app.core.config import settings
+from app.core.metrics import REGISTRY, MetricsRegistry, ValuesFile, read_values
+from app.core.middleware.metrics import MetricsMiddleware
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_workers_are_summed(tmp_path: Path) -> None:
+    registry = MetricsRegistry(lambda: tmp_path)
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    in_use = registry.gauge("in_use", "Connections in use")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.labels('say "hi"').inc()
+    in_use.labels().inc(2)
+    latency.labels().observe(0.05)
+    latency.labels().observe(0.5)
+
+    # A worker that has exited: its counts stay, its gauges do not
+    other = ValuesFile(tmp_path / f"metrics-{dead_pid()}.db")
+    other.add(requests._key("", ('say "hi"',)), 4)
+    other.add(in_use._key("", ()), 5)
+    other.add(latency._key("b2", ()), 1)
+    other.add(latency._key("sum", ()), 3.0)
+    other.close()
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="say \\"hi\\""} 5.0' in lines
+    assert "in_use 2.0" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1.0' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2.0' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3.0' in lines
+    assert "latency_seconds_sum 3.55" in lines
+    assert "latency_seconds_count 3.0" in lines
+
+    registry.zero_gauges()
+    assert "in_use 0.0" in registry.render().splitlines()
+
+
+def test_dead_workers_are_merged_at_startup(tmp_path: Path) -> None:
+    registry = MetricsRegistry(lambda: tmp_path)
+    requests = registry.counter("requests_total", "Requests")
+    in_use = registry.gauge("in_use", "Connections in use")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1,))
+    requests.inc()
+
+    dead = tmp_path / f"metrics-{dead_pid()}.db"
+    other = ValuesFile(dead)
+    other.add(requests._key("", ()), 4)
+    other.add(in_use._key("", ()), 5)
+    other.add(latency._key("b1", ()), 1)
+    other.add(latency._key("sum", ()), 3.0)
+    other.close()
+    before = registry.render()
+
+    assert registry.merge_dead_workers() == 1
+    assert registry.merge_dead_workers() == 0
+    assert list(tmp_path.iterdir()) == [tmp_path / f"metrics-{os.getpid()}.db"]
+    assert registry.render() == before
+    assert "requests_total 5.0" in before.splitlines()
+    assert in_use._key("", ()) not in registry.values().keys()
+
+
+def test_disabled_registry_records_nothing(tmp_path: Path) -> None:
+    directory = tmp_path / "metrics"
+    registry = MetricsRegistry(lambda: directory, lambda: False)
+    registry.counter("requests_total", "Requests").inc()
+    registry.gauge("in_use", "Connections in use").labels().set(3)
+    registry.histogram("latency_seconds", "Latency").labels().observe(0.5)
+    registry.zero_gauges()
+    assert registry.merge_dead_workers() == 0
+    assert not directory.exists()
+
+
+def test_values_survive_reopening_and_growth(tmp_path: Path) -> None:
+    path = tmp_path / "metrics-1.db"
+    values = ValuesFile(path)
+    for i in range(5000):
+        values.add(f"series|{i}|[]", i)
+    values.close()
+    reopened = ValuesFile(path)
+    reopened.add("series|4999|[]", 1)
+    reopened.close()
+
+    stored = read_values(path)
+    assert len(stored) == 5000
+    assert stored["series|4999|[]"] == 5000
+
+
+def sample(name: str) -> float:
+    for line in REGISTRY.render().splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_middleware_labels_requests_by_operation_id(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "METRICS_DIR", str(tmp_path))
+    app = FastAPI(
+        generate_unique_id_function=lambda route: f"{route.tags[0]}-{route.name}"
+    )
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{id}", tags=["things"])
+    def read_thing(id: int) -> dict[str, int]:
+        return {"id": id}
+
+    ok = 'http_requests_total{route="things-read_thing",method="GET",status="200"}'
+    invalid = 'http_requests_total{route="things-read_thing",method="GET",status="422"}'
+    unmatched = 'http_requests_total{route="unmatched",method="GET",status="404"}'
+    # Made-up methods share one label too
+    other = 'http_requests_total{route="things-read_thing",method="other",status="405"}'
+    before = [sample(ok), sample(invalid), sample(unmatched), sample(other)]
+    with TestClient(app) as client:
+        client.get("/things/1")
+        client.get("/things/2")
+        client.get("/things/x")
+        client.get("/nowhere")
+        client.request("SCAN1", "/things/1")
+        client.request("SCAN2", "/things/1")
+    assert [sample(ok), sample(invalid), sample(unmatched), sample(other)] == [
+        before[0] + 2,
+        before[1] + 1,
+        before[2] + 1,
+        before[3] + 2,
+    ]
+    assert "SCAN1" not in REGISTRY.render()
+
+
+def test_metrics_token_is_required_when_set(monkeypatch: pytest.MonkeyPatch) -> None:
+    app = FastAPI()
+    app.include_router(metrics.router)
+    with TestClient(app) as client:
+        assert client.get("/metrics").status_code == 200
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+        assert client.get("/metrics").status_code == 401
+        wrong = {"Authorization": "Bearer nope"}
+        assert client.get("/metrics", headers=wrong).status_code == 401
+        right = {"Authorization": "Bearer s3cret"}
+        assert client.get("/metrics", headers=right).status_code == 200
@@ -0,0 +1,66 @@
+import asyncio
+
+from app.core import security
+from app.core.config import settings
+from app.core.security import (
+    get_bulk_hash_executor,
+    get_password_hash_async,
+    get_password_hashes_bulk,
+    pwd_context,
+    shutdown_hash_executors,
+    verify_and_update_password,
+    verify_password,
+    verify_password_async,
+)
+from app.tests.utils.utils import random_lower_string
+
+
+def test_hash_and_verify_async() -> None:
+    password = random_lower_string()
+
+    async def run() -> tuple[str, bool]:
+        hashed = await get_password_hash_async(password)
+        return hashed, await verify_password_async(password, hashed)
+
+    hashed, verified = asyncio.run(run())
+    assert verified
+    assert verify_password(password, hashed)
+
+
+def test_bulk_hashes_preserve_order() -> None:
+    passwords = [random_lower_string() for _ in range(3)]
+    hashes = get_password_hashes_bulk(passwords)
+    assert len(hashes) == len(passwords)
+    for password, hashed in zip(passwords, hashes, strict=True):
+        assert verify_password(password, hashed)
+
+
+def test_bulk_executor_spawns_and_shuts_down() -> None:
+    executor = get_bulk_hash_executor()
+    assert executor._mp_context.get_start_method() == "spawn"  # type: ignore[attr-defined]
+    shutdown_hash_executors()
+    assert security._bulk_executor is None
+    # The next bulk call starts a fresh pool
+    assert get_bulk_hash_executor() is not executor
+
+
+def test_verify_rehashes_on_cost_change() -> None:
+    password = random_lower_string()
+    cheap_rounds = 4 if settings.PASSWORD_HASH_ROUNDS != 4 else 5
+    old_hash = pwd_context.handler("bcrypt").using(rounds=cheap_rounds).hash(password)
+
+    verified, new_hash = verify_and_update_password(password, old_hash)
+    assert verified
+    assert new_hash
+    assert f"${settings.PASSWORD_HASH_ROUNDS:02d}$" in new_hash
+
+    verified, newer_hash = verify_and_update_password(password, new_hash)
+    assert verified
+    assert newer_hash is None
+
+
+def test_verify_wrong_password_does_not_rehash() -> None:
+    old_hash = pwd_context.handler("bcrypt").using(rounds=4).hash("correct-password")
+    verified, new_hash = verify_and_update_password("wrong-password", old_hash)
+    assert not verified
+    assert new_hash is None
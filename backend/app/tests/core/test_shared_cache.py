@@ -0,0 +1,105 @@
+import struct
+import threading
+from collections.abc import Iterator
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from app.core.shared_cache import MISSING, SharedCache
+
+
+@pytest.fixture
+def workers(tmp_path: Path) -> Iterator[list[SharedCache]]:
+    """Two attachments to the same file, as two workers on a host would have."""
+    path = str(tmp_path / "shared.cache")
+    caches = [SharedCache(path, slots=64, slot_size=4096, ttl=60) for _ in range(2)]
+    yield caches
+    for cache in caches:
+        cache.close()
+
+
+def test_value_loaded_by_one_worker_is_read_by_the_other(
+    workers: list[SharedCache],
+) -> None:
+    first, second = workers
+    assert first.get_or_load("campaign:1", lambda: {"id": 1, "name": "spring"}) == {
+        "id": 1,
+        "name": "spring",
+    }
+    assert second.get_or_load("campaign:1", lambda: pytest.fail("loaded twice")) == {
+        "id": 1,
+        "name": "spring",
+    }
+    # A cached "not found" is a hit too
+    first.get_or_load("campaign:2", lambda: None)
+    assert second.get("campaign:2") is None
+
+
+def test_other_workers_wait_for_the_lease_holder(workers: list[SharedCache]) -> None:
+    first, second = workers
+    generation = first.begin_fill("campaigns:0:100")
+    assert generation is not None
+    assert second.begin_fill("campaigns:0:100") is None
+
+    result = []
+    waiter = threading.Thread(
+        target=lambda: result.append(
+            second.get_or_load("campaigns:0:100", lambda: pytest.fail("loaded twice"))
+        )
+    )
+    waiter.start()
+    assert first.finish_fill("campaigns:0:100", generation, [{"id": 1}])
+    waiter.join(timeout=5)
+    assert result == [[{"id": 1}]]
+
+
+def test_eviction_during_a_load_discards_the_loaded_value(
+    workers: list[SharedCache],
+) -> None:
+    first, second = workers
+    generation = first.begin_fill("user:name:DOMAIN\\user")
+    assert generation is not None
+    second.evict(["user:name:DOMAIN\\user"])
+    assert not first.finish_fill(
+        "user:name:DOMAIN\\user", generation, {"roles": ["user"]}
+    )
+    assert second.get("user:name:DOMAIN\\user") is MISSING
+
+
+def test_evict_drops_keys_below_the_published_key(workers: list[SharedCache]) -> None:
+    first, second = workers
+    for key in ("campaigns:0:100", "campaigns:100:100", "campaign:3", "campaign:30"):
+        first.get_or_load(key, partial(str, key))
+
+    second.evict(["campaigns", "campaign:3"])
+
+    assert first.get("campaigns:0:100") is MISSING
+    assert first.get("campaigns:100:100") is MISSING
+    assert first.get("campaign:3") is MISSING
+    assert first.get("campaign:30") == "campaign:30"
+
+
+def test_a_write_torn_by_a_dead_worker_does_not_hang_readers(tmp_path: Path) -> None:
+    path = str(tmp_path / "shared.cache")
+    cache = SharedCache(path, slots=64, slot_size=4096, ttl=60)
+    cache.get_or_load("campaign:1", lambda: {"id": 1})
+    index = cache._slot(b"campaign:1")
+    offset = cache._offset(index)
+    # A writer that died between its two version stores
+    version = struct.unpack_from("<Q", cache._mm, offset)[0]
+    struct.pack_into("<Q", cache._mm, offset, version + 1)
+
+    assert cache.get("campaign:1") is MISSING
+    cache.evict(["campaign:1"])
+    assert cache.get_or_load("campaign:1", lambda: {"id": 2}) == {"id": 2}
+    assert struct.unpack_from("<Q", cache._mm, offset)[0] % 2 == 0
+
+    # A slot left odd in the file is cleared by the next worker to attach
+    version = struct.unpack_from("<Q", cache._mm, offset)[0]
+    struct.pack_into("<Q", cache._mm, offset, version + 1)
+    cache.close()
+    reopened = SharedCache(path, slots=64, slot_size=4096, ttl=60)
+    assert struct.unpack_from("<Q", reopened._mm, offset)[0] % 2 == 0
+    assert reopened.get("campaign:1") is MISSING
+    reopened.close()
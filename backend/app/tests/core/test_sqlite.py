@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.sqlite import checkpoint_wal, create_sqlite_engine
+
+
+def test_production_profile_pragmas(tmp_path: Path) -> None:
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'prod.db'}", "production")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert (
+            conn.execute(text("PRAGMA busy_timeout")).scalar()
+            == settings.SQLITE_BUSY_TIMEOUT_MS
+        )
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    checkpoint_wal(engine, "TRUNCATE")
+    engine.dispose()
+
+
+def test_compat_profile_keeps_rollback_journal(tmp_path: Path) -> None:
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'compat.db'}", "compat")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    engine.dispose()
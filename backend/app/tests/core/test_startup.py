@@ -0,0 +1,17 @@
+import subprocess
+import sys
+
+CHECK = """
+import sys
+import app.main
+from app.core import db
+print(sorted(m for m in ("pandas", "sentry_sdk") if m in sys.modules), db._engine is None)
+"""
+
+
+def test_importing_app_is_lazy() -> None:
+    # A fresh interpreter, since the test session has long imported everything
+    out = subprocess.run(
+        [sys.executable, "-c", CHECK], capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip() == "[] True"
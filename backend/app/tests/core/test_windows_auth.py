@@ -0,0 +1,104 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from sqlmodel import Session, SQLModel, create_engine
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.core.windows_auth import (
+    IdentityResolverChain,
+    IISHeaderResolver,
+    JWTResolver,
+    NativeIdentityResolver,
+    TrustedProxyHeaderResolver,
+    get_identity_chain,
+    get_native_identity,
+)
+from app.models import User
+
+
+def make_request(
+    headers: dict[str, str] | None = None, client: str = "10.0.0.1"
+) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+        "client": (client, 12345),
+    }
+    return Request(scope)
+
+
+def test_header_wins_over_native_and_reports_timings() -> None:
+    chain = IdentityResolverChain([IISHeaderResolver(), NativeIdentityResolver()])
+    result = chain.resolve(make_request({"X-Forwarded-User": "DOMAIN\\alice"}))
+    assert result.username == "DOMAIN\\alice"
+    assert result.mode == "iis"
+    assert list(result.timings) == ["iis"]
+
+
+def test_native_identity_is_resolved_once() -> None:
+    get_native_identity.cache_clear()
+    chain = IdentityResolverChain([IISHeaderResolver(), NativeIdentityResolver()])
+    with patch("app.core.windows_auth.os.getlogin", return_value="svc") as getlogin:
+        for _ in range(3):
+            result = chain.resolve(make_request())
+            assert result.username == "svc"
+            assert result.mode == "native"
+            assert set(result.timings) == {"iis", "native"}
+    assert getlogin.call_count == 1
+    get_native_identity.cache_clear()
+
+
+def test_proxy_header_only_trusted_from_known_proxies() -> None:
+    resolver = TrustedProxyHeaderResolver("X-Remote-User", ["10.0.0.1"])
+    headers = {"X-Remote-User": "DOMAIN\\bob"}
+    assert resolver.resolve(make_request(headers, client="10.0.0.1")) == "DOMAIN\\bob"
+    assert resolver.resolve(make_request(headers, client="10.0.0.2")) is None
+
+
+def test_empty_chain_reports_unknown() -> None:
+    result = IdentityResolverChain([]).resolve(make_request())
+    assert result.username is None
+    assert result.mode == "unknown"
+
+
+def test_jwt_resolver_maps_the_token_user_id_to_a_username() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        alice = User(username="DOMAIN\\alice", hashed_password="x")
+        # Named like alice's id: a `sub` must never be taken as a username
+        impostor = User(username="1", hashed_password="x")
+        session.add_all([alice, impostor])
+        session.commit()
+        assert alice.id == 1
+
+    resolver = JWTResolver(engine)
+
+    def resolve(token: str) -> str | None:
+        return resolver.resolve(make_request({"Authorization": f"Bearer {token}"}))
+
+    expires = timedelta(minutes=5)
+    assert resolve(create_access_token(alice.id, expires)) == "DOMAIN\\alice"
+    assert resolve(create_access_token(999, expires)) is None
+    assert resolve(create_access_token("DOMAIN\\alice", expires)) is None
+    assert resolve("not-a-token") is None
+    assert resolver.resolve(make_request()) is None
+
+
+def test_jwt_resolver_joins_the_configured_chain() -> None:
+    get_identity_chain.cache_clear()
+    try:
+        with patch.object(
+            settings, "WINDOWS_IDENTITY_RESOLVERS", ["iis_header", "jwt"]
+        ):
+            chain = get_identity_chain()
+        assert [resolver.mode for resolver in chain.resolvers] == ["iis", "jwt"]
+    finally:
+        get_identity_chain.cache_clear()
@@ -0,0 +1,59 @@
+import asyncio
+from pathlib import Path
+
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db_async import create_app_async_engine, get_async_database_url
+from app.models import CampaignCreate, Coupon, User
+from app.services.assignment_service import AsyncAssignmentService
+from app.services.campaign_service import AsyncCampaignService
+from app.services.coupon_service import AsyncCouponService
+
+
+def test_async_database_url() -> None:
+    assert (
+        get_async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    )
+    assert (
+        get_async_database_url("postgresql+psycopg://u:p@db:5432/app")
+        == "postgresql+psycopg://u:p@db:5432/app"
+    )
+
+
+async def _assign_and_redeem(url: str) -> None:
+    engine = create_app_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            campaign = await AsyncCampaignService(session).create_campaign(
+                CampaignCreate(name="async")
+            )
+            user = User(username="async\\user", hashed_password="x")
+            session.add(user)
+            session.add_all(
+                [Coupon(code=f"ASYNC-{i}", campaign_id=campaign.id) for i in range(3)]
+            )
+            await session.commit()
+            assert campaign.id is not None and user.id is not None
+
+            assigned = await AsyncAssignmentService(
+                session
+            ).assign_campaign_coupons_to_user(campaign.id, user.id)
+            assert assigned is not None and assigned.id is not None
+
+            coupons = AsyncCouponService(session)
+            wallet = await coupons.get_user_coupons(user.id)
+            assert [c.id for c in wallet] == [assigned.id]
+            redeemed = await coupons.redeem_coupon(assigned.id)
+            assert redeemed is not None and redeemed.redeemed
+            assert len(await coupons.get_available_coupons()) == 2
+            fetched = await AsyncCampaignService(session).get_campaign(campaign.id)
+            assert fetched is not None and fetched.name == "async"
+    finally:
+        await engine.dispose()
+
+
+def test_async_services_assign_and_redeem(tmp_path: Path) -> None:
+    asyncio.run(_assign_and_redeem(f"sqlite:///{tmp_path / 'async.db'}"))
@@ -0,0 +1,79 @@
+from collections.abc import Iterator
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.cache import MISSING
+from app.core.db_replicas import REPLICA_SESSION
+from app.models import Campaign, Coupon, User
+from app.services.campaign_service import CampaignService, campaign_stats_cache
+from app.services.counts import count_cache
+from app.services.coupon_service import CouponService
+
+
+@pytest.fixture
+def session() -> Iterator[Session]:
+    count_cache.clear()
+    campaign_stats_cache.clear()
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="count\\user", hashed_password="x")
+        first, second = Campaign(name="first"), Campaign(name="second")
+        session.add_all([user, first, second])
+        session.commit()
+        session.add_all(
+            [
+                Coupon(
+                    code="COUNT-1", campaign_id=first.id, metadata_={"tier": "gold"}
+                ),
+                Coupon(code="COUNT-2", campaign_id=first.id, assigned_to_user=user.id),
+                Coupon(code="COUNT-3", campaign_id=first.id, redeemed=True),
+                Coupon(
+                    code="COUNT-4", campaign_id=second.id, metadata_={"tier": "gold"}
+                ),
+            ]
+        )
+        session.commit()
+        yield session
+
+
+def test_estimates_match_exact_counts(session: Session) -> None:
+    coupons = CouponService(session)
+    for listing, params in [
+        ("all", {}),
+        ("unassigned", {}),
+        ("available", {}),
+        ("campaign", {"campaign_id": 1}),
+        ("user", {"user_id": 1}),
+    ]:
+        exact = coupons.count_coupons(listing, "exact", params)
+        assert coupons.count_coupons(listing, "estimate", params) == exact, listing
+    assert coupons.count_coupons("available", "exact") == 2
+    assert coupons.count_coupons("all", "none") is None
+
+
+def test_estimates_follow_changes(session: Session) -> None:
+    coupons = CouponService(session)
+    assert coupons.count_coupons("campaign", "estimate", {"campaign_id": 2}) == 1
+    gold = {"tier": ["gold"]}
+    assert coupons.count_coupons("all", "estimate", metadata=gold) == 2
+
+    session.add(Coupon(code="COUNT-5", campaign_id=2, metadata_={"tier": "gold"}))
+    session.commit()
+    # The campaign counters are evicted by the commit
+    assert coupons.count_coupons("campaign", "estimate", {"campaign_id": 2}) == 2
+    # Filtered counts are cached for COUNT_CACHE_SECONDS instead
+    assert coupons.count_coupons("all", "estimate", metadata=gold) == 2
+    assert coupons.count_coupons("all", "exact", metadata=gold) == 3
+
+
+def test_replica_sessions_do_not_fill_the_stats_cache(session: Session) -> None:
+    session.info[REPLICA_SESSION] = True
+    coupons = CouponService(session)
+    assert coupons.count_coupons("available", "estimate") == 2
+    assert campaign_stats_cache.get("campaigns:stats") is MISSING
+
+    del session.info[REPLICA_SESSION]
+    CampaignService(session).get_cached_campaign_stats()
+    assert campaign_stats_cache.get("campaigns:stats") is not MISSING
@@ -0,0 +1,119 @@
+import asyncio
+import csv
+import io
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+from openpyxl import load_workbook  # type: ignore[import-untyped]
+from sqlmodel import Session, SQLModel
+
+from app.core.db import create_app_engine
+from app.core.db_async import create_app_async_engine
+from app.models import Campaign, Coupon, User
+from app.services import coupon_export
+from app.services.coupon_export import (
+    EXPORT_COLUMNS,
+    export_statement,
+    stream_csv,
+    write_xlsx,
+)
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> str:
+    url = f"sqlite:///{tmp_path / 'export.db'}"
+    engine = create_app_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="export\\user", hashed_password="x")
+        spring, autumn = Campaign(name="spring"), Campaign(name="autumn")
+        session.add_all([user, spring, autumn])
+        session.commit()
+        session.add_all(
+            [
+                Coupon(code="EXP-1", campaign_id=spring.id),
+                Coupon(code="EXP-2", campaign_id=spring.id, assigned_to_user=user.id),
+                Coupon(
+                    code="EXP-3",
+                    campaign_id=spring.id,
+                    assigned_to_user=user.id,
+                    redeemed=True,
+                ),
+                Coupon(code="EXP-4", campaign_id=autumn.id),
+                Coupon(code="=1+1", campaign_id=autumn.id),
+            ]
+        )
+        session.commit()
+    engine.dispose()
+    return url
+
+
+def export_csv(url: str, **filters: Any) -> list[list[str]]:
+    async def collect() -> bytes:
+        engine = create_app_async_engine(url)
+        try:
+            return b"".join(
+                [
+                    chunk
+                    async for chunk in stream_csv(engine, export_statement(**filters))
+                ]
+            )
+        finally:
+            await engine.dispose()
+
+    return list(csv.reader(io.StringIO(asyncio.run(collect()).decode())))
+
+
+def test_csv_export_applies_filters(database: str) -> None:
+    rows = export_csv(database)
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert [row[1] for row in rows[1:]] == ["EXP-1", "EXP-2", "EXP-3", "EXP-4", "'=1+1"]
+    assert rows[2][3:6] == ["spring", "1", "export\\user"]
+
+    assert [row[1] for row in export_csv(database, campaign_id=1)[1:]] == [
+        "EXP-1",
+        "EXP-2",
+        "EXP-3",
+    ]
+    assert [row[1] for row in export_csv(database, status="available")[1:]] == [
+        "EXP-1",
+        "EXP-4",
+        "'=1+1",
+    ]
+    assert [row[1] for row in export_csv(database, status="assigned")[1:]] == ["EXP-2"]
+    assert [
+        row[1] for row in export_csv(database, campaign_id=1, status="redeemed")[1:]
+    ] == ["EXP-3"]
+
+
+def test_xlsx_export_continues_on_new_sheets(
+    database: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A header and two coupons per sheet
+    monkeypatch.setattr(coupon_export, "XLSX_MAX_ROWS", 3)
+    engine = create_app_engine(database)
+    path = write_xlsx(engine, export_statement())
+    try:
+        workbook = load_workbook(path, read_only=True)
+        sheets = [list(sheet.values) for sheet in workbook.worksheets]
+        code_types = [
+            row[1].data_type for row in workbook.worksheets[-1].iter_rows(min_row=2)
+        ]
+        workbook.close()
+    finally:
+        os.unlink(path)
+        engine.dispose()
+
+    assert [len(rows) for rows in sheets] == [3, 3, 2]
+    assert all(rows[0] == EXPORT_COLUMNS for rows in sheets)
+    # The last code is kept as text, not turned into a formula
+    assert [row[1] for rows in sheets for row in rows[1:]] == [
+        "EXP-1",
+        "EXP-2",
+        "EXP-3",
+        "EXP-4",
+        "=1+1",
+    ]
+    assert code_types == ["s"]
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, SQLModel, create_engine, select
+from starlette.datastructures import QueryParams
+
+from app.models import Campaign, Coupon
+from app.services.coupon_metadata import filter_by_metadata, parse_metadata_filters
+from app.services.coupon_service import CouponService
+
+
+def test_parse_metadata_filters() -> None:
+    params = QueryParams("meta.store=123&meta.tier=gold&meta.tier=silver&skip=0")
+    assert parse_metadata_filters(params) == {
+        "store": ["123"],
+        "tier": ["gold", "silver"],
+    }
+    with pytest.raises(ValueError):
+        parse_metadata_filters(QueryParams("meta.store')=1"))
+
+
+def test_coupon_listings_filter_on_metadata() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        campaign = Campaign(name="meta")
+        session.add(campaign)
+        session.commit()
+        assert campaign.id is not None
+        campaign_id = campaign.id
+        metadata = [
+            {"store": 123, "tier": "gold"},
+            {"store": "123", "tier": "silver"},
+            {"store": 7, "geo": {"region": "eu"}},
+            None,
+        ]
+        session.add_all(
+            Coupon(code=f"META-{i}", campaign_id=campaign.id, metadata_=value)
+            for i, value in enumerate(metadata, start=1)
+        )
+        session.commit()
+        coupons = CouponService(session)
+
+        def codes(**filters: list[str]) -> list[str]:
+            return sorted(
+                c.code
+                for c in coupons.get_campaign_coupons(campaign_id, metadata=filters)
+            )
+
+        # Numbers match whether they were stored as JSON numbers or strings
+        assert codes(store=["123"]) == ["META-1", "META-2"]
+        assert codes(store=["123"], tier=["gold"]) == ["META-1"]
+        assert codes(tier=["gold", "silver"]) == ["META-1", "META-2"]
+        assert codes(**{"geo.region": ["eu"]}) == ["META-3"]
+        assert len(coupons.get_available_coupons(metadata={"store": ["7"]})) == 1
+
+        statement = filter_by_metadata(
+            select(Coupon.id), {"store": ["north"]}, "sqlite"
+        )
+        compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+        plan = (
+            session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+        )
+        assert "ix_coupon_metadata_store" in str(plan)
+
+
+def test_postgres_metadata_filters_use_containment() -> None:
+    statement = filter_by_metadata(
+        select(Coupon.id), {"geo.region": ["eu"]}, "postgresql"
+    )
+    compiled = statement.compile(dialect=postgresql.dialect())  # type: ignore[no-untyped-call]
+    assert "coupon.metadata_ @> CAST(" in str(compiled)
+    assert list(compiled.params.values()) == [{"geo": {"region": "eu"}}]
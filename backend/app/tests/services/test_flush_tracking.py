@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models import Campaign, Coupon, User
+from app.services.versions import get_version, wallet_key
+
+LAUNCH = datetime(2025, 3, 1, 9, 15)
+
+
+def test_expired_coupons_are_read_back_once_per_flush() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        alice = User(username="flush\\alice", hashed_password="x")
+        bob = User(username="flush\\bob", hashed_password="x")
+        campaign = Campaign(name="flushed")
+        session.add_all([alice, bob, campaign])
+        session.commit()
+        coupon = Coupon(
+            code="FLUSH-1", campaign_id=campaign.id, assigned_to_user=alice.id
+        )
+        session.add(coupon)
+        session.commit()
+        alice_id, bob_id = alice.id, bob.id
+        assert alice_id is not None and bob_id is not None
+
+        statements: list[str] = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record(_conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+            statements.append(statement)
+
+        # Expired by the commit: the versions need the old holder and the rollups
+        # the old assigned_at, neither of which was loaded
+        coupon.assigned_to_user = bob_id
+        coupon.assigned_at = LAUNCH
+        session.add(coupon)
+        session.commit()
+        event.remove(engine, "before_cursor_execute", record)
+
+        # ORM loads label their columns; the read-back of the stored values does not
+        read_back = [
+            s for s in statements if "FROM coupon" in s and " AS coupon_" not in s
+        ]
+        assert len(read_back) == 1
+        assert get_version(session, wallet_key(alice_id)) == 2
+        assert get_version(session, wallet_key(bob_id)) == 1
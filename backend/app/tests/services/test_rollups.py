@@ -0,0 +1,213 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db_async import create_app_async_engine
+from app.models import Campaign, CampaignHourlyRollup, Coupon, User
+from app.services.assignment_service import AssignmentService, AsyncAssignmentService
+from app.services.campaign_service import CampaignService
+from app.services.coupon_service import CouponService
+from app.services.rollups import UPSERT_BATCH_SIZE, backfill_rollups, hour_bucket
+
+LAUNCH = datetime(2025, 3, 1, 9, 15)
+
+
+def rollups(session: Session) -> dict[tuple[int, datetime], tuple[int, int]]:
+    rows = session.exec(select(CampaignHourlyRollup)).all()
+    return {
+        (r.campaign_id, r.hour): (r.assigned, r.redeemed)
+        for r in rows
+        if r.assigned or r.redeemed
+    }
+
+
+def assert_matches_backfill(
+    session: Session,
+) -> dict[tuple[int, datetime], tuple[int, int]]:
+    incremental = rollups(session)
+    backfill_rollups(session)
+    assert rollups(session) == incremental
+    return incremental
+
+
+def test_rollups_follow_coupon_changes() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="rollup\\user", hashed_password="x")
+        spring, autumn = Campaign(name="spring"), Campaign(name="autumn")
+        session.add_all([user, spring, autumn])
+        session.commit()
+        assert user.id is not None
+        assert spring.id is not None and autumn.id is not None
+        session.add_all(
+            Coupon(code=f"ROLL-{i}", campaign_id=spring.id) for i in range(3)
+        )
+        # Imported already assigned and redeemed
+        session.add(
+            Coupon(
+                code="ROLL-OLD",
+                campaign_id=spring.id,
+                assigned_to_user=user.id,
+                assigned_at=LAUNCH,
+                redeemed=True,
+                redeemed_at=LAUNCH + timedelta(hours=1),
+            )
+        )
+        session.commit()
+        hour = LAUNCH.replace(minute=0)
+        assert assert_matches_backfill(session) == {
+            (spring.id, hour): (1, 0),
+            (spring.id, hour + timedelta(hours=1)): (0, 1),
+        }
+
+        coupon = AssignmentService(session).assign_campaign_coupons_to_user(
+            spring.id, user.id
+        )
+        assert coupon is not None and coupon.id is not None
+        assert coupon.assigned_at is not None
+        CouponService(session).redeem_coupon(coupon.id)
+        now = coupon.assigned_at.replace(minute=0, second=0, microsecond=0)
+        assert rollups(session)[(spring.id, now)] == (1, 1)
+        assert_matches_backfill(session)
+
+        # Expired by the commit: the old values are read back before the update
+        coupon.redeemed, coupon.redeemed_at = False, None
+        session.add(coupon)
+        session.commit()
+        assert rollups(session)[(spring.id, now)] == (1, 0)
+
+        coupon.campaign_id = autumn.id
+        session.add(coupon)
+        session.commit()
+        assert (spring.id, now) not in rollups(session)
+        assert rollups(session)[(autumn.id, now)] == (1, 0)
+
+        session.delete(coupon)
+        session.commit()
+        assert (autumn.id, now) not in assert_matches_backfill(session)
+
+        # Left behind by a deleted campaign: no buckets, like the backfill
+        session.add(
+            Coupon(
+                code="ROLL-ORPHAN",
+                campaign_id=999,
+                assigned_to_user=user.id,
+                assigned_at=LAUNCH,
+            )
+        )
+        session.commit()
+        assert all(
+            campaign_id != 999 for campaign_id, _ in assert_matches_backfill(session)
+        )
+
+        points = CampaignService(session).get_campaign_timeseries(
+            spring.id, hour - timedelta(hours=1), hour + timedelta(hours=2)
+        )
+        assert [(p.hour, p.assigned, p.redeemed) for p in points] == [
+            (hour - timedelta(hours=1), 0, 0),
+            (hour, 1, 0),
+            (hour + timedelta(hours=1), 0, 1),
+            (hour + timedelta(hours=2), 0, 0),
+        ]
+
+
+def test_timeseries_accepts_aware_bounds() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="rollup\\aware", hashed_password="x")
+        campaign = Campaign(name="aware")
+        session.add_all([user, campaign])
+        session.commit()
+        session.add(
+            Coupon(
+                code="ROLL-AWARE",
+                campaign_id=campaign.id,
+                assigned_to_user=user.id,
+                assigned_at=LAUNCH,
+            )
+        )
+        session.commit()
+
+        # 11:15 in UTC+2 is the 09:00 UTC bucket, as the route receives ?since=...+02:00
+        madrid = timezone(timedelta(hours=2))
+        since = hour_bucket(datetime(2025, 3, 1, 11, 15, tzinfo=madrid))
+        until = hour_bucket(datetime(2025, 3, 1, 10, 30, tzinfo=timezone.utc))
+        assert since == datetime(2025, 3, 1, 9) and since.tzinfo is None
+        assert campaign.id is not None
+        points = CampaignService(session).get_campaign_timeseries(
+            campaign.id, since, until
+        )
+        assert [(p.hour, p.assigned) for p in points] == [
+            (datetime(2025, 3, 1, 9), 1),
+            (datetime(2025, 3, 1, 10), 0),
+        ]
+
+
+def test_backfill_upserts_in_batches() -> None:
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _limit_variables(dbapi_connection: sqlite3.Connection, _record: Any) -> None:
+        # The default of SQLite builds before 3.32
+        dbapi_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+    SQLModel.metadata.create_all(engine)
+    hours = 3 * UPSERT_BATCH_SIZE
+    with Session(engine) as session:
+        user = User(username="rollup\\backfill", hashed_password="x")
+        campaign = Campaign(name="backfill")
+        session.add_all([user, campaign])
+        session.commit()
+        assert user.id is not None and campaign.id is not None
+        session.add_all(
+            Coupon(
+                code=f"ROLL-BACKFILL-{i}",
+                campaign_id=campaign.id,
+                assigned_to_user=user.id,
+                assigned_at=LAUNCH + timedelta(hours=i),
+            )
+            for i in range(hours)
+        )
+        session.commit()
+
+        assert backfill_rollups(session) == hours
+        hour = LAUNCH.replace(minute=0)
+        assert rollups(session) == {
+            (campaign.id, hour + timedelta(hours=i)): (1, 0) for i in range(hours)
+        }
+
+
+def test_rollups_follow_async_assignments(tmp_path: Path) -> None:
+    url = f"sqlite:///{tmp_path / 'rollups.db'}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="rollup\\async", hashed_password="x")
+        campaign = Campaign(name="async")
+        session.add_all([user, campaign])
+        session.commit()
+        session.add(Coupon(code="ROLL-ASYNC", campaign_id=campaign.id))
+        session.commit()
+        user_id, campaign_id = user.id, campaign.id
+        assert user_id is not None and campaign_id is not None
+
+    async def assign() -> None:
+        async_engine = create_app_async_engine(url)
+        async with AsyncSession(async_engine) as session:
+            await AsyncAssignmentService(session).assign_campaign_coupons_to_user(
+                campaign_id, user_id
+            )
+        await async_engine.dispose()
+
+    asyncio.run(assign())
+    with Session(engine) as session:
+        assert list(rollups(session).values()) == [(1, 0)]
+        assert_matches_backfill(session)
@@ -0,0 +1,138 @@
+from typing import Any
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models import Campaign, Coupon, User
+from app.services.assignment_service import AssignmentService
+from app.services.campaign_service import CampaignService
+from app.services.coupon_service import CouponService
+from app.services.statements import COUPON_SEARCH_SQLITE
+
+
+def test_prebuilt_statements_bind_per_call() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        users = [User(username=f"stmt\\{i}", hashed_password="x") for i in range(2)]
+        campaigns = [Campaign(name=f"stmt-{i}") for i in range(2)]
+        session.add_all([*users, *campaigns])
+        session.commit()
+        user_ids = [u.id for u in users if u.id is not None]
+        campaign_ids = [c.id for c in campaigns if c.id is not None]
+        session.add_all(
+            Coupon(code=f"STMT-{c.id}-{i}", campaign_id=c.id)
+            for c in campaigns
+            for i in range(3)
+        )
+        session.commit()
+
+        coupons = CouponService(session)
+        assert len(coupons.get_campaign_coupons(campaign_ids[0])) == 3
+        assert len(coupons.get_campaign_coupons(campaign_ids[1], skip=1, limit=1)) == 1
+
+        assignments = AssignmentService(session)
+        first = assignments.assign_campaign_coupons_to_user(
+            campaign_ids[0], user_ids[0]
+        )
+        second = assignments.assign_campaign_coupons_to_user(
+            campaign_ids[1], user_ids[1]
+        )
+        assert first is not None and first.id is not None and second is not None
+
+        assert [c.id for c in coupons.get_user_coupons(user_ids[0])] == [first.id]
+        assert [c.id for c in coupons.get_user_coupons(user_ids[1])] == [second.id]
+        assert len(coupons.get_unassigned_coupons()) == 4
+        coupons.redeem_coupon(first.id)
+        assert len(coupons.get_available_coupons(limit=2)) == 2
+        assert len(CampaignService(session).get_campaigns(skip=1)) == 1
+
+
+def test_campaign_stats_counts_every_campaign() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="stats\\user", hashed_password="x")
+        busy, empty = Campaign(name="busy"), Campaign(name="empty")
+        session.add_all([user, busy, empty])
+        session.commit()
+        session.add_all(
+            [
+                Coupon(code="STATS-1", campaign_id=busy.id),
+                Coupon(code="STATS-2", campaign_id=busy.id, redeemed=True),
+                Coupon(code="STATS-3", campaign_id=busy.id, assigned_to_user=user.id),
+                Coupon(
+                    code="STATS-4",
+                    campaign_id=busy.id,
+                    assigned_to_user=user.id,
+                    redeemed=True,
+                ),
+            ]
+        )
+        session.commit()
+
+        stats = {s.name: s for s in CampaignService(session).get_campaign_stats()}
+        assert stats["busy"].model_dump() == {
+            "campaign_id": busy.id,
+            "name": "busy",
+            "total": 4,
+            "assigned": 2,
+            "redeemed": 2,
+            "available": 1,
+        }
+        assert (stats["empty"].total, stats["empty"].available) == (0, 0)
+
+
+def test_coupon_search_matches_codes_and_campaigns() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        summer = Campaign(name="Summer sale", description="Beach gear")
+        other = Campaign(name="other")
+        session.add_all([summer, other])
+        session.commit()
+        session.add_all(
+            [
+                Coupon(code="SUM-001", campaign_id=other.id),
+                Coupon(code="xsum-002", campaign_id=other.id),
+                Coupon(code="OTHER-1", campaign_id=summer.id),
+                Coupon(code="50%_OFF", campaign_id=other.id),
+                Coupon(code="500-OFF", campaign_id=other.id),
+            ]
+        )
+        session.commit()
+        coupons = CouponService(session)
+
+        def codes(query: str, **kwargs: Any) -> list[str]:
+            return [c.code for c in coupons.search_coupons(query, **kwargs).data]
+
+        assert codes("sum") == ["SUM-001", "xsum-002", "OTHER-1"]
+        assert codes("sum", match="prefix") == ["SUM-001", "OTHER-1"]
+        assert codes("BEACH") == ["OTHER-1"]
+        # LIKE wildcards in the query are literal
+        assert codes("0%_") == ["50%_OFF"]
+
+        first = coupons.search_coupons("sum", limit=2)
+        assert [c.code for c in first.data] == ["SUM-001", "xsum-002"]
+        assert first.next_after is not None
+        rest = coupons.search_coupons("sum", after=first.next_after, limit=2)
+        assert ([c.code for c in rest.data], rest.next_after) == (["OTHER-1"], None)
+
+
+def test_coupon_code_prefix_search_uses_index() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        statement = COUPON_SEARCH_SQLITE.by_code.compile(engine)
+        assert statement.positiontup is not None
+        params = statement.construct_params(
+            {"pattern": "ABC%", "after": 0, "limit": 51}
+        )
+        plan = (
+            session.connection()
+            .exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}",
+                tuple(params[name] for name in statement.positiontup),
+            )
+            .all()
+        )
+    assert "ix_coupon_code_nocase (code>? AND code<?)" in str(plan)
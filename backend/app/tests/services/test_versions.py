@@ -0,0 +1,73 @@
+from sqlmodel import Session, SQLModel, create_engine
+from starlette.requests import Request
+
+from app.api.etags import etag_matches, weak_etag
+from app.models import Campaign, Coupon, CouponUpdate, User
+from app.services.assignment_service import AssignmentService
+from app.services.coupon_service import CouponService
+from app.services.versions import CAMPAIGNS, get_version, wallet_key
+
+
+def test_versions_follow_changes() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        alice = User(username="version\\alice", hashed_password="x")
+        bob = User(username="version\\bob", hashed_password="x")
+        campaign = Campaign(name="versioned")
+        session.add_all([alice, bob, campaign])
+        session.commit()
+        alice_id, bob_id, campaign_id = alice.id, bob.id, campaign.id
+        assert alice_id is not None and bob_id is not None and campaign_id is not None
+        session.add_all(
+            Coupon(code=f"VER-{i}", campaign_id=campaign_id) for i in range(2)
+        )
+        session.commit()
+
+        def versions() -> tuple[int, int, int]:
+            return (
+                get_version(session, CAMPAIGNS),
+                get_version(session, wallet_key(alice_id)),
+                get_version(session, wallet_key(bob_id)),
+            )
+
+        # Unassigned coupons belong to no wallet
+        assert versions() == (1, 0, 0)
+
+        coupon = AssignmentService(session).assign_campaign_coupons_to_user(
+            campaign_id, alice_id
+        )
+        assert coupon is not None and coupon.id is not None
+        assert versions() == (1, 1, 0)
+
+        coupons = CouponService(session)
+        coupons.redeem_coupon(coupon.id)
+        assert versions() == (1, 2, 0)
+
+        # Handed over: both wallets change, read back after the commit expired it
+        coupons.update_coupon(coupon.id, CouponUpdate(assigned_to_user=bob_id))
+        assert versions() == (1, 3, 1)
+
+        coupons.delete_coupon(coupon.id)
+        assert versions() == (1, 3, 2)
+
+        campaign.description = "renamed"
+        session.add(campaign)
+        session.commit()
+        assert versions() == (2, 3, 2)
+
+
+def test_etag_matching() -> None:
+    def request(if_none_match: str) -> Request:
+        return Request(
+            {"type": "http", "headers": [(b"if-none-match", if_none_match.encode())]}
+        )
+
+    etag = weak_etag("wallet:1", 3, "none", {})
+    assert etag.startswith('W/"wallet:1.3.')
+    assert etag != weak_etag("wallet:1", 4, "none", {})
+    assert etag != weak_etag("wallet:1", 3, "exact", {})
+    assert etag_matches(request(etag), etag)
+    assert etag_matches(request(f'"other", {etag.removeprefix("W/")}'), etag)
+    assert etag_matches(request("*"), etag)
+    assert not etag_matches(request(weak_etag("wallet:1", 2, "none", {})), etag)
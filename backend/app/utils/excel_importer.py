@@ -1,6 +1,5 @@
 import json
 from typing import List, Dict, Any
-import pandas as pd
 from sqlmodel import Session, select
 from app.models.coupon import CouponCreate
 from app.models.campaign import CampaignCreate, Campaign
@@ -19,6 +18,9 @@ class ExcelImporter:
         
         Business Rule: Required columns for Excel: code, campaign_name (auto-create if not exists)
         """
+        # pandas takes a noticeable part of a second to import; load it on first upload
+        import pandas as pd
+
         df = pd.read_excel(file_path)
         
         # Dictionary to cache campaign IDs
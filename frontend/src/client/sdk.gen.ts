@@ -3,7 +3,7 @@
 import type { CancelablePromise } from './core/CancelablePromise';
 import { OpenAPI } from './core/OpenAPI';
 import { request as __request } from './core/request';
-import type { AuthReadMeData, AuthReadMeResponse, AuthReadWindowsUserResponse, CampaignsCreateCampaignData, CampaignsCreateCampaignResponse, CampaignsReadCampaignsData, CampaignsReadCampaignsResponse, CampaignsReadCampaignData, CampaignsReadCampaignResponse, CampaignsUpdateCampaignData, CampaignsUpdateCampaignResponse, CampaignsDeleteCampaignData, CampaignsDeleteCampaignResponse, CampaignsAssignCampaignToUserData, CampaignsAssignCampaignToUserResponse, CouponsReadMyCouponsData, CouponsReadMyCouponsResponse, CouponsReadUnassignedCouponsData, CouponsReadUnassignedCouponsResponse, CouponsReadAvailableCouponsData, CouponsReadAvailableCouponsResponse, CouponsReadAllCouponsData, CouponsReadAllCouponsResponse, CouponsReadCampaignCouponsData, CouponsReadCampaignCouponsResponse, CouponsUploadCouponsExcelData, CouponsUploadCouponsExcelResponse, CouponsUploadCouponsJsonData, CouponsUploadCouponsJsonResponse, CouponsAssignCouponData, CouponsAssignCouponResponse, CouponsRedeemCouponData, CouponsRedeemCouponResponse, CouponsDeleteCouponData, CouponsDeleteCouponResponse, CouponsUpdateCouponData, CouponsUpdateCouponResponse, CouponUsersReadUsersData, CouponUsersReadUsersResponse, CouponUsersCreateUserData, CouponUsersCreateUserResponse, CouponUsersReadUserMeData, CouponUsersReadUserMeResponse, CouponUsersUpdateUserData, CouponUsersUpdateUserResponse, CouponUsersDeleteUserData, CouponUsersDeleteUserResponse, ItemsReadItemsData, ItemsReadItemsResponse, ItemsCreateItemData, ItemsCreateItemResponse, ItemsReadItemData, ItemsReadItemResponse, ItemsUpdateItemData, ItemsUpdateItemResponse, ItemsDeleteItemData, ItemsDeleteItemResponse, LoginLoginWindowResponse, LoginRecoverPasswordData, LoginRecoverPasswordResponse, LoginResetPasswordData, LoginResetPasswordResponse, LoginRecoverPasswordHtmlContentData, LoginRecoverPasswordHtmlContentResponse, PrivateCreateUserData, PrivateCreateUserResponse, UsersReadUsersData, UsersReadUsersResponse, UsersCreateUserData, UsersCreateUserResponse, UsersUpdateUserMeData, UsersUpdateUserMeResponse, UsersReadUserMeData, UsersReadUserMeResponse, UsersDeleteUserMeData, UsersDeleteUserMeResponse, UsersUpdatePasswordMeData, UsersUpdatePasswordMeResponse, UsersRegisterUserData, UsersRegisterUserResponse, UsersReadUserByIdData, UsersReadUserByIdResponse, UsersUpdateUserData, UsersUpdateUserResponse, UsersDeleteUserData, UsersDeleteUserResponse, UtilsTestEmailData, UtilsTestEmailResponse, WindowsAuthLoginWithWindowsResponse } from './types.gen';
+import type { AuthReadMeData, AuthReadMeResponse, AuthReadWindowsUserResponse, CampaignsCreateCampaignData, CampaignsCreateCampaignResponse, CampaignsReadCampaignsData, CampaignsReadCampaignsResponse, CampaignsReadCampaignStatsData, CampaignsReadCampaignStatsResponse, CampaignsReadCampaignData, CampaignsReadCampaignResponse, CampaignsUpdateCampaignData, CampaignsUpdateCampaignResponse, CampaignsDeleteCampaignData, CampaignsDeleteCampaignResponse, CampaignsAssignCampaignToUserData, CampaignsAssignCampaignToUserResponse, CouponsReadMyCouponsData, CouponsReadMyCouponsResponse, CouponsReadUnassignedCouponsData, CouponsReadUnassignedCouponsResponse, CouponsReadAvailableCouponsData, CouponsReadAvailableCouponsResponse, CouponsReadAllCouponsData, CouponsReadAllCouponsResponse, CouponsReadCampaignCouponsData, CouponsReadCampaignCouponsResponse, CouponsUploadCouponsExcelData, CouponsUploadCouponsExcelResponse, CouponsUploadCouponsJsonData, CouponsUploadCouponsJsonResponse, CouponsAssignCouponData, CouponsAssignCouponResponse, CouponsRedeemCouponData, CouponsRedeemCouponResponse, CouponsDeleteCouponData, CouponsDeleteCouponResponse, CouponsUpdateCouponData, CouponsUpdateCouponResponse, CouponUsersReadUsersData, CouponUsersReadUsersResponse, CouponUsersCreateUserData, CouponUsersCreateUserResponse, CouponUsersReadUserMeData, CouponUsersReadUserMeResponse, CouponUsersUpdateUserData, CouponUsersUpdateUserResponse, CouponUsersDeleteUserData, CouponUsersDeleteUserResponse, ItemsReadItemsData, ItemsReadItemsResponse, ItemsCreateItemData, ItemsCreateItemResponse, ItemsReadItemData, ItemsReadItemResponse, ItemsUpdateItemData, ItemsUpdateItemResponse, ItemsDeleteItemData, ItemsDeleteItemResponse, LoginLoginWindowResponse, LoginRecoverPasswordData, LoginRecoverPasswordResponse, LoginResetPasswordData, LoginResetPasswordResponse, LoginRecoverPasswordHtmlContentData, LoginRecoverPasswordHtmlContentResponse, PrivateCreateUserData, PrivateCreateUserResponse, UsersReadUsersData, UsersReadUsersResponse, UsersCreateUserData, UsersCreateUserResponse, UsersUpdateUserMeData, UsersUpdateUserMeResponse, UsersReadUserMeData, UsersReadUserMeResponse, UsersDeleteUserMeData, UsersDeleteUserMeResponse, UsersUpdatePasswordMeData, UsersUpdatePasswordMeResponse, UsersRegisterUserData, UsersRegisterUserResponse, UsersReadUserByIdData, UsersReadUserByIdResponse, UsersUpdateUserData, UsersUpdateUserResponse, UsersDeleteUserData, UsersDeleteUserResponse, UtilsTestEmailData, UtilsTestEmailResponse, WindowsAuthLoginWithWindowsResponse } from './types.gen';
 
 export class AuthService {
     /**
@@ -102,6 +102,27 @@ export class CampaignsService {
         });
     }
     
+    /**
+     * Read Campaign Stats
+     * Total, assigned, redeemed and available coupon counts per campaign (managers and admins).
+     * @param data The data for the request.
+     * @param data.authorization
+     * @returns CampaignStats Successful Response
+     * @throws ApiError
+     */
+    public static readCampaignStats(data: CampaignsReadCampaignStatsData = {}): CancelablePromise<CampaignsReadCampaignStatsResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/v1/campaigns/stats',
+            headers: {
+                authorization: data.authorization
+            },
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
     /**
      * Read Campaign
      * Get campaign by ID (all users).
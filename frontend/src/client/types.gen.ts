@@ -23,6 +23,15 @@ export type CampaignRead = {
     id: number;
 };
 
+export type CampaignStats = {
+    campaign_id: number;
+    name: string;
+    total: number;
+    assigned: number;
+    redeemed: number;
+    available: number;
+};
+
 export type CampaignUpdate = {
     name?: (string | null);
     description?: (string | null);
@@ -194,6 +203,12 @@ export type CampaignsReadCampaignsData = {
 
 export type CampaignsReadCampaignsResponse = (Array<CampaignRead>);
 
+export type CampaignsReadCampaignStatsData = {
+    authorization?: string;
+};
+
+export type CampaignsReadCampaignStatsResponse = (Array<CampaignStats>);
+
 export type CampaignsReadCampaignData = {
     authorization?: string;
     id: number;
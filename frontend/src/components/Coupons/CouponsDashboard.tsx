@@ -1,7 +1,46 @@
 import { useState } from "react";
-import { Box, Button, Container, Heading } from "@chakra-ui/react";
+import { useQuery } from "@tanstack/react-query";
+import { Box, Button, Container, Heading, Table, Text } from "@chakra-ui/react";
+import { CampaignsService } from "@/client";
 import useAuth from "../../hooks/useAuth";
 
+// Per-campaign counts come from one aggregate endpoint instead of a coupon list per campaign
+const CampaignStatsTable = () => {
+  const { data: stats, isLoading } = useQuery({
+    queryKey: ["campaignStats"],
+    queryFn: () => CampaignsService.readCampaignStats(),
+  });
+
+  if (isLoading) {
+    return <Text>Loading campaign statistics...</Text>;
+  }
+
+  return (
+    <Table.Root size={{ base: "sm", md: "md" }}>
+      <Table.Header>
+        <Table.Row>
+          <Table.ColumnHeader>Campaign</Table.ColumnHeader>
+          <Table.ColumnHeader textAlign="end">Total</Table.ColumnHeader>
+          <Table.ColumnHeader textAlign="end">Assigned</Table.ColumnHeader>
+          <Table.ColumnHeader textAlign="end">Redeemed</Table.ColumnHeader>
+          <Table.ColumnHeader textAlign="end">Available</Table.ColumnHeader>
+        </Table.Row>
+      </Table.Header>
+      <Table.Body>
+        {stats?.map((campaign) => (
+          <Table.Row key={campaign.campaign_id}>
+            <Table.Cell>{campaign.name}</Table.Cell>
+            <Table.Cell textAlign="end">{campaign.total}</Table.Cell>
+            <Table.Cell textAlign="end">{campaign.assigned}</Table.Cell>
+            <Table.Cell textAlign="end">{campaign.redeemed}</Table.Cell>
+            <Table.Cell textAlign="end">{campaign.available}</Table.Cell>
+          </Table.Row>
+        ))}
+      </Table.Body>
+    </Table.Root>
+  );
+};
+
 const CouponsDashboard = () => {
   const { user } = useAuth();
   const [activeView, setActiveView] = useState("my-coupons");
@@ -14,6 +53,12 @@ const CouponsDashboard = () => {
     <Container maxW="container.xl" py={8}>
       <Heading mb={6}>Coupon Management Dashboard</Heading>
       
+      {showManagerViews && (
+        <Box mb={6}>
+          <CampaignStatsTable />
+        </Box>
+      )}
+      
       <Box mb={6}>
         <Button 
           mr={2} 